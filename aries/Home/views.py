@@ -1,20 +1,18 @@
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render
-from django.contrib.auth.models import User
-from clans.models import Clans
+from tournaments.leaderboard import leaderboard
 from scripts.error_handle import ErrorHandler
 from scripts.follow import *
 
 def home(request):
     """
-    Renders the home page of the website.
+    Renders the home page of the website. The top players and clans come from the cached leaderboards.
     """
     try:
-        clans = Clans.objects.select_related('stat').filter(is_verified=True).order_by('-stat__elo_rating')[:10]
-        players = User.objects.all().order_by('-profile__stats__elo_rating')[:10]
+        boards = leaderboard.boards()
         context ={
-            "players":players,
-            "clans":clans
+            "players":boards["players"],
+            "clans":boards["clans"]
         }
     except Exception as e:
         ErrorHandler().handle(e, context="Home Page")
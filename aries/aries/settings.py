@@ -207,6 +207,18 @@ LOGIN_URL = 'login'           # URL to redirect unauthorized users for login
 
 MEDIA_URL = '/media/'         # Base URL to serve user-uploaded media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Filesystem path where media files are stored
+TOURNAMENT_RELATIONAL_STORAGE = env.bool("TOURNAMENT_RELATIONAL_STORAGE", default=False)  # Keep fixtures/tables in Match, Leg and Standing rows instead of the JSON files
+TOURNAMENT_CACHE_SIZE = env.int("TOURNAMENT_CACHE_SIZE", default=128)  # Parsed tournament documents kept in memory per worker process
+TOURNAMENT_ROUND_SHARDS = env.bool("TOURNAMENT_ROUND_SHARDS", default=True)  # Store league/Swiss rounds in per-round files so a page can load one round
+TOURNAMENT_EVENT_LOG = env.bool("TOURNAMENT_EVENT_LOG", default=True)  # Append each result submission to "<tournament file>.events" instead of rewriting the file
+TOURNAMENT_SNAPSHOT_EVERY = env.int("TOURNAMENT_SNAPSHOT_EVERY", default=20)  # Rewrite the tournament file after this many logged results (pages replay the results logged since onto the header, reading only the rounds they changed)
+DOCUMENT_CODEC = env("DOCUMENT_CODEC", default="json")  # Encoding for new tournament/history files: "json" or "zjson" (zlib-compressed JSON, the compact encoding in place of a binary format); existing files are read in their own codec
+LEADERBOARD_SIZE = env.int("LEADERBOARD_SIZE", default=10)  # Players and clans kept in the cached home page leaderboards
+LEADERBOARD_CACHE_TIMEOUT = env.int("LEADERBOARD_CACHE_TIMEOUT", default=60 * 15)  # Seconds before a cached leaderboard is rebuilt even if no result changed it
+LEADERBOARD_VERSION_TIMEOUT = env.int("LEADERBOARD_VERSION_TIMEOUT", default=30)  # Seconds a worker trusts its cached leaderboard version before reading it from the database again
+# No CACHES is configured, so each worker process has its own in-memory cache. A leaderboard change reaches the
+# worker that made it at once and the others within LEADERBOARD_VERSION_TIMEOUT, and every worker rebuilds the
+# boards once per change; point CACHES at a shared backend (e.g. Redis or Memcached) for both to happen once for all workers.
 
 STATIC_URL = '/static/'       # URL prefix for serving static files (CSS, JS, images)
 STATICFILES_DIRS = [
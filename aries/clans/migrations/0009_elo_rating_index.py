@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clans', '0008_recent_form'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clanstats',
+            name='elo_rating',
+            field=models.FloatField(db_index=True, default=1200, editable=False),
+        ),
+    ]
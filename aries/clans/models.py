@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 from django.contrib.auth.models import User,AbstractBaseUser, BaseUserManager, PermissionsMixin,Group, Permission
-import os, json
+import os
 from scripts.error_handle import ErrorHandler
 from PIL import Image
 from django.conf import settings
@@ -98,55 +98,41 @@ class ClanStats(models.Model):
     ga = models.IntegerField(default=0) # Goal Against
     average_team_score = models.FloatField(default=0.0, editable=False)
     achievements = models.JSONField(blank=True, null=True)
-    elo_rating = models.FloatField(default=1200, editable=False)
+    elo_rating = models.FloatField(default=1200, editable=False, db_index=True)
     match_data = models.JSONField(blank=True, null=True, default=dict)
+    recent_form = models.CharField(max_length=10, blank=True, default="", editable=False, help_text="Latest results as W/L/D letters, oldest first (kept by MatchUnitOfWork).")
+
+    # (Elo below which the rank applies, rank), ascending; TOP_RANK above the last one.
+    RANK_THRESHOLDS = [
+        (1200, 'bronze'),
+        (1400, 'silver'),
+        (1600, 'gold'),
+        (1800, 'platinum'),
+        (2000, 'diamond'),
+        (2200, 'master'),
+        (2400, 'grandmaster'),
+        (2600, 'champion'),
+    ]
+    TOP_RANK = 'invincible'
+
+    def set_rank_based_on_elo(self, commit=True):
+        """Set ranking string based on Elo thresholds. Pass commit=False to leave saving to the caller."""
+        self.rank = self.TOP_RANK
 
-    def set_rank_based_on_elo(self):
-        """Set ranking string based on Elo thresholds."""
-        ranking_thresholds = [
-            (1200, 'bronze'),
-            (1400, 'silver'),
-            (1600, 'gold'),
-            (1800, 'platinum'),
-            (2000, 'diamond'),
-            (2200, 'master'),
-            (2400, 'grandmaster'),
-            (2600, 'champion'),
-        ]
-        self.rank = 'invincible'
-
-        for threshold, rank in ranking_thresholds:
+        for threshold, rank in self.RANK_THRESHOLDS:
             if self.elo_rating < threshold:
                 self.rank = rank
                 break
 
-        self.save()
+        if commit:
+            self.save()
   
     def get_json_file_path(self):
-        """File path for external JSON backup of match data."""
+        """Path of the old match history file, imported into MatchRecord by tournaments migration 0015 and removed with the stats."""
         directory = os.path.join(settings.MEDIA_ROOT, 'match_data')
         os.makedirs(directory, exist_ok=True)
         return os.path.join(directory, f'clan_match_data_{self.pk}.json')
 
-    def save_match_data_to_file(self):
-        """Backup match_data to JSON file."""
-        if not self.match_data:
-            return
-        file_path = self.get_json_file_path()
-        with open(file_path, 'w') as json_file:
-            json.dump(self.match_data, json_file, indent=4)
-
-    def load_match_data_from_file(self):
-        """Load match_data from JSON backup file."""
-        file_path = self.get_json_file_path()
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            try:
-                with open(file_path, 'r') as json_file:
-                    return json.load(json_file)
-            except json.JSONDecodeError:
-                return {}
-        return {}
-
     def delete(self, *args, **kwargs):
         """Remove JSON backup file on delete."""
         file_path = self.get_json_file_path()
@@ -4,7 +4,9 @@ from django.utils.safestring import mark_safe
 import markdown,os
 from django.core.files.storage import FileSystemStorage
 from django.conf import settings
-from tournaments.models import ClanTournament
+from tournaments.models import ClanTournament, MatchRecord
+from tournaments.participants import participant_ref
+from tournaments.rank_index import rank_position
 from django.contrib.auth.models import User
 from users.models import Profile
 from scripts.follow import *
@@ -218,7 +220,6 @@ def clan_view(request, clan_id):
     try:
         clan = get_object_or_404(Clans, id=clan_id)
         clan_stats = get_object_or_404(ClanStats, id=clan_id)
-        match_data = clan_stats.load_match_data_from_file()
         clan.clan_description = mark_safe(markdown.markdown(clan.clan_description))
         followers = count_followers(clan)
         following = count_following(clan)
@@ -227,27 +228,16 @@ def clan_view(request, clan_id):
         socials  = make_social_links_dict(ClanSocialLink.objects.filter(clan=clan).all())
         tournaments = ClanTournament.objects.filter(teams=clan).order_by('-id')[:5]
         
-        match_results = []
-        if match_data and "matches" in match_data:
-            last_5_matches = match_data["matches"][-5:]
-            match_results = [
-                "W" if m["result"] == "win" else "L" if m["result"] == "loss" else "D"
-                for m in last_5_matches
-            ]
-            match_data["matches"] = last_5_matches
-
+        match_results = list(clan_stats.recent_form[-5:])
+        position = rank_position(clan_stats)
         query = request.GET.get('q', '')
-        if query:
-            q_lower = query.lower()
-            match_data["matches"] = [
-                m for m in match_data["matches"]
-                if any(q_lower in str(m[f]).lower() for f in ['date', 'tour_name', 'opponent', 'result', 'score'])
-            ]
+        match_data = {"matches": MatchRecord.objects.latest_for(participant_ref(clan), query=query)}
 
         members = User.objects.filter(profile__clan=clan)
         context = {
             'clan': clan,
             'stats': clan_stats,
+            'rank_position': position,
             'players': members,
             'tournaments': tournaments,
             "match_results": match_results,
@@ -284,11 +274,6 @@ def clan_dashboard(request):
         clan = get_object_or_404(Clans, id=clan_id)
         
         clan_stats = get_object_or_404(ClanStats, id=clan_id)
-        try:
-            match_data = clan_stats.load_match_data_from_file()
-        except Exception as e:
-            ErrorHandler().handle(e, context="Loading match data")
-            match_data = {"matches": []}
         clan.clan_description = mark_safe(markdown.markdown(clan.clan_description))
         form = AddPlayerToClanForm(request.POST or None, clan=clan)
         members =User.objects.filter(profile__clan=clan)
@@ -298,26 +283,11 @@ def clan_dashboard(request):
         followers = count_followers(clan)
         following = count_following(clan)
     # ============================ get last 5 matches ============================ #
-    # Match results
-        match_results = []
-        if match_data.get("matches"):
-            last_5 = match_data["matches"][-5:]
-            match_results = [
-                "W" if m["result"] == "win"
-                else "L" if m["result"] == "loss"
-                else "D"
-                for m in last_5
-            ]
-            match_data["matches"] = last_5
+        match_results = list(clan_stats.recent_form[-5:])
 
         # Search functionality
         query = request.GET.get('q', '').strip().lower()
-        if query and match_data.get("matches"):
-            match_data["matches"] = [
-                m for m in match_data["matches"]
-                if any(query in str(m.get(field, '')).lower()
-                       for field in ['date', 'tour_name', 'opponent', 'result', 'score'])
-            ] 
+        match_data = {"matches": MatchRecord.objects.latest_for(participant_ref(clan), query=query)}
         context = {
             "clan": clan,
             "stats": clan_stats,
@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import tempfile
+import zlib
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead (slower); files are the same either way
+    orjson = None
+
+
+# Mode of a newly created file, as open() would give it. os.umask can only be read by setting it,
+# so it is read once here rather than on every write.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+class DocumentError(ValueError):
+    """A document file could not be decoded (unknown codec, newer schema or corrupt payload)."""
+
+
+class Serializer:
+    """
+    Reads and writes the documents kept under MEDIA_ROOT: tournament match data, and the old match history
+    files that tournaments migration 0015 imports into MatchRecord.
+
+    Every file starts with a one-line header, "#aries <codec> <schema> <version>\\n", followed by the
+    payload in that codec. The codec named in the header is used to read the file, so changing
+    DOCUMENT_CODEC only affects files written after it; older files convert on their next save.
+    The version is the tournament file's counter (see tournaments/file_store.py), 0 for history.
+
+    Files written before the header existed are plain JSON and read as schema 0. On read, a document
+    is brought up to SCHEMA_VERSION by the steps in UPGRADES, so callers only ever see the current shape.
+
+    Codecs:
+        json: compact JSON, encoded with orjson (in requirements.txt; several times faster than stdlib
+            json, which is only used if orjson is missing).
+        zjson: the same JSON compressed with zlib. This is the compact encoding for large documents:
+            match dicts repeat the same keys and participant references, which zlib removes, so it gets
+            most of the size saving of a binary format while the payload stays JSON underneath and
+            needs no extra dependency or schema.
+    """
+    SCHEMA_VERSION = 1
+    HEADER = re.compile(rb"^#aries (\w+) (\d+) (\d+)\n")
+    LEGACY_VERSION = re.compile(rb'^\{"version": ?(\d+)')
+
+    def __init__(self):
+        self.codecs = {}
+        self.upgrades = {}
+
+    # ============================================================================ #
+    #                                   registries                                 #
+    # ============================================================================ #
+    def register_codec(self, name, dumps, loads):
+        """
+        Adds a codec.
+
+        Args:
+            name (str): Name written to the header (letters, digits and underscores).
+            dumps (callable): data -> bytes.
+            loads (callable): bytes -> data.
+        """
+        self.codecs[name] = (dumps, loads)
+
+    def register_upgrade(self, kind, from_schema, upgrade):
+        """
+        Adds the step that brings a document of the given kind from from_schema to from_schema + 1.
+
+        Args:
+            kind (str): "tournament" or "history".
+            from_schema (int): Schema the step reads.
+            upgrade (callable): Takes the document and returns it in the next schema.
+        """
+        self.upgrades.setdefault(kind, {})[from_schema] = upgrade
+
+    def codec_name(self, codec=None):
+        name = codec or getattr(settings, "DOCUMENT_CODEC", "json")
+        if name not in self.codecs:
+            raise DocumentError(f"Unknown document codec {name!r} (available: {', '.join(self.codecs)})")
+        return name
+
+    # ============================================================================ #
+    #                                encode / decode                               #
+    # ============================================================================ #
+    def dumps(self, data, version=0, codec=None):
+        """
+        Encodes a document with its header.
+
+        Args:
+            data (dict): The document.
+            version (int): Version counter for the header.
+            codec (str, optional): Codec name; defaults to settings.DOCUMENT_CODEC.
+
+        Returns:
+            bytes: The file contents.
+        """
+        name = self.codec_name(codec)
+        header = f"#aries {name} {self.SCHEMA_VERSION} {version}\n".encode()
+        return header + self.codecs[name][0](data)
+
+    def loads(self, raw, kind):
+        """
+        Decodes file contents and upgrades the document to the current schema.
+
+        Args:
+            raw (bytes): The file contents.
+            kind (str): "tournament" or "history", selects the upgrade steps.
+
+        Returns:
+            dict: The document.
+
+        Raises:
+            DocumentError: If the contents cannot be decoded.
+        """
+        header = self.HEADER.match(raw)
+        try:
+            if header is None:
+                schema, data = 0, _json_loads(raw)
+            else:
+                name, schema = header.group(1).decode(), int(header.group(2))
+                if name not in self.codecs:
+                    raise DocumentError(f"Unknown document codec {name!r}")
+                data = self.codecs[name][1](raw[header.end():])
+        except DocumentError:
+            raise
+        except (ValueError, zlib.error) as e:
+            raise DocumentError(f"Invalid {kind} document: {e}") from e
+        return self.upgrade(data, kind, schema)
+
+    def upgrade(self, data, kind, schema):
+        """Applies the upgrade steps for kind from schema up to SCHEMA_VERSION."""
+        if schema > self.SCHEMA_VERSION:
+            raise DocumentError(f"{kind} document has schema {schema}, this code reads up to {self.SCHEMA_VERSION}")
+        steps = self.upgrades.get(kind, {})
+        while schema < self.SCHEMA_VERSION:
+            if schema in steps:
+                data = steps[schema](data)
+            schema += 1
+        return data
+
+    def peek_version(self, head):
+        """Version counter from the first bytes of a file, or None if it has to be parsed to find it."""
+        match = self.HEADER.match(head) or self.LEGACY_VERSION.match(head)
+        if match:
+            return int(match.group(match.lastindex))
+        return None
+
+    # ============================================================================ #
+    #                                     files                                    #
+    # ============================================================================ #
+    def read(self, path, kind):
+        """
+        Reads a document file.
+
+        Returns:
+            dict: The document, or {} if the file is missing or empty.
+
+        Raises:
+            DocumentError: If the file cannot be decoded.
+        """
+        try:
+            with open(path, "rb") as document_file:
+                raw = document_file.read()
+        except FileNotFoundError:
+            return {}
+        if not raw:
+            return {}
+        return self.loads(raw, kind)
+
+    def write(self, path, data, version=0, codec=None):
+        """
+        Writes a document to a temporary file in the same directory and moves it over path, so readers
+        see either the old or the new file and a crash never leaves a truncated one.
+        """
+        self.write_bytes(path, self.dumps(data, version=version, codec=codec))
+
+    def write_bytes(self, path, payload):
+        """
+        Atomically writes contents already encoded by dumps(). The file keeps the mode it had, or gets
+        the umask default if it is new; mkstemp creates the temporary file as 0600, which os.replace
+        would otherwise carry over.
+        """
+        directory = os.path.dirname(path) or "."
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+        try:
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = NEW_FILE_MODE
+            os.chmod(temp_path, mode)
+            with os.fdopen(handle, "wb") as document_file:
+                document_file.write(payload)
+                document_file.flush()
+                os.fsync(document_file.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+# ============================================================================ #
+#                                    codecs                                    #
+# ============================================================================ #
+if orjson is not None:
+    def _json_dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def _json_loads(payload):
+        return json.loads(payload)
+
+
+def _zjson_dumps(data):
+    return zlib.compress(_json_dumps(data), 6)
+
+
+def _zjson_loads(payload):
+    return _json_loads(zlib.decompress(payload))
+
+
+# ============================================================================ #
+#                                   upgrades                                   #
+# ============================================================================ #
+def _tournament_v1(data):
+    """Schema 1 always has the version counter, as the first key."""
+    if not isinstance(data, dict):
+        return {}
+    return {"version": data.get("version", 0), **data}
+
+
+def _history_v1(data):
+    """Schema 1 always has a "matches" list, and every entry an "opponent_ref" (the name, for entries written before references)."""
+    if not isinstance(data, dict):
+        return {"matches": []}
+    matches = data.get("matches")
+    data["matches"] = matches if isinstance(matches, list) else []
+    for entry in data["matches"]:
+        if isinstance(entry, dict):
+            entry.setdefault("opponent_ref", entry.get("opponent"))
+    return data
+
+
+serializer = Serializer()
+serializer.register_codec("json", _json_dumps, _json_loads)
+serializer.register_codec("zjson", _zjson_dumps, _zjson_loads)
+serializer.register_upgrade("tournament", 0, _tournament_v1)
+serializer.register_upgrade("history", 0, _history_v1)
@@ -0,0 +1,145 @@
+import copy
+import os
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.utils import timezone
+from scripts.serializer import serializer
+from .file_store import EventLog, VersionConflict, data_version, file_lock, match_data_cache, stored_version
+from .round_shards import RoundShards
+
+
+def is_complete(match_data):
+    """
+    Whether every match of a tournament has been played.
+
+    Swiss tournaments also need all their rounds drawn, and groups + knockout its knockout stage.
+
+    Args:
+        match_data (dict): Complete match data in any TourManager format.
+
+    Returns:
+        bool: True if there is at least one match and none is pending.
+    """
+    if not match_data:
+        return False
+    if "lazy_league" in match_data:
+        rounds = RoundShards.round_index(match_data)
+        return bool(rounds) and not any(round_info["pending"] for round_info in rounds)
+    if "swiss" in match_data and len(match_data.get("fixtures", {})) < match_data["swiss"].get("total_rounds", 0):
+        return False
+    if "group_stages" in match_data and not match_data.get("knock_outs"):
+        return False
+
+    stages = [match_data, *match_data.get("group_stages", {}).values(), match_data.get("knock_outs") or {}]
+    matches = [match for stage in stages for round_matches in stage.get("fixtures", {}).values() for match in round_matches]
+    matches += [match for stage in stages for round_data in stage.get("rounds", []) for match in round_data.get("matches", [])]
+    return bool(matches) and all(match.get("status") == "complete" for match in matches)
+
+
+def archive_tournament(tournament):
+    """
+    Freezes a completed tournament into its TournamentArchive: the final match data together with
+    the page body and every round fragment rendered once, for an anonymous visitor since an archived
+    tournament has nothing left to edit. From then on its page and round tabs are served from the
+    archive (see views.archived_fragment) without loading match data or resolving participants.
+
+    Args:
+        tournament (Model): ClanTournament or IndiTournament whose matches are all complete (see is_complete).
+
+    Returns:
+        int: Size of the archive in bytes.
+
+    Raises:
+        VersionConflict: If a result was saved while the archive was being built; nothing is changed.
+    """
+    from .models import ClanTournament
+    from .views import ROUND_FRAGMENT_TYPES, TeamResolver, league_view_model, process_tournament_data, round_matches
+    tour_kind, resolver = ('cvc', TeamResolver("clan")) if isinstance(tournament, ClanTournament) else ('indi', TeamResolver("user"))
+    match_data = tournament.load_match_data_from_file()
+    context = {'tour': tournament, 'tour_kind': tour_kind, 'user': AnonymousUser()}
+
+    round_pages = {}
+    if tournament.tour_type in ROUND_FRAGMENT_TYPES:
+        _, (page_data, rounds) = league_view_model(tournament, resolver, header=copy.deepcopy(match_data))
+        for round_info in RoundShards.round_index(match_data):
+            matches = round_matches(tournament, copy.deepcopy(match_data), round_info["key"], resolver)
+            round_pages[round_info["number"]] = render_to_string('tournaments/league_round.html', {**context, 'matches': matches, 'round_number': round_info["number"]})
+    else:
+        page_data, rounds = process_tournament_data(tournament.tour_type, copy.deepcopy(match_data), resolver=resolver, tournament=tournament)
+
+    page = render_to_string('tournaments/tour_body.html', {**context, 'match_data': page_data, 'rounds': rounds})
+    return TournamentArchive(tournament).freeze(match_data, page, round_pages)
+
+
+class TournamentArchive:
+    """
+    The frozen form of a completed tournament: one zlib-compressed document in MEDIA_ROOT/tournament_archive
+    holding the final match data, the result event log and the pre-rendered page and round fragments.
+
+    freeze() writes it and removes the tournament's live files (data file, round shards and event log), so an archived tournament costs one small compressed file on disk and its page is served as
+    stored HTML, without parsing match data or resolving participants.
+    """
+    CODEC = "zjson"
+    KIND = "archive"
+
+    def __init__(self, tournament):
+        self.tournament = tournament
+        directory = os.path.join(settings.MEDIA_ROOT, "tournament_archive")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, os.path.basename(tournament.get_json_file_path()))
+
+    def read(self):
+        """
+        Returns:
+            dict: {"match_data", "events", "page", "rounds": {round number: html}}, or {} if there is no archive.
+        """
+        return serializer.read(self.path, self.KIND)
+
+    def match_data(self):
+        return self.read().get("match_data", {})
+
+    def freeze(self, match_data, page, rounds):
+        """
+        Writes the archive, sets the tournament's archived_at and removes the live files the archive replaces.
+        All under the tournament file's lock, so a result saved while the page was rendering is not lost.
+
+        Args:
+            match_data (dict): The final match data, as loaded.
+            page (str): Rendered tournament page body (tournaments/tour_body.html).
+            rounds (dict): Rendered round fragments by round number, for league and Swiss tournaments.
+
+        Returns:
+            int: Size of the archive in bytes.
+
+        Raises:
+            VersionConflict: If the tournament file changed since match_data was loaded.
+        """
+        file_path = self.tournament.get_json_file_path()
+        log = EventLog(file_path)
+        with file_lock(file_path):
+            if stored_version(file_path) != data_version(match_data):
+                raise VersionConflict(f"{file_path} changed while it was being archived")
+            archived_at = timezone.now()
+            serializer.write(self.path, {
+                "archived_at": archived_at.isoformat(),
+                "match_data": match_data,
+                "events": log.events(),
+                "page": page,
+                "rounds": {str(number): html for number, html in rounds.items()},
+            }, version=data_version(match_data), codec=self.CODEC)
+            type(self.tournament).objects.filter(pk=self.tournament.pk).update(archived_at=archived_at)
+            self.tournament.archived_at = archived_at
+
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            RoundShards(file_path).remove()
+            log.remove()
+            match_data_cache.invalidate(file_path)
+        # The empty lock file stays: removed, a writer already waiting on it and one that opened a
+        # new file would both hold "the" lock.
+        return os.path.getsize(self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,357 @@
+import marshal
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from scripts.serializer import serializer, DocumentError
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes are still atomic
+    fcntl = None
+
+# Tournament files carry a "version" counter, also written to the file header so it can be read without parsing the file.
+VERSION_KEY = "version"
+# Result events are appended to "<tournament file>.events"; a snapshot records how much of the log it covers.
+EVENT_LOG_SUFFIX = ".events"
+LOG_OFFSET_KEY = "log_offset"
+
+
+class VersionConflict(Exception):
+    """The tournament file changed since it was read; reload and apply the update again."""
+
+
+_held_locks = threading.local()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on "<path>.lock" for the block, so a version check and the write after it
+    cannot interleave with another process doing the same. A thread that already holds the lock
+    (see rollback_on_error) enters again without waiting on itself.
+    """
+    held = _held_locks.__dict__.setdefault("paths", set())
+    if fcntl is None or path in held:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def rollback_on_error(path):
+    """
+    Holds the tournament's lock for a write that must stand or fall with a database transaction (see
+    models.apply_results_with_retry). If the block raises, the event log is cut back to its old length
+    and a snapshot written in the block is replaced by the previous one, so a result whose transaction
+    failed to commit is not left in the file. Nobody else can write while the lock is held, so what is
+    undone is only this block's write.
+    """
+    with file_lock(path):
+        log = EventLog(path)
+        log_size = log.size()
+        try:
+            previous = open(path, "rb")
+        except FileNotFoundError:
+            previous = None
+        try:
+            yield
+        except BaseException:
+            log.truncate(log_size)
+            if previous is not None and os.stat(path).st_ino != os.fstat(previous.fileno()).st_ino:
+                # Snapshots replace the file, so the handle still reads the previous one.
+                previous.seek(0)
+                serializer.write_bytes(path, previous.read())
+            match_data_cache.invalidate(path)
+            raise
+        finally:
+            if previous is not None:
+                previous.close()
+
+
+def data_version(data):
+    """Version counter of loaded match data (0 for files written before versioning)."""
+    if isinstance(data, dict):
+        return data.get(VERSION_KEY, 0)
+    return 0
+
+
+def stored_version(path):
+    """Current version of a tournament: its snapshot's, or that of the last result event logged after it."""
+    return max(snapshot_version(path), EventLog(path).last_version())
+
+
+def snapshot_version(path):
+    """Version of the file on disk, read from its header when possible."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return 0
+    with open(path, "rb") as document_file:
+        version = serializer.peek_version(document_file.read(64))
+        if version is not None:
+            return version
+        document_file.seek(0)
+        try:
+            return data_version(serializer.loads(document_file.read(), "tournament"))
+        except DocumentError:
+            return 0
+
+
+def write_versioned(path, match_data, build, expected_version=None):
+    """
+    Compare-and-swap write of a tournament file.
+
+    Args:
+        path (str): The tournament JSON file.
+        match_data (dict): The data being saved; its version counter is updated in place.
+        build (callable): Turns match_data into what the file should hold. Runs under the lock,
+            after the version check, so anything it writes elsewhere is not done for a stale update.
+        expected_version (int, optional): The version the data was loaded at. If the file has moved
+            on since, VersionConflict is raised and nothing is written. None writes unconditionally.
+
+    Returns:
+        int: The new version.
+    """
+    with file_lock(path):
+        version = _check_version(path, expected_version) + 1
+        _write_snapshot(path, match_data, build, version)
+        match_data_cache.put(path, match_data)
+        return version
+
+
+def _check_version(path, expected_version):
+    current = stored_version(path)
+    if expected_version is not None and current != expected_version:
+        raise VersionConflict(f"{os.path.basename(path)} is at version {current}, expected {expected_version}")
+    return current
+
+
+def _write_snapshot(path, match_data, build, version):
+    """Writes match_data as the tournament file at version, covering every event logged so far. Caller holds the lock."""
+    log_size = EventLog(path).size()
+    if log_size:
+        match_data[LOG_OFFSET_KEY] = log_size
+    data = build(match_data)
+    serializer.write(path, {VERSION_KEY: version, **{key: value for key, value in data.items() if key != VERSION_KEY}}, version=version)
+    match_data[VERSION_KEY] = version
+
+
+class EventLog:
+    """
+    Append-only log of the results submitted to a tournament, one JSON line per update_tour call:
+    {"version", "at", "by", "round", "KO", "results", "seed"}.
+
+    Recording a result appends its event instead of rewriting the tournament file, and the file is
+    written again as a snapshot once every TOURNAMENT_SNAPSHOT_EVERY events. A snapshot stores the log
+    offset it covers (LOG_OFFSET_KEY); readers replay the events after it (see models.replay_events).
+    Nothing is ever removed, so the log is also the audit trail of who entered which result and when.
+    """
+    LINE_VERSION = re.compile(rb'^\{"version":(\d+)')
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The tournament file.
+        """
+        self.path = path
+        self.log_path = f"{path}{EVENT_LOG_SUFFIX}"
+        self.encode, self.decode = serializer.codecs["json"]
+
+    def size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    def append(self, match_data, event, build, expected_version=None, snapshot_every=20):
+        """
+        Compare-and-swap append of a result event; match_data is the state after the event.
+
+        Args:
+            match_data (dict): The tournament data with the event applied; its version is updated in place.
+            event (dict): The event to record (a "version" key is added first).
+            build (callable): As in write_versioned, used when a snapshot is due.
+            expected_version (int, optional): As in write_versioned.
+            snapshot_every (int): Write a snapshot once this many events follow the last one.
+
+        Returns:
+            int: The new version.
+        """
+        with file_lock(self.path):
+            version = _check_version(self.path, expected_version) + 1
+            self._append_line(self.encode({VERSION_KEY: version, **event}) + b"\n")
+            match_data[VERSION_KEY] = version
+            if version - snapshot_version(self.path) >= snapshot_every:
+                _write_snapshot(self.path, match_data, build, version)
+            match_data_cache.put(self.path, match_data)
+            return version
+
+    def _append_line(self, line):
+        with open(self.log_path, "ab+") as log_file:
+            # Drop a partial line left by a crash, so the new event starts on a line of its own.
+            end = log_file.seek(0, os.SEEK_END)
+            if end:
+                log_file.seek(end - 1)
+                if log_file.read(1) != b"\n":
+                    log_file.seek(0)
+                    log_file.truncate(log_file.read().rfind(b"\n") + 1)
+            log_file.write(line)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+    def truncate(self, size):
+        """Cuts the log back to size bytes (nothing if it is not longer). Caller holds the lock."""
+        if self.size() > size:
+            with open(self.log_path, "r+b") as log_file:
+                log_file.truncate(size)
+                log_file.flush()
+                os.fsync(log_file.fileno())
+
+    def events(self, offset=0):
+        """Events from a byte offset on, oldest first. A last line still being written is skipped."""
+        try:
+            with open(self.log_path, "rb") as log_file:
+                log_file.seek(offset)
+                raw = log_file.read()
+        except FileNotFoundError:
+            return []
+        return [self.decode(line) for line in raw[:raw.rfind(b"\n") + 1].splitlines() if line]
+
+    def last_version(self):
+        """Version of the last complete event, read from the end of the log (0 if there is none)."""
+        size = self.size()
+        if not size:
+            return 0
+        block = 4096
+        with open(self.log_path, "rb") as log_file:
+            while True:
+                start = max(0, size - block)
+                log_file.seek(start)
+                chunk = log_file.read(size - start)
+                body = chunk[:chunk.rfind(b"\n")]
+                line_start = body.rfind(b"\n") + 1
+                if start and line_start == 0:
+                    block *= 2
+                    continue
+                match = self.LINE_VERSION.match(body[line_start:])
+                return int(match.group(1)) if match else 0
+
+    def remove(self):
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+
+class MatchDataCache:
+    """
+    Bounded LRU cache of parsed tournament documents for this process.
+
+    Entries are keyed by file path and are valid only while the file's (mtime, size, inode) stamp and
+    its event log's (mtime, size) are unchanged; every save replaces the file or appends to the log, so a
+    write from any worker invalidates the other workers' entries on their next read. Each read gets its own copy, rebuilt from a marshal snapshot of the
+    parsed document (several times cheaper than decoding the file again), so nothing a caller does to
+    its data can leak into the cache or into another request.
+
+    hits, misses and evictions are counted for monitoring (see stats()).
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        try:
+            log = os.stat(f"{path}{EVENT_LOG_SUFFIX}")
+            log_stamp = (log.st_mtime_ns, log.st_size)
+        except FileNotFoundError:
+            log_stamp = None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino, log_stamp)
+
+    def load(self, path, parse):
+        """
+        Returns a private copy of the document at path, parsing it only if the cached copy is stale.
+
+        Args:
+            path (str): The tournament JSON file.
+            parse (callable): Takes the file opened in binary mode and returns the match data (used on a miss).
+
+        Returns:
+            dict: The match data, or {} if the file is missing or empty.
+        """
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            return {}
+        if stamp[1] == 0:
+            return {}
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return marshal.loads(entry[1])
+            self.misses += 1
+
+        with open(path, "rb") as document_file:
+            data = parse(document_file)
+        self._store(path, stamp, data)
+        return data
+
+    def put(self, path, data):
+        """Caches data just written to path, so the next read does not parse it."""
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            return
+        self._store(path, stamp, data)
+
+    def _store(self, path, stamp, data):
+        try:
+            snapshot = marshal.dumps(data)
+        except ValueError:
+            # Not plain JSON data; never serve a stale entry for it.
+            self.invalidate(path)
+            return
+        with self._lock:
+            self._entries[path] = (stamp, snapshot)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, path):
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(snapshot) for _, snapshot in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+match_data_cache = MatchDataCache(getattr(settings, "TOURNAMENT_CACHE_SIZE", 128))
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from clans.models import ClanStats
+from users.models import PlayerStats
+from scripts.error_handle import ErrorHandler
+
+LEADERBOARD_KINDS = ("players", "clans")
+STAT_COLUMNS = ["elo_rating", "rank", "total_matches", "total_wins", "total_draws", "total_losses", "gf", "win_rate"]
+
+
+class Leaderboard:
+    """
+    Top players and verified clans by Elo, kept in the cache as plain rows so the home page renders
+    them without touching the database.
+
+    Boards are cached under a version (LeaderboardVersion), which is itself cached: a page view reads
+    the version and the boards from the cache and only queries the database on a miss. invalidate()
+    bumps the version in the database and writes the new one to the cache. With a shared cache
+    (CACHES) every worker sees it at once; with the default per-process cache the other workers pick
+    it up from the database once their cached version expires, after at most version_timeout seconds.
+    The version is bumped when a transaction that changed Elo commits (see MatchUnitOfWork.commit),
+    when a shown field of a profile, clan or stats row is saved (see signals.py), and by replay_ratings.
+    A board is built with one query on the indexed elo_rating column.
+    """
+    def __init__(self, size=10, timeout=60 * 15, version_timeout=30):
+        self.size = size
+        self.timeout = timeout
+        self.version_timeout = version_timeout
+
+    @staticmethod
+    def cache_key(kind, version):
+        return f"leaderboard_{kind}_{version}"
+
+    @staticmethod
+    def version_key(kind):
+        return f"leaderboard_version_{kind}"
+
+    def versions(self, kinds=LEADERBOARD_KINDS):
+        """Current version of each kind's board, from the cache or, for kinds it misses, one query."""
+        from .models import LeaderboardVersion
+        kinds = list(kinds)
+        cached = cache.get_many([self.version_key(kind) for kind in kinds])
+        versions = {kind: cached[self.version_key(kind)] for kind in kinds if self.version_key(kind) in cached}
+        missing = [kind for kind in kinds if kind not in versions]
+        if missing:
+            stored = dict(LeaderboardVersion.objects.filter(kind__in=missing).values_list("kind", "version"))
+            for kind in missing:
+                versions[kind] = stored.get(kind, 0)
+            cache.set_many({self.version_key(kind): versions[kind] for kind in missing}, self.version_timeout)
+        return versions
+
+    def boards(self, kinds=LEADERBOARD_KINDS):
+        """
+        The current boards, rebuilt for any kind whose version has no cached board yet.
+
+        Args:
+            kinds (iterable): "players" and/or "clans".
+
+        Returns:
+            dict: Rows by kind, highest Elo first ([] for a board that failed to build). Player rows hold
+                id, username and picture (URL or ""), clan rows id, clan_name and logo; both hold the STAT_COLUMNS.
+        """
+        versions = self.versions(kinds)
+        boards = {}
+        for kind in kinds:
+            key = self.cache_key(kind, versions[kind])
+            rows = cache.get(key)
+            if rows is None:
+                rows = self._build(kind)
+                if rows is not None:
+                    cache.set(key, rows, self.timeout)
+            boards[kind] = rows or []
+        return boards
+
+    def _build(self, kind):
+        try:
+            return self._build_players() if kind == "players" else self._build_clans()
+        except Exception as e:
+            ErrorHandler().handle(e, context=f"Failed to build the {kind} leaderboard")
+            return None
+
+    def invalidate(self, kinds=LEADERBOARD_KINDS):
+        """
+        Bumps the version of boards, so every worker rebuilds them on its next read once it sees the
+        new version (see the class docstring).
+        """
+        from .models import LeaderboardVersion
+        kinds = list(kinds)
+        updated = LeaderboardVersion.objects.filter(kind__in=kinds).update(version=F("version") + 1)
+        if updated < len(kinds):
+            LeaderboardVersion.objects.bulk_create(
+                [LeaderboardVersion(kind=kind, version=1) for kind in kinds], ignore_conflicts=True
+            )
+        stored = LeaderboardVersion.objects.filter(kind__in=kinds).values_list("kind", "version")
+        cache.set_many({self.version_key(kind): version for kind, version in stored}, self.version_timeout)
+
+    def _build_players(self):
+        stats = (
+            PlayerStats.objects.select_related("user_profile__user")
+            .order_by("-elo_rating", "pk")[:self.size]
+        )
+        return [
+            {
+                "id": row.user_profile.user_id,
+                "username": row.user_profile.user.username,
+                "picture": row.user_profile.profile_picture.url if row.user_profile.profile_picture else "",
+                **{column: getattr(row, column) for column in STAT_COLUMNS},
+            }
+            for row in stats
+        ]
+
+    def _build_clans(self):
+        stats = (
+            ClanStats.objects.select_related("clan")
+            .filter(clan__is_verified=True)
+            .order_by("-elo_rating", "pk")[:self.size]
+        )
+        return [
+            {
+                "id": row.clan_id,
+                "clan_name": row.clan.clan_name,
+                "logo": row.clan.clan_logo.url if row.clan.clan_logo else "",
+                **{column: getattr(row, column) for column in STAT_COLUMNS},
+            }
+            for row in stats
+        ]
+
+
+leaderboard = Leaderboard(
+    size=getattr(settings, "LEADERBOARD_SIZE", 10),
+    timeout=getattr(settings, "LEADERBOARD_CACHE_TIMEOUT", 60 * 15),
+    version_timeout=getattr(settings, "LEADERBOARD_VERSION_TIMEOUT", 30),
+)
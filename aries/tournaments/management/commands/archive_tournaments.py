@@ -0,0 +1,75 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from tournaments.archive import archive_tournament, is_complete
+from tournaments.file_store import VersionConflict, EVENT_LOG_SUFFIX
+from tournaments.models import ClanTournament, IndiTournament
+from scripts.error_handle import ErrorHandler
+
+
+class Command(BaseCommand):
+    """
+    Freezes completed tournaments into compressed archives (see TournamentArchive).
+
+    A tournament is archived once every match is complete and no result has been saved for --days,
+    so a late correction still goes to the live file. The archive holds the final match data, the
+    result event log and the rendered page; the live files are removed and the page is served from
+    the archive from then on. Archiving is one way: an archived tournament accepts no more results.
+    """
+    help = "Archive tournaments whose matches are all complete and that have not changed for --days days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=7, help="Days since the last saved result before a completed tournament is archived (default: 7).")
+        parser.add_argument("--dry-run", action="store_true", help="List the tournaments that would be archived without archiving them.")
+        parser.add_argument("--only", choices=["players", "clans"], help="Archive only individual or only clan tournaments.")
+
+    def handle(self, *args, **options):
+        models = []
+        if options["only"] in (None, "players"):
+            models.append(IndiTournament)
+        if options["only"] in (None, "clans"):
+            models.append(ClanTournament)
+        cutoff = time.time() - options["days"] * 24 * 60 * 60
+
+        for tournament_model in models:
+            archived = before = after = 0
+            for tournament in tournament_model.objects.filter(archived_at__isnull=True).order_by("pk").iterator():
+                file_path = tournament.get_json_file_path()
+                size, modified = self.live_files(file_path)
+                if not size or modified > cutoff or not is_complete(tournament.load_match_data_from_file()):
+                    continue
+                if options["dry_run"]:
+                    self.stdout.write(f"  {tournament_model.__name__} {tournament.pk} ({tournament}): {size} bytes")
+                    continue
+                try:
+                    archive_size = archive_tournament(tournament)
+                except VersionConflict:
+                    self.stdout.write(self.style.WARNING(f"  {tournament_model.__name__} {tournament.pk}: skipped, a result was saved while archiving"))
+                    continue
+                except Exception as e:
+                    ErrorHandler().handle(e, context=f"Archiving tournament {tournament.pk}")
+                    self.stdout.write(self.style.WARNING(f"  {tournament_model.__name__} {tournament.pk}: skipped, {e}"))
+                    continue
+                archived += 1
+                before += size
+                after += archive_size
+            if not options["dry_run"]:
+                self.stdout.write(f"{tournament_model.__name__}: {archived} tournaments archived, {before} -> {after} bytes")
+        self.stdout.write(self.style.SUCCESS("Done." if not options["dry_run"] else "Dry run, nothing archived."))
+
+    @staticmethod
+    def live_files(file_path):
+        """
+        Size and last modification of a tournament's live files (data file, round shards and event log).
+
+        Returns:
+            tuple: (total bytes, latest mtime), (0, 0) if the tournament has no data file.
+        """
+        if not os.path.exists(file_path):
+            return 0, 0
+        paths = [file_path, f"{file_path}{EVENT_LOG_SUFFIX}"]
+        shard_directory = f"{file_path}.rounds"
+        if os.path.isdir(shard_directory):
+            paths += [os.path.join(shard_directory, name) for name in os.listdir(shard_directory)]
+        stats = [os.stat(path) for path in paths if os.path.exists(path)]
+        return sum(stat.st_size for stat in stats), max(stat.st_mtime for stat in stats)
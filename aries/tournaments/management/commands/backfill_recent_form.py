@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from clans.models import ClanStats
+from users.models import PlayerStats
+from tournaments.models import MatchRecord
+from tournaments.unit_of_work import RECENT_FORM_LENGTH
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds PlayerStats/ClanStats.recent_form from the MatchRecord history.
+
+    recent_form is kept up to date as results are recorded; this fills it in for history recorded
+    before the field existed (e.g. imported from the old history files) or repairs it after editing
+    MatchRecord rows by hand. Rows are processed in batches with one windowed MatchRecord query each.
+    """
+    help = "Recompute the recent form (last results as W/L/D) of every player and clan from their match history."
+
+    BATCH_SIZE = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=["players", "clans"], help="Backfill only players or only clans.")
+
+    def handle(self, *args, **options):
+        sources = []
+        if options["only"] in (None, "players"):
+            sources.append((PlayerStats.objects.select_related("user_profile"), lambda stats: f"user:{stats.user_profile.user_id}"))
+        if options["only"] in (None, "clans"):
+            sources.append((ClanStats.objects.all(), lambda stats: f"clan:{stats.clan_id}"))
+
+        for queryset, ref in sources:
+            model = queryset.model
+            changed = 0
+            rows = list(queryset.order_by("pk"))
+            for start in range(0, len(rows), self.BATCH_SIZE):
+                batch = rows[start:start + self.BATCH_SIZE]
+                form = MatchRecord.objects.recent_form([ref(stats) for stats in batch], limit=RECENT_FORM_LENGTH)
+                updated = []
+                for stats in batch:
+                    recent_form = "".join(form.get(ref(stats), []))
+                    if stats.recent_form != recent_form:
+                        stats.recent_form = recent_form
+                        updated.append(stats)
+                model.objects.bulk_update(updated, ["recent_form"])
+                changed += len(updated)
+            self.stdout.write(f"{model.__name__}: {changed} of {len(rows)} rows updated")
+        self.stdout.write(self.style.SUCCESS("Recent form rebuilt."))
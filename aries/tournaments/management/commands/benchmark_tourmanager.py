@@ -0,0 +1,199 @@
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tournaments.tourmanager import TourManager, LazyRoundRobin, participant_name
+from tournaments.unit_of_work import NullUnitOfWork
+from scripts.serializer import serializer
+
+
+class Command(BaseCommand):
+    """
+    Times the TourManager engine on synthetic tournaments.
+
+    For every format, size and home/away setting it measures create_tournament, applying single results
+    (the way a result form submission does: a fresh TourManager per result), applying a full first round
+    in one batch, and saving/loading the match data through the document serializer. Elo, stats and history go through a
+    NullUnitOfWork, so no database or history file is touched and only engine cost is measured.
+
+    The report is JSON (one entry per case, times in milliseconds) so runs can be compared with --compare.
+    """
+    help = "Benchmark TourManager create/update/save/load on synthetic tournaments and write a JSON report."
+
+    FORMATS = ["league", "cup", "groups_knockout", "swiss", "double_elim"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="8,64,512,4096", help="Comma-separated participant counts (default: 8,64,512,4096).")
+        parser.add_argument("--formats", default=",".join(self.FORMATS), help="Comma-separated tour types (default: all).")
+        parser.add_argument("--home-away", choices=["both", "yes", "no"], default="both", help="Home/away settings to run (default: both).")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported (default: 3).")
+        parser.add_argument("--samples", type=int, default=50, help="Single results timed per case (default: 50).")
+        parser.add_argument("--seed", type=int, default=1, help="Seed for draws and scores (default: 1).")
+        parser.add_argument("--codec", choices=sorted(serializer.codecs), help="Document codec for save/load (default: settings.DOCUMENT_CODEC).")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="A previous report; prints the ratio of each timing against it.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size]
+        formats = [fmt for fmt in options["formats"].split(",") if fmt]
+        home_away = {"both": [False, True], "yes": [True], "no": [False]}[options["home_away"]]
+        codec = serializer.codec_name(options["codec"])
+
+        cases = []
+        for tour_type in formats:
+            for size in sizes:
+                for home_or_away in home_away:
+                    case = self.run_case(tour_type, size, home_or_away, options["repeat"], options["samples"], options["seed"], codec)
+                    cases.append(case)
+                    self.stderr.write(
+                        f"{tour_type:<16}{size:>6} {'home/away' if home_or_away else 'single':<10}"
+                        f" create {case['create_ms']:>9.2f}ms  result {case['result_ms']:>8.3f}ms"
+                        f"  round {case['round_ms']:>9.2f}ms  save {case['save_ms']:>8.2f}ms  load {case['load_ms']:>8.2f}ms"
+                    )
+
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": options["repeat"],
+                "samples": options["samples"],
+                "seed": options["seed"],
+                "codec": codec,
+            },
+            "cases": cases,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            self.compare(options["compare"], cases)
+
+    # ============================================================================ #
+    #                                     cases                                    #
+    # ============================================================================ #
+    def run_case(self, tour_type, size, home_or_away, repeat, samples, seed, codec):
+        """Times one (format, size, home/away) case and returns its report entry."""
+        names = [f"player{i}" for i in range(size)]
+
+        def manager(data):
+            return TourManager(data, names[:], tour_type, home_or_away, tour_name="benchmark", effects=NullUnitOfWork())
+
+        create, single, full_round, save, load = [], [], [], [], []
+        for run in range(repeat):
+            random.seed(seed + run)
+            start = time.perf_counter()
+            data = manager({}).create_tournament()
+            create.append(time.perf_counter() - start)
+
+            round_number, results = self.first_round_results(tour_type, data, random.Random(seed + run))
+
+            batch_data = copy.deepcopy(data)
+            start = time.perf_counter()
+            manager(batch_data).apply_results(results, round_number=round_number)
+            full_round.append(time.perf_counter() - start)
+
+            single_data = copy.deepcopy(data)
+            timed = results[:samples]
+            start = time.perf_counter()
+            for result in timed:
+                single_data = manager(single_data).apply_results([result], round_number=round_number)
+            if timed:
+                single.append((time.perf_counter() - start) / len(timed))
+
+            with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+                path = handle.name
+            try:
+                start = time.perf_counter()
+                serializer.write(path, batch_data, codec=codec)
+                save.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                serializer.read(path, "tournament")
+                load.append(time.perf_counter() - start)
+                file_bytes = os.path.getsize(path)
+            finally:
+                os.remove(path)
+
+        def ms(values):
+            return round(statistics.median(values) * 1000, 4) if values else None
+
+        return {
+            "format": tour_type,
+            "participants": size,
+            "home_or_away": home_or_away,
+            "round_results": len(results),
+            "file_bytes": file_bytes,
+            "create_ms": ms(create),
+            "result_ms": ms(single),
+            "round_ms": ms(full_round),
+            "save_ms": ms(save),
+            "load_ms": ms(load),
+        }
+
+    @staticmethod
+    def first_round_results(tour_type, data, rng):
+        """
+        Results for every playable match of the first round, as a result form would submit them.
+
+        Returns:
+            tuple: (round_number, results)
+        """
+        def score(knockout):
+            goals_a, goals_b = rng.randint(0, 4), rng.randint(0, 4)
+            if knockout and goals_a == goals_b:
+                goals_a += 1
+            return goals_a, goals_b
+
+        results = []
+        if tour_type in ("league", "swiss"):
+            matches = LazyRoundRobin(data).round_fixtures(1) if "lazy_league" in data else data["fixtures"]["round_1"]
+            for match in matches:
+                goals_a, goals_b = score(False)
+                results.append({"team_a": match["team_a"], "team_b": match["team_b"], "team_a_goals": goals_a, "team_b_goals": goals_b})
+        elif tour_type == "groups_knockout":
+            for group_data in data["group_stages"].values():
+                for match in group_data["fixtures"].get("round_1", []):
+                    goals_a, goals_b = score(False)
+                    results.append({"team_a": match["team_a"], "team_b": match["team_b"], "team_a_goals": goals_a, "team_b_goals": goals_b})
+        else:
+            for match in data["rounds"][0]["matches"]:
+                for leg in match.get("legs", [match]):
+                    team_a, team_b = participant_name(leg["team_a"]), participant_name(leg["team_b"])
+                    if match.get("status") == "complete" or "Bye" in (team_a, team_b):
+                        continue
+                    goals_a, goals_b = score(True)
+                    result = {"team_a": team_a, "team_b": team_b, "team_a_goals": goals_a, "team_b_goals": goals_b}
+                    if "leg_number" in leg:
+                        result["leg_number"] = leg["leg_number"]
+                    results.append(result)
+        return 1, results
+
+    def compare(self, path, cases):
+        """Prints current / previous for every timing of the cases both reports contain."""
+        with open(path, "r") as report_file:
+            previous = {
+                (case["format"], case["participants"], case["home_or_away"]): case
+                for case in json.load(report_file)["cases"]
+            }
+        self.stderr.write(f"Compared with {path} (ratio < 1 is faster):")
+        for case in cases:
+            before = previous.get((case["format"], case["participants"], case["home_or_away"]))
+            if not before:
+                continue
+            ratios = []
+            for field in ("create_ms", "result_ms", "round_ms", "save_ms", "load_ms"):
+                if case[field] and before.get(field):
+                    ratios.append(f"{field[:-3]} {case[field] / before[field]:.2f}x")
+            self.stderr.write(f"  {case['format']:<16}{case['participants']:>6} {'home/away' if case['home_or_away'] else 'single':<10}" + "  ".join(ratios))
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tournaments.match_store import MatchStore
+from tournaments.models import ClanTournament, IndiTournament, Match, Standing
+
+
+class Command(BaseCommand):
+    """
+    Imports the fixtures and tables of existing tournament JSON files into Match, Leg and Standing rows.
+
+    Rows are written through MatchStore, so running it again only touches what changed. With
+    TOURNAMENT_RELATIONAL_STORAGE on, each file is then rewritten to hold only its layout.
+    """
+    help = "Import tournament_clan_*.json and tournament_indi_*.json into the Match/Leg/Standing tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tournament", type=int, help="Only import the tournament with this id.")
+        parser.add_argument("--only", choices=["clans", "players"], help="Import only clan or only individual tournaments.")
+
+    def handle(self, *args, **options):
+        models = []
+        if options["only"] in (None, "clans"):
+            models.append(ClanTournament)
+        if options["only"] in (None, "players"):
+            models.append(IndiTournament)
+
+        for tournament_model in models:
+            tournaments = tournament_model.objects.order_by("pk")
+            if options["tournament"]:
+                tournaments = tournaments.filter(pk=options["tournament"])
+            imported = 0
+            for tournament in tournaments:
+                match_data = tournament.load_match_data_from_file()
+                if not match_data:
+                    continue
+                tournament.match_data = match_data
+                if settings.TOURNAMENT_RELATIONAL_STORAGE:
+                    tournament.save_match_data_to_file()
+                else:
+                    MatchStore(tournament).save(match_data)
+                imported += 1
+                matches = Match.objects.for_tournament(tournament).count()
+                standings = Standing.objects.for_tournament(tournament).count()
+                self.stdout.write(f"  {tournament}: {matches} matches, {standings} standings")
+            self.stdout.write(f"{tournament_model.__name__}: {imported} tournaments imported")
+        self.stdout.write(self.style.SUCCESS("Match rows imported."))
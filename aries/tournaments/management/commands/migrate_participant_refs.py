@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from clans.models import Clans
+from tournaments.models import ClanTournament, IndiTournament
+from tournaments.participants import is_ref
+
+
+class Command(BaseCommand):
+    """
+    Converts tournament match data files from participant names to "user:<pk>"/"clan:<pk>" references.
+
+    Participants are rewritten wherever match data stores them: fixture and bracket sides, winners,
+    table keys, lazy league orders and Swiss byes. "Bye", "Draw", values that are already references
+    and names that no longer match a user or clan are left as they are. Running it twice is harmless.
+    """
+    help = "Rewrite tournament_clan_*.json and tournament_indi_*.json to key participants by id instead of name."
+
+    PARTICIPANT_KEYS = ("team_a", "team_b", "winner")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing any file.")
+
+    def handle(self, *args, **options):
+        clan_refs = {name: f"clan:{pk}" for pk, name in Clans.objects.values_list("pk", "clan_name")}
+        user_refs = {name.lower(): f"user:{pk}" for pk, name in User.objects.values_list("pk", "username")}
+
+        pools = [
+            (ClanTournament, lambda name: clan_refs.get(name)),
+            (IndiTournament, lambda name: user_refs.get(name.lower())),
+        ]
+        for tournament_model, lookup in pools:
+            converted = 0
+            for tournament in tournament_model.objects.order_by("pk"):
+                match_data = tournament.load_match_data_from_file()
+                if not match_data:
+                    continue
+                unknown = set()
+                changed = self.convert(match_data, lookup, unknown)
+                if unknown:
+                    self.stdout.write(self.style.WARNING(f"  {tournament}: no participant named {', '.join(sorted(unknown))}"))
+                if not changed:
+                    continue
+                converted += 1
+                self.stdout.write(f"  {tournament}: {changed} values rewritten")
+                if not options["dry_run"]:
+                    tournament.match_data = match_data
+                    tournament.save_match_data_to_file()
+            self.stdout.write(f"{tournament_model.__name__}: {converted} files converted")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Participant references migrated."))
+
+    # ============================================================================ #
+    #                                  conversion                                  #
+    # ============================================================================ #
+    def convert(self, node, lookup, unknown):
+        """
+        Rewrites participant names in place.
+
+        Args:
+            node: Any part of the match data.
+            lookup (callable): Name -> reference, or None if the name is unknown.
+            unknown (set): Collects names that could not be resolved.
+
+        Returns:
+            int: Number of values rewritten.
+        """
+        def ref_for(value):
+            if not isinstance(value, str) or value in ("Bye", "Draw", "TBD") or is_ref(value):
+                return None
+            ref = lookup(value)
+            if ref is None:
+                unknown.add(value)
+            return ref
+
+        changed = 0
+        if isinstance(node, list):
+            for item in node:
+                changed += self.convert(item, lookup, unknown)
+            return changed
+        if not isinstance(node, dict):
+            return 0
+
+        for key, value in list(node.items()):
+            if key in self.PARTICIPANT_KEYS and isinstance(value, str):
+                ref = ref_for(value)
+                if ref:
+                    node[key] = ref
+                    changed += 1
+            elif key in self.PARTICIPANT_KEYS and isinstance(value, dict):
+                # Bracket sides are {"name": ...}
+                ref = ref_for(value.get("name"))
+                if ref:
+                    value["name"] = ref
+                    changed += 1
+            elif key == "table" and isinstance(value, dict):
+                rows = {}
+                for team, row in value.items():
+                    ref = ref_for(team)
+                    changed += bool(ref)
+                    rows[ref or team] = row
+                node[key] = rows
+            elif key == "order" and isinstance(value, list):
+                for i, team in enumerate(value):
+                    ref = ref_for(team)
+                    if ref:
+                        value[i] = ref
+                        changed += 1
+            elif key == "byes" and isinstance(value, dict):
+                for round_key, team in value.items():
+                    ref = ref_for(team)
+                    if ref:
+                        value[round_key] = ref
+                        changed += 1
+            else:
+                changed += self.convert(value, lookup, unknown)
+        return changed
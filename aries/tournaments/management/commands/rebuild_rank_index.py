@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from tournaments.rank_index import RankIndex
+
+
+class Command(BaseCommand):
+    """
+    Recounts the rank position index (see RankIndex) from PlayerStats/ClanStats.
+
+    The index is kept up to date as results are recorded and stats rows are created, saved or deleted;
+    this repairs it after ratings were changed without going through those paths, e.g. with
+    queryset.update()/bulk_update() or SQL run by hand.
+    """
+    help = "Rebuild the Elo rank position index of players and clans from their stats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=RankIndex.KINDS, help="Rebuild only the players or only the clans index.")
+
+    def handle(self, *args, **options):
+        for kind in RankIndex.KINDS:
+            if options["only"] in (None, kind):
+                RankIndex(kind).rebuild()
+                self.stdout.write(f"{kind}: rebuilt")
+        self.stdout.write(self.style.SUCCESS("Rank index rebuilt."))
@@ -0,0 +1,275 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from clans.models import ClanStats
+from users.models import PlayerStats
+from tournaments.models import ClanTournament, IndiTournament, MatchRecord
+from tournaments.tourmanager import iter_completed_matches
+from tournaments.leaderboard import leaderboard
+from tournaments.rank_index import RankIndex
+from tournaments.unit_of_work import MatchUnitOfWork
+from tournaments.participants import participant_ref
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds PlayerStats/ClanStats (Elo, rank, wins/draws/losses, gd/gf/ga, win_rate) from tournament data.
+
+    Every stats row is reset and the completed matches of all tournaments are replayed in the order they
+    were played, taken from their MatchRecord played_at (see collect_matches), so tournaments that ran at
+    the same time interleave as they did live. Totals are summed in one vectorized pass. Elo depends on order, so matches are cut into batches in which nobody plays twice and each
+    batch is rated with array operations; the result is the same as applying the matches one by one.
+    """
+    help = "Recompute Elo and match stats for players and clans by replaying all tournament results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Show what would change without writing to the database.")
+        parser.add_argument("--only", choices=["players", "clans"], help="Replay only individual or only clan tournaments.")
+        parser.add_argument("--k", type=float, default=32, help="Elo K-factor (default: 32).")
+
+    def handle(self, *args, **options):
+        pools = []
+        if options["only"] in (None, "players"):
+            rows, aliases = self.player_rows()
+            pools.append(("players", IndiTournament, rows, lambda name: aliases.get(str(name).lower(), name)))
+        if options["only"] in (None, "clans"):
+            rows, aliases = self.clan_rows()
+            pools.append(("clans", ClanTournament, rows, lambda name: aliases.get(name, name)))
+
+        for label, tournament_model, rows, key in pools:
+            matches = self.collect_matches(tournament_model, key)
+            changes, replayed, skipped = self.replay(rows, matches, options["k"], key)
+            self.stdout.write(f"{label}: {replayed} matches replayed, {skipped} skipped (unknown participant), {len(changes)} rows changed")
+
+            if options["dry_run"]:
+                for ref, stats, diff in changes:
+                    details = ", ".join(f"{field} {old} -> {new}" for field, old, new in diff)
+                    self.stdout.write(f"  {MatchUnitOfWork.display_name(stats)} ({ref}): {details}")
+            elif changes:
+                with transaction.atomic():
+                    instances = [stats for _, stats, _ in changes]
+                    type(instances[0]).objects.bulk_update(instances, MatchUnitOfWork.STAT_FIELDS, batch_size=500)
+                RankIndex(label).rebuild()
+                leaderboard.invalidate([label])
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Ratings rebuilt."))
+
+    # ============================================================================ #
+    #                                    loading                                   #
+    # ============================================================================ #
+    @staticmethod
+    def player_rows():
+        """
+        Maps "user:<pk>" references to PlayerStats.
+
+        Returns:
+            tuple: (rows, aliases) where aliases maps lower-cased usernames to references, for
+            tournaments that still store names (matched case-insensitively, like TourManager).
+        """
+        rows, aliases = {}, {}
+        for row in PlayerStats.objects.select_related("user_profile__user"):
+            ref = participant_ref(row.user_profile.user)
+            rows[ref] = row
+            aliases[row.user_profile.user.username.lower()] = ref
+        return rows, aliases
+
+    @staticmethod
+    def clan_rows():
+        """Maps "clan:<pk>" references to ClanStats, with clan names as aliases (see player_rows)."""
+        rows, aliases = {}, {}
+        for row in ClanStats.objects.select_related("clan"):
+            ref = participant_ref(row.clan)
+            rows[ref] = row
+            aliases[row.clan.clan_name] = ref
+        return rows, aliases
+
+    @classmethod
+    def collect_matches(cls, tournament_model, key=str):
+        """
+        All completed matches of a tournament model, in the order they were played.
+
+        A match gets the played_at of its MatchRecord: the k-th completed match between two participants
+        in a tournament (in iter_completed_matches order) takes the k-th record of that pair. Records
+        imported without a tournament (migration 0015) are matched on the tournament name. A match with
+        no record takes the time of the match before it in its tournament (or after it, for the first
+        ones); tournaments with no records at all are replayed last. Ties keep tournament and round order.
+
+        Args:
+            tournament_model (Model): IndiTournament or ClanTournament.
+            key (callable): Turns a participant from match data into its reference (see handle).
+
+        Returns:
+            list: Match dicts from iter_completed_matches.
+        """
+        played = cls.played_times(tournament_model, key)
+        timed = []
+        for tournament in tournament_model.objects.order_by("pk"):
+            times = played.get(tournament.pk) or played.get(tournament.name) or {}
+            seen = {}
+            matches = list(iter_completed_matches(tournament.load_match_data_from_file()))
+            stamps = []
+            for match in matches:
+                pair = tuple(sorted((key(match["team_a"]), key(match["team_b"]))))
+                occurrence = seen[pair] = seen.get(pair, -1) + 1
+                pair_times = times.get(pair, [])
+                stamps.append(pair_times[occurrence] if occurrence < len(pair_times) else None)
+            known = [stamp for stamp in stamps if stamp is not None]
+            last = known[0] if known else None
+            for index, (match, stamp) in enumerate(zip(matches, stamps)):
+                last = stamp if stamp is not None else last
+                timed.append(((last is None, last or 0, tournament.pk, index), match))
+        timed.sort(key=lambda item: item[0])
+        return [match for _, match in timed]
+
+    @staticmethod
+    def played_times(tournament_model, key=str):
+        """
+        Played times of recorded matches, one per match (its two records, one per side, share a time).
+
+        Args:
+            tournament_model (Model): IndiTournament or ClanTournament.
+            key (callable): Turns a recorded participant or opponent into its reference.
+
+        Returns:
+            dict: Tournament pk (or, for records without one, tournament name) -> {(ref, ref): [played_at, ...]}
+            with each pair sorted and its times oldest first.
+        """
+        field = "clan_tournament" if tournament_model is ClanTournament else "indi_tournament"
+        records = (
+            MatchRecord.objects.filter(**{f"{field}__isnull": False})
+            | MatchRecord.objects.filter(clan_tournament__isnull=True, indi_tournament__isnull=True)
+        ).order_by("played_at", "id").values_list(f"{field}_id", "tour_name", "participant", "opponent_ref", "played_at")
+        played = {}
+        for tournament_id, tour_name, participant, opponent, played_at in records:
+            times = played.setdefault(tournament_id or tour_name, {}).setdefault(tuple(sorted((key(participant), key(opponent)))), [])
+            if not times or times[-1] != played_at:
+                times.append(played_at)
+        return played
+
+    # ============================================================================ #
+    #                                    replay                                    #
+    # ============================================================================ #
+    def replay(self, rows, matches, k, key=str):
+        """
+        Replays matches over a pool of stats rows.
+
+        Args:
+            rows (dict): Participant reference -> stats instance (every row in the pool is reset).
+            matches (list): Match dicts from iter_completed_matches, in order.
+            k (float): Elo K-factor.
+            key (callable): Turns a participant from match data into a key of rows.
+
+        Returns:
+            tuple: (changes, replayed, skipped) where changes is a list of (ref, stats, [(field, old, new)]).
+        """
+        names = list(rows)
+        position = {name: i for i, name in enumerate(names)}
+
+        team_a, team_b, goals_a, goals_b = [], [], [], []
+        skipped = 0
+        for match in matches:
+            key_a, key_b = key(match["team_a"]), key(match["team_b"])
+            if key_a not in position or key_b not in position or match["team_a_goals"] is None or match["team_b_goals"] is None:
+                skipped += 1
+                continue
+            team_a.append(position[key_a])
+            team_b.append(position[key_b])
+            goals_a.append(match["team_a_goals"])
+            goals_b.append(match["team_b_goals"])
+
+        team_a = np.array(team_a, dtype=np.int64)
+        team_b = np.array(team_b, dtype=np.int64)
+        goals_a = np.array(goals_a, dtype=np.int64)
+        goals_b = np.array(goals_b, dtype=np.int64)
+        totals = self.totals(len(names), team_a, team_b, goals_a, goals_b)
+        elo = self.elo(len(names), team_a, team_b, goals_a, goals_b, k)
+
+        changes = []
+        for name, i in position.items():
+            stats = rows[name]
+            before = {field: getattr(stats, field) for field in MatchUnitOfWork.STAT_FIELDS}
+            for field, values in totals.items():
+                setattr(stats, field, int(values[i]))
+            matches_played = stats.total_matches
+            win_rate = ((stats.total_wins + stats.total_draws / 2) / matches_played) * 100 if matches_played > 0 else 0
+            stats.win_rate = round(win_rate, 3)
+            stats.elo_rating = float(elo[i])
+            if matches_played:
+                stats.set_rank_based_on_elo(commit=False)
+            else:
+                stats.rank = stats._meta.get_field("rank").default
+
+            diff = [
+                (field, before[field], getattr(stats, field))
+                for field in MatchUnitOfWork.STAT_FIELDS
+                if not self.same(before[field], getattr(stats, field))
+            ]
+            if diff:
+                changes.append((name, stats, diff))
+        return changes, len(team_a), skipped
+
+    @staticmethod
+    def same(old, new):
+        if isinstance(old, float) or isinstance(new, float):
+            return old is not None and new is not None and abs(old - new) < 0.005
+        return old == new
+
+    @staticmethod
+    def totals(size, team_a, team_b, goals_a, goals_b):
+        """Order-independent counters (matches, wins, draws, losses, gf, ga, gd) summed with np.add.at."""
+        sides = np.concatenate([team_a, team_b])
+        scored = np.concatenate([goals_a, goals_b])
+        conceded = np.concatenate([goals_b, goals_a])
+
+        def count(values):
+            out = np.zeros(size, dtype=np.int64)
+            np.add.at(out, sides, values)
+            return out
+
+        gf = count(scored)
+        ga = count(conceded)
+        return {
+            "total_matches": count(np.ones_like(sides)),
+            "total_wins": count((scored > conceded).astype(np.int64)),
+            "total_draws": count((scored == conceded).astype(np.int64)),
+            "total_losses": count((scored < conceded).astype(np.int64)),
+            "gf": gf,
+            "ga": ga,
+            "gd": gf - ga,
+        }
+
+    @staticmethod
+    def elo(size, team_a, team_b, goals_a, goals_b, k, start=1200.0):
+        """
+        Sequential Elo over decided matches (draws leave ratings unchanged, as in TourManager).
+
+        Matches are split into consecutive batches where no participant appears twice; within a
+        batch the updates are independent, so each batch is one vectorized step.
+        """
+        ratings = np.full(size, start, dtype=np.float64)
+        decided = goals_a != goals_b
+        winners = np.where(goals_a > goals_b, team_a, team_b)[decided]
+        losers = np.where(goals_a > goals_b, team_b, team_a)[decided]
+
+        start_at, seen = 0, set()
+        bounds = []
+        for i, (w, l) in enumerate(zip(winners.tolist(), losers.tolist())):
+            if w in seen or l in seen:
+                bounds.append((start_at, i))
+                start_at, seen = i, set()
+            seen.add(w)
+            seen.add(l)
+        bounds.append((start_at, len(winners)))
+
+        for lo, hi in bounds:
+            if lo == hi:
+                continue
+            w, l = winners[lo:hi], losers[lo:hi]
+            expected = 1 / (1 + 10 ** ((ratings[l] - ratings[w]) / 400))
+            delta = k * (1 - expected)
+            ratings[w] += delta
+            ratings[l] -= delta
+        return ratings
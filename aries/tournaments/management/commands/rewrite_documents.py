@@ -0,0 +1,54 @@
+import os
+from django.core.management.base import BaseCommand
+from scripts.serializer import serializer, DocumentError
+from tournaments.file_store import file_lock, match_data_cache
+from tournaments.models import ClanTournament, IndiTournament
+
+
+class Command(BaseCommand):
+    """
+    Rewrites tournament files in one codec and the current schema.
+
+    Files are converted on their next save anyway; this does it for every file at once, e.g. after
+    changing DOCUMENT_CODEC. Documents are rewritten as stored (a relational layout stays a layout) and
+    keep their version counter, under the same lock as a versioned save, so nothing a concurrent update
+    has read becomes stale. Match history is kept in MatchRecord rows, not in files.
+    """
+    help = "Rewrite tournament files with the given codec (default: settings.DOCUMENT_CODEC)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--codec", choices=sorted(serializer.codecs), help="Codec to write (default: settings.DOCUMENT_CODEC).")
+
+    def handle(self, *args, **options):
+        codec = serializer.codec_name(options["codec"])
+        for model in (ClanTournament, IndiTournament):
+            rewritten = before = after = 0
+            for instance in model.objects.order_by("pk").iterator():
+                file_path = instance.get_json_file_path()
+                if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+                    continue
+                try:
+                    size = self.rewrite(file_path, codec)
+                except DocumentError as e:
+                    self.stdout.write(self.style.WARNING(f"  {model.__name__} {instance.pk}: skipped, {e}"))
+                    continue
+                rewritten += 1
+                before += size[0]
+                after += size[1]
+            self.stdout.write(f"{model.__name__}: {rewritten} files rewritten, {before} -> {after} bytes")
+        self.stdout.write(self.style.SUCCESS(f"Documents written with the {codec} codec."))
+
+    @staticmethod
+    def rewrite(file_path, codec):
+        """
+        Re-encodes one file.
+
+        Returns:
+            tuple: (bytes before, bytes after)
+        """
+        with file_lock(file_path):
+            before = os.path.getsize(file_path)
+            data = serializer.read(file_path, "tournament")
+            serializer.write(file_path, data, version=data.get("version", 0), codec=codec)
+            match_data_cache.invalidate(file_path)
+            return before, os.path.getsize(file_path)
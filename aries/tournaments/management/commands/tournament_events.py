@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from tournaments.file_store import EventLog, snapshot_version
+from tournaments.models import ClanTournament, IndiTournament
+
+
+class Command(BaseCommand):
+    """
+    Prints a tournament's result event log: who submitted which results, and when.
+
+    Events up to the snapshot's version are already part of the tournament file; later ones are
+    replayed on load. Both are listed, the latter marked as pending.
+    """
+    help = "List the result events logged for a tournament (the audit trail of submitted results)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tournament", type=int, help="Tournament id.")
+        parser.add_argument("--kind", choices=["clans", "players"], default="players", help="Clan or individual tournament (default: players).")
+
+    def handle(self, *args, **options):
+        tournament_model = ClanTournament if options["kind"] == "clans" else IndiTournament
+        tournament = tournament_model.objects.filter(pk=options["tournament"]).first()
+        if tournament is None:
+            raise CommandError(f"No {tournament_model.__name__} with id {options['tournament']}")
+
+        file_path = tournament.get_json_file_path()
+        snapshot = snapshot_version(file_path)
+        events = EventLog(file_path).events()
+        for event in events:
+            results = ", ".join(
+                f"{result.get('team_a')} {result.get('team_a_goals')}-{result.get('team_b_goals')} {result.get('team_b')}"
+                for result in event["results"]
+            )
+            pending = "" if event["version"] <= snapshot else "  (after snapshot)"
+            self.stdout.write(f"v{event['version']:<6}{event['at']}  {event['by'] or '-'}  round {event['round']}: {results}{pending}")
+        self.stdout.write(self.style.SUCCESS(f"{tournament}: {len(events)} events, snapshot at version {snapshot}"))
@@ -0,0 +1,354 @@
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Q
+from .models import ClanTournament, Match, Leg, Standing
+from .tourmanager import LazyRoundRobin, MatchIndex, Standings
+
+
+class MatchStore:
+    """
+    Relational storage for a tournament's fixtures and tables (Match, Leg and Standing rows).
+
+    save() mirrors match data into rows, writing only the rows whose values changed, and returns the
+    layout; given the results of a submission, it reads and compares only the rows those results can
+    have changed (see touched). It returns the layout: the match data with every fixture list, table and lazy league result emptied. When
+    TOURNAMENT_RELATIONAL_STORAGE is on, the JSON file keeps only that layout (marked with LAYOUT_KEY)
+    and load() fills the rows back in, so TourManager gets the same dict whichever storage is used.
+
+    Lazy leagues only have rows for played matches; their pending fixtures are still derived from
+    the participant order.
+    """
+    LAYOUT_KEY = "relational_storage"
+    MATCH_FIELDS = ("team_a", "team_b", "team_a_goals", "team_b_goals", "winner", "status")
+    UPDATE_FIELDS = ["position", *MATCH_FIELDS, "extra"]
+    STANDING_FIELDS = tuple(Standings.new_row())
+    MATCH_KEY = ("stage", "group", "round_number", "match_key")
+    TABLE_KEY = ("stage", "group")
+
+    def __init__(self, tournament):
+        self.tournament = tournament
+        owner_field = "clan_tournament" if isinstance(tournament, ClanTournament) else "indi_tournament"
+        self.owner = {owner_field: tournament}
+
+    @classmethod
+    def is_layout(cls, data):
+        return isinstance(data, dict) and data.get(cls.LAYOUT_KEY) is True
+
+    # ============================================================================ #
+    #                                     write                                    #
+    # ============================================================================ #
+    def save(self, match_data, results=None, round_number=None):
+        """
+        Writes match data to the tournament's rows in one transaction.
+
+        With results, only the rows they can have changed are read and written, after one COUNT checks
+        that the other rows are still the fixtures match_data has. Results that drew new fixtures (a Swiss
+        round, the knockout stage after the groups) fail that check and every row is compared instead.
+
+        Args:
+            match_data (dict): Match data in any TourManager format.
+            results (list, optional): The results just applied to match_data, as given to TourManager.apply_results.
+            round_number (int, optional): Round of the results without a "round" key, as in apply_results.
+
+        Returns:
+            dict: The layout to keep in the JSON file.
+        """
+        matches, standings = self.rows(match_data)
+        with transaction.atomic():
+            keys = tables = None
+            if results is not None:
+                keys, tables = self.touched(match_data, results, round_number)
+                if self.tournament.match_rows.exclude(self._any(keys, self.MATCH_KEY)).count() != len(matches.keys() - keys):
+                    keys = tables = None
+            self._save_matches(matches, keys)
+            self._save_standings(standings, tables)
+        return self.layout(match_data)
+
+    @staticmethod
+    def _any(keys, fields):
+        """Q matching rows whose fields equal any of the key tuples (nothing if keys is empty)."""
+        return reduce(or_, (Q(**dict(zip(fields, key))) for key in keys), Q(pk__in=[]))
+
+    def _save_matches(self, matches, keys=None):
+        rows = self.tournament.match_rows.prefetch_related("legs")
+        if keys is not None:
+            rows = rows.filter(self._any(keys, self.MATCH_KEY))
+            matches = {key: matches[key] for key in keys if key in matches}
+        existing = {(row.stage, row.group, row.round_number, row.match_key): row for row in rows}
+        created, updated = [], []
+        new_legs, updated_legs, removed_legs = [], [], []
+        for key, (fields, legs) in matches.items():
+            row = existing.pop(key, None)
+            if row is None:
+                stage, group, round_number, match_key = key
+                row = Match(stage=stage, group=group, round_number=round_number, match_key=match_key, **self.owner, **fields)
+                created.append((row, legs))
+                continue
+            if self._assign(row, fields):
+                updated.append(row)
+            current = {leg.leg_number: leg for leg in row.legs.all()}
+            for leg_number, leg_fields in legs.items():
+                leg = current.pop(leg_number, None)
+                if leg is None:
+                    new_legs.append(Leg(match=row, leg_number=leg_number, **leg_fields))
+                elif self._assign(leg, leg_fields):
+                    updated_legs.append(leg)
+            removed_legs.extend(leg.pk for leg in current.values())
+
+        if existing:
+            Match.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+        if removed_legs:
+            Leg.objects.filter(pk__in=removed_legs).delete()
+        if created:
+            Match.objects.bulk_create([row for row, _ in created], batch_size=500)
+            for row, legs in created:
+                new_legs.extend(Leg(match=row, leg_number=leg_number, **leg_fields) for leg_number, leg_fields in legs.items())
+        if updated:
+            Match.objects.bulk_update(updated, self.UPDATE_FIELDS, batch_size=500)
+        if new_legs:
+            Leg.objects.bulk_create(new_legs, batch_size=500)
+        if updated_legs:
+            Leg.objects.bulk_update(updated_legs, list(self.MATCH_FIELDS) + ["extra"], batch_size=500)
+
+    def _save_standings(self, standings, tables=None):
+        rows = self.tournament.standing_rows.all()
+        if tables is not None:
+            rows = rows.filter(self._any(tables, self.TABLE_KEY))
+            standings = {key: fields for key, fields in standings.items() if key[:2] in tables}
+        existing = {(row.stage, row.group, row.participant): row for row in rows}
+        created, updated = [], []
+        for key, fields in standings.items():
+            row = existing.pop(key, None)
+            if row is None:
+                stage, group, participant = key
+                created.append(Standing(stage=stage, group=group, participant=participant, **self.owner, **fields))
+            elif self._assign(row, fields):
+                updated.append(row)
+
+        if existing:
+            Standing.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+        if created:
+            Standing.objects.bulk_create(created, batch_size=500)
+        if updated:
+            Standing.objects.bulk_update(updated, ["position", *self.STANDING_FIELDS, "extra"], batch_size=500)
+
+    @staticmethod
+    def touched(match_data, results, round_number=None):
+        """
+        The rows a batch of results can have changed. League and group fixtures are the ones the results
+        name (by round and participant pair). A knockout result can complete its round and fill placeholders
+        further on, so every match of its round is included, with the matches those feed, and so on.
+
+        Returns:
+            tuple: (set of match keys as in rows(), set of tables as (stage, group))
+        """
+        index = MatchIndex(match_data)
+        lazy = LazyRoundRobin(match_data) if "lazy_league" in match_data else None
+        groups = {id(group_data): group for group, group_data in match_data.get("group_stages", {}).items()}
+        keys, tables, knockout_rounds = set(), set(), set()
+        for result in results:
+            number = MatchIndex.round_number(result["round"] if result.get("round") is not None else round_number)
+            pair = MatchIndex.pair(result["team_a"], result["team_b"])
+            match, group_data = index.fixture(number, result["team_a"], result["team_b"])
+            if match is not None:
+                table = ("group", groups[id(group_data)]) if group_data is not None else ("league", "")
+                keys.add((*table, number, str(match["match"])))
+                tables.add(table)
+            if lazy is not None:
+                keys.update(("league", "", number, str(match_number)) for match_number, team_a, team_b in lazy.pairings(number) if MatchIndex.pair(team_a, team_b) == pair)
+                tables.add(("league", ""))
+            if index.knockout(number, result["team_a"], result["team_b"], result.get("leg_number"))[0] is not None:
+                knockout_rounds.add(number)
+
+        if knockout_rounds:
+            round_of = {match["match_id"]: number for number, round_data in index.knockout_rounds.items() for match in round_data["matches"]}
+            routing = match_data.get("routing", {})
+            pending = [match["match_id"] for number in knockout_rounds for match in index.knockout_rounds[number]["matches"]]
+            seen = set()
+            while pending:
+                match_id = pending.pop()
+                if match_id in seen or match_id not in round_of:
+                    continue
+                seen.add(match_id)
+                keys.add(("knockout", "", round_of[match_id], match_id))
+                pending.extend(match["match_id"] for _, match, _ in index.fed_by(match_id))
+                pending.extend(target[1] for target in (routing.get(match_id) or {}).values() if target)
+            tables.add(("knockout", ""))
+        return keys, tables
+
+    @staticmethod
+    def _assign(row, fields):
+        """Sets fields on a row; True if anything changed."""
+        changed = False
+        for field, value in fields.items():
+            if getattr(row, field) != value:
+                setattr(row, field, value)
+                changed = True
+        return changed
+
+    # ============================================================================ #
+    #                                 data -> rows                                 #
+    # ============================================================================ #
+    def rows(self, match_data):
+        """
+        Splits match data into row values.
+
+        Returns:
+            tuple: ({(stage, group, round_number, match_key): (fields, {leg_number: fields})},
+                    {(stage, group, participant): fields})
+        """
+        matches, standings = {}, {}
+
+        def add_fixtures(stage, group, fixtures):
+            for round_key, round_matches in fixtures.items():
+                round_number = int(round_key.split("_")[-1])
+                for position, fixture in enumerate(round_matches):
+                    key = (stage, group, round_number, str(fixture["match"]))
+                    matches[key] = (self._split(fixture, position, "match", dict_sides=False), {})
+
+        def add_rounds(rounds):
+            for round_data in rounds:
+                for position, fixture in enumerate(round_data.get("matches", [])):
+                    key = ("knockout", "", round_data["round_number"], fixture["match_id"])
+                    legs = {leg["leg_number"]: self._split(leg, None, "leg_number") for leg in fixture.get("legs", [])}
+                    matches[key] = (self._split(fixture, position, "match_id"), legs)
+
+        def add_table(stage, group, table):
+            for position, (participant, row) in enumerate(table.items()):
+                fields = {field: row.get(field, 0) for field in self.STANDING_FIELDS}
+                fields["position"] = position
+                fields["extra"] = {k: v for k, v in row.items() if k not in self.STANDING_FIELDS}
+                standings[(stage, group, participant)] = fields
+
+        match_data = match_data or {}
+        if "lazy_league" in match_data:
+            lazy = LazyRoundRobin(match_data)
+            for round_number, fixture in lazy.completed():
+                key = ("league", "", round_number, str(fixture["match"]))
+                # Its place in the round, so recording another result does not move it.
+                position = (fixture["match"] - 1) % lazy.matches_per_round
+                matches[key] = (self._split(fixture, position, "match", dict_sides=False), {})
+        add_fixtures("league", "", match_data.get("fixtures", {}))
+        for group, group_data in match_data.get("group_stages", {}).items():
+            add_fixtures("group", group, group_data.get("fixtures", {}))
+            add_table("group", group, group_data.get("table", {}))
+        knockouts = match_data.get("knock_outs") or {}
+        add_rounds(match_data.get("rounds", []) + knockouts.get("rounds", []))
+        add_table("knockout", "", knockouts.get("table", {}))
+        add_table("league" if "rounds" not in match_data else "knockout", "", match_data.get("table", {}))
+        return matches, standings
+
+    @classmethod
+    def _split(cls, fixture, position, key_field, dict_sides=True):
+        """
+        Column values for a fixture or leg. Keys without a column go to extra; "_absent" lists
+        columns the fixture does not have and "_raw_<field>" keeps a side in an unexpected shape.
+        """
+        fields = {}
+        extra = {k: v for k, v in fixture.items() if k not in cls.MATCH_FIELDS and k not in (key_field, "legs")}
+        absent = []
+        for field in cls.MATCH_FIELDS:
+            if field not in fixture:
+                absent.append(field)
+                fields[field] = "" if field == "status" else None
+                continue
+            value = fixture[field]
+            if field in ("team_a", "team_b"):
+                if dict_sides and isinstance(value, dict) and set(value) == {"name"}:
+                    value = value["name"]
+                elif dict_sides or not (value is None or isinstance(value, str)):
+                    extra[f"_raw_{field}"] = value
+                    value = None
+            fields[field] = value
+        if absent:
+            extra["_absent"] = absent
+        if "legs" in fixture:
+            extra["_legs"] = True
+        fields["extra"] = extra
+        if position is not None:
+            fields["position"] = position
+        return fields
+
+    @classmethod
+    def _join(cls, row, key_field, key, dict_sides=True):
+        """Rebuilds a fixture or leg dict from its row."""
+        fixture = {key_field: key}
+        absent = set(row.extra.get("_absent", ()))
+        for field in cls.MATCH_FIELDS:
+            if field in absent:
+                continue
+            if f"_raw_{field}" in row.extra:
+                fixture[field] = row.extra[f"_raw_{field}"]
+            elif dict_sides and field in ("team_a", "team_b"):
+                fixture[field] = {"name": getattr(row, field)}
+            else:
+                fixture[field] = getattr(row, field)
+        fixture.update({k: v for k, v in row.extra.items() if not k.startswith("_")})
+        return fixture
+
+    @classmethod
+    def layout(cls, match_data):
+        """Match data with fixture lists, tables and lazy league results emptied (nothing else is copied)."""
+        def strip(node):
+            out = {}
+            for key, value in node.items():
+                if key == "fixtures":
+                    out[key] = {round_key: [] for round_key in value}
+                elif key == "rounds":
+                    out[key] = [{**round_data, "matches": []} for round_data in value]
+                elif key in ("table", "results"):
+                    out[key] = {}
+                elif key == "group_stages":
+                    out[key] = {group: strip(group_data) for group, group_data in value.items()}
+                elif key == "knock_outs" and isinstance(value, dict):
+                    out[key] = strip(value)
+                else:
+                    out[key] = value
+            return out
+
+        layout = strip(match_data or {})
+        layout[cls.LAYOUT_KEY] = True
+        return layout
+
+    # ============================================================================ #
+    #                                      read                                    #
+    # ============================================================================ #
+    def load(self, layout):
+        """
+        Fills a layout written by save() back in from the rows.
+
+        Args:
+            layout (dict): The layout from the JSON file; it is filled in place.
+
+        Returns:
+            dict: Complete match data.
+        """
+        match_data = layout
+        match_data.pop(self.LAYOUT_KEY, None)
+        knockouts = match_data.get("knock_outs") or match_data
+        rounds = {round_data["round_number"]: round_data for round_data in knockouts.get("rounds", [])}
+        lazy = "lazy_league" in match_data
+
+        for row in self.tournament.match_rows.prefetch_related("legs"):
+            if row.stage == "knockout":
+                fixture = self._join(row, "match_id", row.match_key)
+                if row.extra.get("_legs"):
+                    fixture["legs"] = [self._join(leg, "leg_number", leg.leg_number) for leg in row.legs.all()]
+                rounds[row.round_number]["matches"].append(fixture)
+            elif lazy and row.stage == "league":
+                match_data.setdefault("results", {})[row.match_key] = [row.team_a_goals, row.team_b_goals]
+            else:
+                holder = match_data if row.stage == "league" else match_data["group_stages"][row.group]
+                fixture = self._join(row, "match", int(row.match_key), dict_sides=False)
+                holder.setdefault("fixtures", {}).setdefault(f"round_{row.round_number}", []).append(fixture)
+
+        for row in self.tournament.standing_rows.all():
+            if row.stage == "group":
+                table = match_data["group_stages"][row.group].setdefault("table", {})
+            elif row.stage == "knockout":
+                table = knockouts.setdefault("table", {})
+            else:
+                table = match_data.setdefault("table", {})
+            table[row.participant] = {**{field: getattr(row, field) for field in self.STANDING_FIELDS}, **row.extra}
+        return match_data
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0009_alter_inditournament_logo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clantournament',
+            name='tour_type',
+            field=models.CharField(choices=[('league', 'League'), ('cup', 'Cup'), ('groups_knockout', 'Groups + Knockout'), ('swiss', 'Swiss')], max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='inditournament',
+            name='tour_type',
+            field=models.CharField(choices=[('league', 'League'), ('cup', 'Cup'), ('groups_knockout', 'Groups + Knockout'), ('swiss', 'Swiss')], max_length=100),
+        ),
+    ]
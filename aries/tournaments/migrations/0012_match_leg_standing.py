@@ -0,0 +1,123 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0011_add_double_elim_tour_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('league', 'League'), ('group', 'Group'), ('knockout', 'Knockout')], max_length=20)),
+                ('group', models.CharField(blank=True, default='', max_length=50)),
+                ('round_number', models.PositiveIntegerField()),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('match_key', models.CharField(max_length=32)),
+                ('team_a', models.CharField(blank=True, max_length=255, null=True)),
+                ('team_b', models.CharField(blank=True, max_length=255, null=True)),
+                ('team_a_goals', models.IntegerField(blank=True, null=True)),
+                ('team_b_goals', models.IntegerField(blank=True, null=True)),
+                ('winner', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(blank=True, default='pending', max_length=20)),
+                ('extra', models.JSONField(blank=True, default=dict)),
+                ('clan_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='match_rows', to='tournaments.clantournament')),
+                ('indi_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='match_rows', to='tournaments.inditournament')),
+            ],
+            options={
+                'ordering': ['stage', 'group', 'round_number', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Leg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leg_number', models.PositiveSmallIntegerField()),
+                ('team_a', models.CharField(blank=True, max_length=255, null=True)),
+                ('team_b', models.CharField(blank=True, max_length=255, null=True)),
+                ('team_a_goals', models.IntegerField(blank=True, null=True)),
+                ('team_b_goals', models.IntegerField(blank=True, null=True)),
+                ('winner', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(blank=True, default='pending', max_length=20)),
+                ('extra', models.JSONField(blank=True, default=dict)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legs', to='tournaments.match')),
+            ],
+            options={
+                'ordering': ['match', 'leg_number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Standing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('league', 'League'), ('group', 'Group'), ('knockout', 'Knockout')], max_length=20)),
+                ('group', models.CharField(blank=True, default='', max_length=50)),
+                ('participant', models.CharField(max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('matches_played', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('draws', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('goals_scored', models.IntegerField(default=0)),
+                ('goals_conceded', models.IntegerField(default=0)),
+                ('goal_difference', models.IntegerField(default=0)),
+                ('extra', models.JSONField(blank=True, default=dict)),
+                ('clan_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='standing_rows', to='tournaments.clantournament')),
+                ('indi_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='standing_rows', to='tournaments.inditournament')),
+            ],
+            options={
+                'ordering': ['stage', 'group', 'position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['clan_tournament', 'stage', 'round_number'], name='tournaments_clan_to_7ba94e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['indi_tournament', 'stage', 'round_number'], name='tournaments_indi_to_ce5b71_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team_a', 'status'], name='tournaments_team_a_56559d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team_b', 'status'], name='tournaments_team_b_f2f9de_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['status'], name='tournaments_status_7d43fe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leg',
+            index=models.Index(fields=['team_a', 'status'], name='tournaments_team_a_9f37fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leg',
+            index=models.Index(fields=['team_b', 'status'], name='tournaments_team_b_da9cd7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leg',
+            unique_together={('match', 'leg_number')},
+        ),
+        migrations.AddIndex(
+            model_name='standing',
+            index=models.Index(fields=['clan_tournament', 'stage', 'group', 'position'], name='tournaments_clan_to_98aa97_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='standing',
+            index=models.Index(fields=['indi_tournament', 'stage', 'group', 'position'], name='tournaments_indi_to_5018e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='standing',
+            index=models.Index(fields=['participant'], name='tournaments_partici_a7406d_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0012_match_leg_standing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clantournament',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the completed tournament was frozen into its archive (see TournamentArchive).', null=True),
+        ),
+        migrations.AddField(
+            model_name='inditournament',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the completed tournament was frozen into its archive (see TournamentArchive).', null=True),
+        ),
+    ]
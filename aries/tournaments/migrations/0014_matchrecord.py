@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0013_tournament_archived_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant', models.CharField(max_length=255)),
+                ('opponent', models.CharField(blank=True, default='', max_length=255)),
+                ('opponent_ref', models.CharField(blank=True, default='', max_length=255)),
+                ('tour_name', models.CharField(blank=True, default='', max_length=255)),
+                ('result', models.CharField(choices=[('win', 'Win'), ('loss', 'Loss'), ('draw', 'Draw')], max_length=10)),
+                ('goals_for', models.IntegerField(default=0)),
+                ('goals_against', models.IntegerField(default=0)),
+                ('played_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('clan_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='match_records', to='tournaments.clantournament')),
+                ('indi_tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='match_records', to='tournaments.inditournament')),
+            ],
+            options={
+                'ordering': ['-played_at', '-id'],
+                'indexes': [models.Index(fields=['participant', '-played_at', '-id'], name='tournaments_partici_28c659_idx'), models.Index(fields=['participant', 'opponent_ref', '-played_at'], name='tournaments_partici_5f0376_idx')],
+            },
+        ),
+    ]
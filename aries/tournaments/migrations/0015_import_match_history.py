@@ -0,0 +1,81 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:54
+
+import os
+from datetime import datetime, timezone
+from django.conf import settings
+from django.db import migrations
+from scripts.serializer import serializer, DocumentError
+
+
+def parse_date(value):
+    """History files wrote timezone.now() as "%Y-%m-%d %H:%M:%S" in UTC."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_score(value):
+    try:
+        goals_for, goals_against = (int(goals) for goals in str(value).split(":"))
+        return goals_for, goals_against
+    except ValueError:
+        return 0, 0
+
+
+def import_match_history(apps, schema_editor):
+    """
+    Copies every entry of the match_data/{player|clan}_match_data_<stats pk>.json files into MatchRecord,
+    in file order so records played in the same second keep their order by id. The files are left on
+    disk; they are removed with their stats row.
+    """
+    MatchRecord = apps.get_model("tournaments", "MatchRecord")
+    PlayerStats = apps.get_model("users", "PlayerStats")
+    ClanStats = apps.get_model("clans", "ClanStats")
+    directory = os.path.join(settings.MEDIA_ROOT, "match_data")
+    sources = [
+        (PlayerStats.objects.values_list("pk", "user_profile__user_id"), "player_match_data_{}.json", "user:{}"),
+        (ClanStats.objects.values_list("pk", "clan_id"), "clan_match_data_{}.json", "clan:{}"),
+    ]
+
+    records = []
+    for rows, file_name, ref in sources:
+        for stats_pk, participant_pk in rows:
+            try:
+                history = serializer.read(os.path.join(directory, file_name.format(stats_pk)), "history")
+            except DocumentError:
+                continue
+            for entry in history.get("matches", []):
+                if not isinstance(entry, dict) or entry.get("result") not in ("win", "loss", "draw"):
+                    continue
+                goals_for, goals_against = parse_score(entry.get("score"))
+                records.append(MatchRecord(
+                    participant=ref.format(participant_pk),
+                    opponent=entry.get("opponent") or "",
+                    opponent_ref=entry.get("opponent_ref") or "",
+                    tour_name=entry.get("tour_name") or "",
+                    result=entry["result"],
+                    goals_for=goals_for,
+                    goals_against=goals_against,
+                    played_at=parse_date(entry.get("date")) or datetime.now(timezone.utc),
+                ))
+    MatchRecord.objects.bulk_create(records, batch_size=1000)
+
+
+def remove_imported_history(apps, schema_editor):
+    """Imported records are the ones without a tournament (the files only kept its name)."""
+    MatchRecord = apps.get_model("tournaments", "MatchRecord")
+    MatchRecord.objects.filter(clan_tournament__isnull=True, indi_tournament__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0014_matchrecord'),
+        ('users', '0007_alter_sociallink_options_and_more'),
+        ('clans', '0007_alter_clansociallink_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(import_match_history, remove_imported_history),
+    ]
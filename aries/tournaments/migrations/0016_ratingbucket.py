@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+# Copied from tournaments.rank_index as of this migration, so it does not depend on the app's current code.
+ELO_BUCKETS = 4096
+
+
+def build_tree(ratings):
+    tree = [0] * (ELO_BUCKETS + 1)
+    for elo in ratings:
+        tree[min(max(int(round(elo, 6)), 0), ELO_BUCKETS - 1) + 1] += 1
+    for node in range(1, ELO_BUCKETS + 1):
+        parent = node + (node & -node)
+        if parent <= ELO_BUCKETS:
+            tree[parent] += tree[node]
+    return {node: tree[node] for node in range(1, ELO_BUCKETS + 1)}
+
+
+def build_rank_index(apps, schema_editor):
+    """Counts the current ratings into the tree, so every node row exists before the first update."""
+    RatingBucket = apps.get_model("tournaments", "RatingBucket")
+    sources = [
+        ("players", apps.get_model("users", "PlayerStats")),
+        ("clans", apps.get_model("clans", "ClanStats")),
+    ]
+    for kind, model in sources:
+        tree = build_tree(model.objects.values_list("elo_rating", flat=True))
+        RatingBucket.objects.bulk_create(
+            [RatingBucket(kind=kind, node=node, count=count) for node, count in tree.items()],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0015_import_match_history'),
+        ('users', '0009_elo_rating_index'),
+        ('clans', '0009_elo_rating_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('players', 'Players'), ('clans', 'Clans')], max_length=10)),
+                ('node', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'node'), name='unique_rating_bucket_node')],
+            },
+        ),
+        migrations.RunPython(build_rank_index, migrations.RunPython.noop),
+    ]
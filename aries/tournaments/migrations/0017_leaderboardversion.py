@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:11
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    LeaderboardVersion = apps.get_model("tournaments", "LeaderboardVersion")
+    LeaderboardVersion.objects.bulk_create([LeaderboardVersion(kind=kind) for kind in ("players", "clans")])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0016_ratingbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('players', 'Players'), ('clans', 'Clans')], max_length=10, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
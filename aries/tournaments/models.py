@@ -3,20 +3,205 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from clans.models import Clans
 from users.models import Profile
-from .tourmanager import TourManager
-import os,json
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .tourmanager import TourManager, MatchIndex
+from .participants import participant_ref
+from .unit_of_work import MatchUnitOfWork, NullUnitOfWork, FORM_LETTERS
+from .file_store import write_versioned, data_version, VersionConflict, match_data_cache, EventLog, VERSION_KEY, LOG_OFFSET_KEY, rollback_on_error
+from .round_shards import RoundShards, ShardMissing
+from .archive import TournamentArchive
+import os,random,secrets,time
 from datetime import timedelta
 from django.utils import timezone
 from PIL import Image
 from scripts.error_handle import ErrorHandler
+from scripts.serializer import serializer, DocumentError
 
 # Create your models here.
+def read_match_data(tournament, data):
+    """
+    Completes file data from the Match/Standing rows when the file only holds the layout (see MatchStore),
+    or from the round shards when it only holds the header (see RoundShards).
+    """
+    from .match_store import MatchStore
+    if MatchStore.is_layout(data):
+        data = MatchStore(tournament).load(data)
+    elif RoundShards.is_sharded(data):
+        data = RoundShards(tournament.get_json_file_path()).join(data)
+    return replay_events(tournament, data)
+
+def replay_events(tournament, match_data):
+    """
+    Applies the result events logged after the snapshot in match_data (see EventLog). Their Elo, stats
+    and history were written when they were recorded, so they are replayed through a NullUnitOfWork.
+    """
+    log = EventLog(tournament.get_json_file_path())
+    if not log.size():
+        return match_data
+    version = data_version(match_data)
+    events = [event for event in log.events(match_data.get(LOG_OFFSET_KEY, 0)) if event[VERSION_KEY] > version]
+    if not events:
+        return match_data
+    team_refs = tournament.get_team_refs()
+    for event in events:
+        tour_manager = TourManager(json_data=match_data, teams_names=team_refs, tournament_type=tournament.tour_type, home_or_away=tournament.home_or_away, tour_name=tournament.name, effects=NullUnitOfWork())
+        match_data = tour_manager.apply_results(event["results"], round_number=event.get("round"), KO=event.get("KO"), seed=event.get("seed"))
+        match_data[VERSION_KEY] = event[VERSION_KEY]
+    return match_data
+
+def write_match_data(tournament, match_data, event=None):
+    """
+    Returns what the JSON file should hold: the match data itself, or with TOURNAMENT_RELATIONAL_STORAGE on,
+    its layout after the fixtures and tables are written to Match/Leg/Standing rows (only the rows the results
+    of event can have changed, when match_data is the state after it). With TOURNAMENT_ROUND_SHARDS on, league
+    and Swiss fixtures are written to per-round shards and the file holds the header.
+    """
+    if getattr(settings, "TOURNAMENT_RELATIONAL_STORAGE", False):
+        from .match_store import MatchStore
+        if event is not None:
+            return MatchStore(tournament).save(match_data, event["results"], event.get("round"))
+        return MatchStore(tournament).save(match_data)
+    if getattr(settings, "TOURNAMENT_ROUND_SHARDS", False) and RoundShards.can_shard(match_data):
+        return RoundShards(tournament.get_json_file_path()).split(match_data)
+    return match_data
+
+# A save removes shards two headers old; a read that loses that race reads the new header instead.
+SHARD_READ_RETRIES = 3
+
+def load_match_document(tournament, file_path):
+    """Complete match data for a tournament file, through match_data_cache."""
+    for attempt in range(SHARD_READ_RETRIES):
+        try:
+            return match_data_cache.load(file_path, lambda document_file: read_match_data(tournament, serializer.loads(document_file.read(), "tournament")))
+        except ShardMissing:
+            if attempt == SHARD_READ_RETRIES - 1:
+                raise
+
+def load_match_header(tournament):
+    """
+    The tournament file as stored, without reading round shards (see RoundShards.round_fixtures for
+    a single round). Relational layouts are completed, since they hold no fixtures of their own.
+    Results logged after the snapshot are replayed onto it (see replay_header_events).
+    """
+    from .match_store import MatchStore
+    try:
+        data = serializer.read(tournament.get_json_file_path(), "tournament")
+    except DocumentError as e:
+        ErrorHandler().handle(e, context='Invalid tournament file header')
+        return {}
+    if MatchStore.is_layout(data):
+        return MatchStore(tournament).load(data)
+    if EventLog(tournament.get_json_file_path()).last_version() > data_version(data):
+        return replay_header_events(tournament, data)
+    return data
+
+def replay_header_events(tournament, header):
+    """
+    Brings a header up to date with the events logged after it, reading only the shards of the rounds
+    those events changed. The replayed rounds are kept in their shard entries (see RoundShards.read_shard)
+    and their pending counts updated, so the table, the round tabs and those rounds are current.
+
+    Events that add a round (a Swiss round drawn when the previous one completes) are always followed
+    by a snapshot (see apply_results_with_retry), so the other rounds are never needed: they are left
+    empty, which also stops update_swiss from drawing a round again.
+    """
+    if not RoundShards.is_sharded(header):
+        return replay_events(tournament, header)
+    log = EventLog(tournament.get_json_file_path())
+    events = [event for event in log.events(header.get(LOG_OFFSET_KEY, 0)) if event[VERSION_KEY] > data_version(header)]
+    if any(event.get("round") is None for event in events):
+        return load_match_document(tournament, tournament.get_json_file_path())
+    shards = RoundShards(tournament.get_json_file_path())
+    touched = {f"round_{MatchIndex.round_number(event['round'])}" for event in events}
+    entries = header[RoundShards.SHARDS_KEY]
+    header["fixtures"] = {key: shards.read_shard(shard) if key in touched else [] for key, shard in entries.items()}
+    header = replay_events(tournament, header)
+    for key in touched & set(entries):
+        fixtures = header["fixtures"][key]
+        entries[key] = {**entries[key], "pending": sum(match.get("status") != "complete" for match in fixtures), "fixtures": fixtures}
+    header.pop("fixtures")
+    return header
+
+def save_tournament_file(tournament, file_path, expected_version=None, event=None, snapshot=False):
+    """
+    Writes tournament.match_data as a snapshot, or appends event to its log (see save_match_data_to_file).
+    snapshot forces a snapshot for an event, e.g. one that drew a new Swiss round (see replay_header_events).
+    """
+    build = lambda data: write_match_data(tournament, data, event)
+    if event is None or not getattr(settings, "TOURNAMENT_EVENT_LOG", False):
+        return write_versioned(file_path, tournament.match_data, build, expected_version)
+    # Match rows are only written with a snapshot, so relational storage snapshots every event.
+    if snapshot or getattr(settings, "TOURNAMENT_RELATIONAL_STORAGE", False):
+        snapshot_every = 1
+    else:
+        snapshot_every = getattr(settings, "TOURNAMENT_SNAPSHOT_EVERY", 20)
+    return EventLog(file_path).append(tournament.match_data, event, build, expected_version, snapshot_every)
+
+# How many times a result submission is re-applied when another worker saved the tournament first.
+UPDATE_RETRIES = 8
+UPDATE_RETRY_DELAY = 0.02  # seconds; doubled (with jitter) after every conflict
+
+def apply_results_with_retry(tournament, round_number, match_results, KO=None, entered_by=None):
+    """
+    Loads the tournament's match data, applies results and saves it with a compare-and-swap on its version.
+
+    If another process saved in between, the Elo/stats changes are rolled back and the results are
+    applied again to the fresh data after a short randomized backoff. Stats and the file are written in one transaction, so a result
+    is counted exactly once: if the file cannot be written the stats are rolled back and the error is raised, and if the
+    transaction fails to commit the file write is undone (see rollback_on_error). The submission is saved as a result event
+    (see save_match_data_to_file).
+
+    Args:
+        entered_by (User, optional): Who submitted the results, recorded in the event log.
+
+    Returns:
+        dict: The saved match data, or {} if the tournament is (or meanwhile got) archived.
+
+    Raises:
+        VersionConflict: If every attempt lost the race.
+        Exception: Whatever made the file write fail; nothing was saved.
+    """
+    team_refs = tournament.get_team_refs()
+    event = {
+        "at": timezone.now().isoformat(),
+        "by": participant_ref(entered_by) if entered_by is not None else None,
+        "round": round_number,
+        "KO": KO,
+        "results": [dict(result) for result in match_results],
+        "seed": secrets.randbits(32),
+    }
+    for attempt in range(UPDATE_RETRIES):
+        # A tournament archived since it was loaded (possibly the save we lost the race to) takes no results;
+        # its live file is gone and would read as an empty tournament.
+        tournament.refresh_from_db(fields=["archived_at"])
+        if tournament.archived_at:
+            return {}
+        tournament.match_data = tournament.load_match_data_from_file()
+        version = data_version(tournament.match_data)
+        rounds = len(tournament.match_data.get("fixtures", {}))
+        effects = MatchUnitOfWork(tournament=tournament)
+        tour_manager = TourManager(json_data=tournament.match_data, teams_names=team_refs, tournament_type=tournament.tour_type, home_or_away=tournament.home_or_away, tour_name=tournament.name, effects=effects)
+        match_data = tour_manager.apply_results(match_results, round_number=round_number, KO=KO, commit=False, seed=event["seed"])
+        tournament.match_data = match_data
+        try:
+            # The file is written before the transaction commits, under the lock; if the commit fails it is put back.
+            with rollback_on_error(tournament.get_json_file_path()), transaction.atomic():
+                effects.commit()
+                tournament.save_match_data_to_file(expected_version=version, event=event, snapshot=len(match_data.get("fixtures", {})) != rounds)
+            return match_data
+        except VersionConflict:
+            effects.discard()
+            time.sleep(random.uniform(0, UPDATE_RETRY_DELAY * 2 ** attempt))
+    raise VersionConflict(f"{tournament} was updated concurrently {UPDATE_RETRIES} times in a row")
+
 class ClanTournament(models.Model):
     """
     Represents a clan-based tournament in the system.
     Stores tournament metadata (name, description, format, teams, etc.), manages match schedules/results via JSON files, and handles related file cleanup.
     """
-    TOUR_CHOICES = [('league', 'League'),('cup', 'Cup'),('groups_knockout', 'Groups + Knockout')]
+    TOUR_CHOICES = [('league', 'League'),('cup', 'Cup'),('groups_knockout', 'Groups + Knockout'),('swiss', 'Swiss'),('double_elim', 'Double Elimination')]
     PLAYER_MODE_CHOICES = [('fixed', 'Fixed'), ('dynamic', 'Dynamic')]
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -30,6 +215,7 @@ class ClanTournament(models.Model):
     )
     logo = models.ImageField(default="tours-defualt.jpg", upload_to='tour_logos')
     tour_type = models.CharField(max_length=100, choices=TOUR_CHOICES)
+    archived_at = models.DateTimeField(null=True, blank=True, help_text="Set when the completed tournament was frozen into its archive (see TournamentArchive).")
     
 
     
@@ -45,7 +231,8 @@ class ClanTournament(models.Model):
     
     def load_match_data_from_file(self):
         """
-        Loads match data from the JSON file.
+        Loads match data from the JSON file, served from the process-level match_data_cache while the file is unchanged.
+        Archived tournaments are read from their archive.
 
         Returns:
             A dictionary containing the match data, or an empty dict if file doesnt exist or is invalid."""
@@ -54,31 +241,40 @@ class ClanTournament(models.Model):
             if not file_path:
                 return {}
 
-            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                with open(file_path, 'r') as json_file:
-                    try:
-                        return json.load(json_file)
-                    except json.JSONDecodeError as e:
-                        ErrorHandler().handle(e, context='Invalid JSON in clan match file')
+            try:
+                if self.archived_at:
+                    return TournamentArchive(self).match_data()
+                return load_match_document(self, file_path)
+            except DocumentError as e:
+                ErrorHandler().handle(e, context='Invalid clan match file')
         except Exception as e:
             ErrorHandler().handle(e, context='Loading match data from file')
 
         return {}
         
-    def save_match_data_to_file(self):
+    def save_match_data_to_file(self, expected_version=None, event=None, snapshot=False):
         """
-        Saves the provided match data to the tournament's JSON file.
+        Saves self.match_data to the tournament's JSON file atomically and bumps its version.
 
         Args:
-            match_data (dict): Dictionary containing tournament matches and related data.
+            expected_version (int, optional): Version the data was loaded at; raises VersionConflict if the file has changed since.
+            event (dict, optional): The result event that produced self.match_data. With TOURNAMENT_EVENT_LOG on it is
+                appended to the event log instead, and the file is only rewritten every TOURNAMENT_SNAPSHOT_EVERY events.
+            snapshot (bool): Rewrite the file for this event even if no snapshot is due (the event added a round).
+
+        Raises:
+            VersionConflict: If the file changed since expected_version.
+            Exception: Any other write failure is logged and raised again, so a caller saving inside a
+                transaction (apply_results_with_retry) rolls back the stats it wrote with it.
         """
         try:
             file_path = self.get_json_file_path()
-            #self.match_data = self.load_match_data_from_file()
-            with open(file_path, 'w') as json_file:
-                json.dump(self.match_data, json_file)
+            save_tournament_file(self, file_path, expected_version, event, snapshot)
+        except VersionConflict:
+            raise
         except Exception as e:
             ErrorHandler().handle(e,context='Save Fail for tour data')
+            raise
 
     def delete(self, *args, **kwargs):
         """
@@ -88,8 +284,13 @@ class ClanTournament(models.Model):
         """
         try:
             file_path = self.get_json_file_path()
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            for path in (file_path, f"{file_path}.lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+            RoundShards(file_path).remove()
+            EventLog(file_path).remove()
+            TournamentArchive(self).remove()
+            match_data_cache.invalidate(file_path)
         except Exception as e:
             ErrorHandler().handle(e, context=f"Error deleting JSON file for tournament {self.name}")
         finally:
@@ -103,6 +304,10 @@ class ClanTournament(models.Model):
         """Returns a list of clan names for the participating teams"""
         return [team.clan_name for team in self.teams.all()]
 
+    def get_team_refs(self):
+        """Returns the match data references ("clan:<pk>") of the participating teams"""
+        return [participant_ref(team) for team in self.teams.all()]
+
     def toggle_player_mode(self):
         """Switches player_mode between dynamic and fixed and saves the change"""
         try:
@@ -115,10 +320,12 @@ class ClanTournament(models.Model):
         """
         Generates the match schedule for the clan tournament using TourManager.
 
-        Fails if no teams are registered or if matches already exist.
+        Fails if no teams are registered or if matches already exist. Archived tournaments are left as they are.
         """
+        if self.archived_at:
+            return
         try:
-            team_names = self.get_team_names()
+            team_names = self.get_team_refs()
             self.match_data = self.load_match_data_from_file()
            
             tour_manager = TourManager(
@@ -135,36 +342,26 @@ class ClanTournament(models.Model):
             ErrorHandler().handle(e, context="Creating Clan tournament matches")
 
 
-    def update_tour(self, round_number, match_results, KO=None):
+    def update_tour(self, round_number, match_results, KO=None, entered_by=None):
         """
         Updates the match results for the given round, handling the specific tournament type (league, knockout, or groups + knockout).
+        A whole matchday (or several rounds) can be submitted at once: results carrying their own "round"
+        are applied in one pass with the file loaded and saved once. Concurrent updates are retried (see apply_results_with_retry).
 
         Args:
-            round_number: The round being updated.
+            round_number: The round being updated, used for results without a "round" key.
             match_results: List of match results.
             KO: Knockout stage ID (for groups_knockout format).
+            entered_by: The User submitting the results, recorded in the result event log.
 
         Returns:
-            Updated match data dict.
+            Updated match data dict, or an empty dict for an archived tournament (its results are final).
         """
+        match_data = {}
+        if self.archived_at:
+            return match_data
         try:
-            team_names = self.get_team_names()
-            match_data = self.load_match_data_from_file()
-            tour_manager = TourManager(json_data=match_data, teams_names=team_names, tournament_type=self.tour_type,home_or_away=self.home_or_away,tour_name= self.name)
-            if self.tour_type == "league":
-                match_data = tour_manager.update_league(round_number, match_results)
-            elif self.tour_type == "cup":
-                match_data = tour_manager.update_knockout(round_number, match_results)
-            elif self.tour_type == "groups_knockout":
-                if KO:
-                    match_data = tour_manager.update_knockout_stage(round_number,match_results)
-                else:
-                    match_data = tour_manager.update_groups_stages(round_number,match_results)
-            else:
-                raise ValueError(f"Invalid tournament type: {self.tour_type}")
-
-            self.save_match_data_to_file(match_data)
-            
+            match_data = apply_results_with_retry(self, round_number, match_results, KO=KO, entered_by=entered_by)
         except Exception as e:
             ErrorHandler().handle(e,context='Update macthes error')
             if settings.DEBUG:
@@ -197,7 +394,7 @@ class IndiTournament(models.Model):
     Represents a individual-based tournament in the system.
     Stores tournament metadata (name, description, format, teams, etc.), manages match schedules/results via JSON files, and handles related file cleanup.
     """
-    TOUR_CHOICES = [('league', 'League'),('cup', 'Cup'),('groups_knockout', 'Groups + Knockout')]
+    TOUR_CHOICES = [('league', 'League'),('cup', 'Cup'),('groups_knockout', 'Groups + Knockout'),('swiss', 'Swiss'),('double_elim', 'Double Elimination')]
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -209,6 +406,7 @@ class IndiTournament(models.Model):
         default=False,
         help_text="Select if this tournament is played home/away format.",
     )
+    archived_at = models.DateTimeField(null=True, blank=True, help_text="Set when the completed tournament was frozen into its archive (see TournamentArchive).")
     def __str__(self):
         return self.name
     
@@ -216,6 +414,10 @@ class IndiTournament(models.Model):
         """Extract team names from the related teams."""
         return [team.user.username for team in self.players.all()]
 
+    def get_team_refs(self):
+        """Returns the match data references ("user:<pk>") of the participating players."""
+        return [participant_ref(profile) for profile in self.players.all()]
+
     def get_json_file_path(self):
         """Returns the absolute path to the JSON file storing match data for this tournament."""
         try:
@@ -227,20 +429,34 @@ class IndiTournament(models.Model):
         finally:
             return os.path.join(directory, f'tournament_indi_{self.pk}.json')
 
-    def save_match_data_to_file(self):
+    def save_match_data_to_file(self, expected_version=None, event=None, snapshot=False):
         """
-        Saves the provided match data to the tournament's JSON file.
+        Saves self.match_data to the tournament's JSON file atomically and bumps its version.
+
+        Args:
+            expected_version (int, optional): Version the data was loaded at; raises VersionConflict if the file has changed since.
+            event (dict, optional): The result event that produced self.match_data. With TOURNAMENT_EVENT_LOG on it is
+                appended to the event log instead, and the file is only rewritten every TOURNAMENT_SNAPSHOT_EVERY events.
+            snapshot (bool): Rewrite the file for this event even if no snapshot is due (the event added a round).
+
+        Raises:
+            VersionConflict: If the file changed since expected_version.
+            Exception: Any other write failure is logged and raised again, so a caller saving inside a
+                transaction (apply_results_with_retry) rolls back the stats it wrote with it.
         """
         try:
             file_path = self.get_json_file_path()
-            with open(file_path, 'w') as json_file:
-                json.dump(self.match_data, json_file)
+            save_tournament_file(self, file_path, expected_version, event, snapshot)
+        except VersionConflict:
+            raise
         except Exception as e:
             ErrorHandler().handle(e,context='Save Fail for tour data')
+            raise
     
     def load_match_data_from_file(self):
         """
-        Loads match data from the JSON file.
+        Loads match data from the JSON file, served from the process-level match_data_cache while the file is unchanged.
+        Archived tournaments are read from their archive.
 
         Returns:
             A dictionary containing the match data, or an empty dict if file doesnt exist or is invalid."""
@@ -249,12 +465,12 @@ class IndiTournament(models.Model):
             if not file_path:
                 return {}
 
-            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                with open(file_path, 'r') as json_file:
-                    try:
-                        return json.load(json_file)
-                    except json.JSONDecodeError as e:
-                        ErrorHandler().handle(e, context='Invalid JSON in clan match file')
+            try:
+                if self.archived_at:
+                    return TournamentArchive(self).match_data()
+                return load_match_document(self, file_path)
+            except DocumentError as e:
+                ErrorHandler().handle(e, context='Invalid indi match file')
         except Exception as e:
             ErrorHandler().handle(e, context='Loading match data from file')
 
@@ -268,8 +484,13 @@ class IndiTournament(models.Model):
         """
         try:
             file_path = self.get_json_file_path()
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            for path in (file_path, f"{file_path}.lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+            RoundShards(file_path).remove()
+            EventLog(file_path).remove()
+            TournamentArchive(self).remove()
+            match_data_cache.invalidate(file_path)
         except Exception as e:
             ErrorHandler().handle(e, context=f"Error deleting JSON file for tournament {self.name}")
         finally:
@@ -282,10 +503,12 @@ class IndiTournament(models.Model):
         """
         Generates the match schedule for the individual tournament using TourManager.
 
-        Fails if no teams are registered or if matches already exist.
+        Fails if no teams are registered or if matches already exist. Archived tournaments are left as they are.
         """
+        if self.archived_at:
+            return
         try:
-            team_names = self.get_team_names()
+            team_names = self.get_team_refs()
             self.match_data = self.load_match_data_from_file()
             tour_manager = TourManager(json_data=self.match_data, teams_names=team_names,home_or_away=self.home_or_away, tournament_type=self.tour_type,tour_name=self.name)
             matches = tour_manager.create_tournament()
@@ -317,35 +540,26 @@ class IndiTournament(models.Model):
             img.thumbnail(output_size)
             img.save(self.logo.path)
 
-    def update_tour(self, round_number, match_results, KO=None):
+    def update_tour(self, round_number, match_results, KO=None, entered_by=None):
         """
         Updates the match results for the given round, handling the specific tournament type (league, knockout, or groups + knockout).
+        A whole matchday (or several rounds) can be submitted at once: results carrying their own "round"
+        are applied in one pass with the file loaded and saved once. Concurrent updates are retried (see apply_results_with_retry).
 
         Args:
-            round_number: The round being updated.
+            round_number: The round being updated, used for results without a "round" key.
             match_results: List of match results.
             KO: Knockout stage ID (for groups_knockout format).
+            entered_by: The User submitting the results, recorded in the result event log.
 
         Returns:
-            Updated match data dict.
+            Updated match data dict, or an empty dict for an archived tournament (its results are final).
         """
+        updated_data = {}
+        if self.archived_at:
+            return updated_data
         try:
-            team_names = self.get_team_names()
-            self.match_data = self.load_match_data_from_file()
-            tour_manager =TourManager(json_data=self.match_data, teams_names=team_names,home_or_away=self.home_or_away, tournament_type=self.tour_type,tour_name=self.name)
-            if self.tour_type == "league":
-                updated_data = tour_manager.update_league(round_number, match_results)
-            elif self.tour_type == "cup":
-                updated_data = tour_manager.update_knockout(round_number, match_results)
-            elif self.tour_type == "groups_knockout":
-                if KO:
-                    updated_data = tour_manager.update_knockout_stage(round_number,match_results)
-                else:
-                    updated_data = tour_manager.update_groups_stages(round_number,match_results)
-            else:
-                raise ValueError(f"Invalid tournament type: {self.tour_type}")
-            self.save_match_data_to_file()
-            
+            updated_data = apply_results_with_retry(self, round_number, match_results, KO=KO, entered_by=entered_by)
         except Exception as e:
             ErrorHandler().handle(e,context='Update macthes error')
             if settings.DEBUG:
@@ -353,3 +567,254 @@ class IndiTournament(models.Model):
         finally:
             return updated_data
  
+
+
+# ============================================================================ #
+#                              relational storage                              #
+# ============================================================================ #
+class TournamentRowQuerySet(models.QuerySet):
+    def for_tournament(self, tournament):
+        """Rows of a ClanTournament or IndiTournament."""
+        if isinstance(tournament, ClanTournament):
+            return self.filter(clan_tournament=tournament)
+        return self.filter(indi_tournament=tournament)
+
+
+class MatchQuerySet(TournamentRowQuerySet):
+    def involving(self, ref):
+        """Rows where a participant ("clan:<pk>"/"user:<pk>") plays on either side."""
+        return self.filter(models.Q(team_a=ref) | models.Q(team_b=ref))
+
+    def pending_for(self, ref):
+        """All pending matches of a participant, across every tournament."""
+        return self.involving(ref).filter(status="pending")
+
+
+class Match(models.Model):
+    """
+    One fixture of a tournament, mirrored from its match data (see match_store.MatchStore).
+
+    A row belongs to either a clan or an individual tournament. stage is "league" (top level fixtures,
+    or the results of a lazy league), "group" (with group set to the group name) or "knockout"
+    (bracket rounds, including the knock-out stage of groups_knockout). match_key is the league
+    match number or the bracket match_id. Keys of the fixture that have no column are kept in extra.
+    """
+    STAGE_CHOICES = [('league', 'League'), ('group', 'Group'), ('knockout', 'Knockout')]
+    STATUS_CHOICES = [('pending', 'Pending'), ('complete', 'Complete')]
+    clan_tournament = models.ForeignKey(ClanTournament, on_delete=models.CASCADE, null=True, blank=True, related_name="match_rows")
+    indi_tournament = models.ForeignKey(IndiTournament, on_delete=models.CASCADE, null=True, blank=True, related_name="match_rows")
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    group = models.CharField(max_length=50, blank=True, default="")
+    round_number = models.PositiveIntegerField()
+    position = models.PositiveIntegerField(default=0)
+    match_key = models.CharField(max_length=32)
+    team_a = models.CharField(max_length=255, null=True, blank=True)
+    team_b = models.CharField(max_length=255, null=True, blank=True)
+    team_a_goals = models.IntegerField(null=True, blank=True)
+    team_b_goals = models.IntegerField(null=True, blank=True)
+    winner = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, blank=True, default="pending")
+    extra = models.JSONField(default=dict, blank=True)
+
+    objects = MatchQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["stage", "group", "round_number", "position"]
+        indexes = [
+            models.Index(fields=["clan_tournament", "stage", "round_number"]),
+            models.Index(fields=["indi_tournament", "stage", "round_number"]),
+            models.Index(fields=["team_a", "status"]),
+            models.Index(fields=["team_b", "status"]),
+            models.Index(fields=["status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.team_a} vs {self.team_b} ({self.stage} round {self.round_number})"
+
+
+class Leg(models.Model):
+    """One leg of a two-legged knockout tie."""
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name="legs")
+    leg_number = models.PositiveSmallIntegerField()
+    team_a = models.CharField(max_length=255, null=True, blank=True)
+    team_b = models.CharField(max_length=255, null=True, blank=True)
+    team_a_goals = models.IntegerField(null=True, blank=True)
+    team_b_goals = models.IntegerField(null=True, blank=True)
+    winner = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, blank=True, default="pending")
+    extra = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ["match", "leg_number"]
+        unique_together = ('match', 'leg_number')
+        indexes = [
+            models.Index(fields=["team_a", "status"]),
+            models.Index(fields=["team_b", "status"]),
+        ]
+
+
+class Standing(models.Model):
+    """One table row of a tournament (league table, group table or knockout table), in table order."""
+    clan_tournament = models.ForeignKey(ClanTournament, on_delete=models.CASCADE, null=True, blank=True, related_name="standing_rows")
+    indi_tournament = models.ForeignKey(IndiTournament, on_delete=models.CASCADE, null=True, blank=True, related_name="standing_rows")
+    stage = models.CharField(max_length=20, choices=Match.STAGE_CHOICES)
+    group = models.CharField(max_length=50, blank=True, default="")
+    participant = models.CharField(max_length=255)
+    position = models.PositiveIntegerField(default=0)
+    points = models.IntegerField(default=0)
+    matches_played = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    goals_scored = models.IntegerField(default=0)
+    goals_conceded = models.IntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    extra = models.JSONField(default=dict, blank=True)
+
+    objects = TournamentRowQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["stage", "group", "position"]
+        indexes = [
+            models.Index(fields=["clan_tournament", "stage", "group", "position"]),
+            models.Index(fields=["indi_tournament", "stage", "group", "position"]),
+            models.Index(fields=["participant"]),
+        ]
+
+    def __str__(self):
+        return f"{self.participant}: {self.points} pts"
+
+
+# ============================================================================ #
+#                                 match history                                #
+# ============================================================================ #
+class MatchRecordQuerySet(models.QuerySet):
+    def for_participant(self, ref):
+        """History of a participant ("clan:<pk>"/"user:<pk>"), newest first."""
+        return self.filter(participant=ref).order_by("-played_at", "-id")
+
+    def search(self, query):
+        """Records whose tournament, opponent or result contains query (case-insensitive)."""
+        if not query:
+            return self
+        return self.filter(models.Q(tour_name__icontains=query) | models.Q(opponent__icontains=query) | models.Q(result__icontains=query))
+
+    def latest_for(self, ref, limit=5, query=""):
+        """
+        A participant's latest matches, read with one LIMIT query on the (participant, played_at) index.
+
+        Args:
+            ref (str): Participant reference.
+            limit (int): How many records to return.
+            query (str, optional): Only records matching it (see search()).
+
+        Returns:
+            list: Up to limit MatchRecords, oldest first, the order the history files kept them in.
+        """
+        return list(self.for_participant(ref).search(query)[:limit])[::-1]
+
+    def recent_form(self, refs, limit=5):
+        """
+        Latest results of many participants in one query, numbering each participant's records with a window function.
+
+        Args:
+            refs (list): Participant references.
+            limit (int): Results per participant.
+
+        Returns:
+            dict: ref -> ["W", "L", "D", ...] oldest first; participants without records are left out.
+        """
+        latest = self.filter(participant__in=refs).annotate(
+            position=Window(RowNumber(), partition_by=[F("participant")], order_by=[F("played_at").desc(), F("id").desc()])
+        ).filter(position__lte=limit).order_by("participant", "played_at", "id")
+        form = {}
+        for participant, result in latest.values_list("participant", "result"):
+            form.setdefault(participant, []).append(FORM_LETTERS.get(result, "D"))
+        return form
+
+
+class MatchRecord(models.Model):
+    """
+    One decided match from one side's point of view: the match history shown on profiles and clan pages.
+
+    Every match gives two rows, one per participant. TourManager.store_records stages them and
+    MatchUnitOfWork inserts them in the same transaction as the Elo and stats changes, so a result that
+    is rolled back or retried leaves no history behind. opponent is the opponent's name when the match
+    was played, opponent_ref its reference. The tournament is null for records imported from the old
+    history files (which only kept its name, see migration 0015) and once the tournament is deleted.
+    """
+    RESULT_CHOICES = [('win', 'Win'), ('loss', 'Loss'), ('draw', 'Draw')]
+    participant = models.CharField(max_length=255)
+    opponent = models.CharField(max_length=255, blank=True, default="")
+    opponent_ref = models.CharField(max_length=255, blank=True, default="")
+    clan_tournament = models.ForeignKey(ClanTournament, on_delete=models.SET_NULL, null=True, blank=True, related_name="match_records")
+    indi_tournament = models.ForeignKey(IndiTournament, on_delete=models.SET_NULL, null=True, blank=True, related_name="match_records")
+    tour_name = models.CharField(max_length=255, blank=True, default="")
+    result = models.CharField(max_length=10, choices=RESULT_CHOICES)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    played_at = models.DateTimeField(default=timezone.now)
+
+    objects = MatchRecordQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-played_at", "-id"]
+        indexes = [
+            models.Index(fields=["participant", "-played_at", "-id"]),
+            models.Index(fields=["participant", "opponent_ref", "-played_at"]),
+        ]
+
+    @property
+    def date(self):
+        """Played time as the history files wrote it (used by the profile and clan templates)."""
+        return timezone.localtime(self.played_at).strftime("%Y-%m-%d %H:%M:%S")
+
+    @property
+    def score(self):
+        return f"{self.goals_for}:{self.goals_against}"
+
+    @property
+    def form(self):
+        """"W", "L" or "D", for the recent form badges."""
+        return FORM_LETTERS.get(self.result, "D")
+
+    def __str__(self):
+        return f"{self.participant} {self.result} {self.score} vs {self.opponent_ref}"
+
+
+# ============================================================================ #
+#                                rank positions                                #
+# ============================================================================ #
+class RatingBucket(models.Model):
+    """
+    One node of the Fenwick tree behind RankIndex: how many players (or clans) have a rating in the
+    range of Elo buckets the node covers. Created for every node by migration 0016 and RankIndex.rebuild().
+    """
+    KIND_CHOICES = [('players', 'Players'), ('clans', 'Clans')]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    node = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "node"], name="unique_rating_bucket_node"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} node {self.node}: {self.count}"
+
+
+# ============================================================================ #
+#                                 leaderboards                                 #
+# ============================================================================ #
+class LeaderboardVersion(models.Model):
+    """
+    Version of a cached leaderboard (see Leaderboard). Bumping it makes every worker drop the cached
+    board, whether or not the cache backend is shared between them.
+    """
+    KIND_CHOICES = [('players', 'Players'), ('clans', 'Clans')]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.kind} leaderboard v{self.version}"
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from clans.models import Clans
+from users.models import Profile
+
+# Tournament match data refers to participants as "<kind>:<pk>" so results never need a name lookup
+# and renaming a user or clan does not break fixtures, tables or history.
+PARTICIPANT_MODELS = {
+    "user": User,
+    "clan": Clans,
+}
+
+
+def participant_ref(instance):
+    """
+    Returns the match data reference for a participant.
+
+    Args:
+        instance: A User, Profile or Clans instance.
+
+    Returns:
+        str: "user:<user pk>" or "clan:<clan pk>".
+    """
+    if isinstance(instance, Clans):
+        return f"clan:{instance.pk}"
+    if isinstance(instance, Profile):
+        return f"user:{instance.user_id}"
+    return f"user:{instance.pk}"
+
+
+def parse_ref(ref):
+    """
+    Splits a participant reference.
+
+    Returns:
+        tuple: (kind, pk) for "user:5"/"clan:12", or (None, None) for anything else
+        (legacy names, "Bye", "Draw", None).
+    """
+    if isinstance(ref, str) and ":" in ref:
+        kind, _, pk = ref.partition(":")
+        if kind in PARTICIPANT_MODELS and pk.isdigit():
+            return kind, int(pk)
+    return None, None
+
+
+def is_ref(value):
+    return parse_ref(value)[0] is not None
+
+
+def resolve_participant(ref, legacy_kind=None):
+    """
+    Fetches the User or Clans a reference points to.
+
+    Args:
+        ref (str): A participant reference, or a plain name in data that predates references.
+        legacy_kind (str, optional): "user" or "clan"; how to look up a plain name.
+
+    Returns:
+        User | Clans | None: The participant, or None if it does not exist.
+    """
+    kind, pk = parse_ref(ref)
+    if kind:
+        return PARTICIPANT_MODELS[kind].objects.filter(pk=pk).first()
+    if legacy_kind == "user" and ref:
+        return User.objects.filter(username=ref).first()
+    if legacy_kind == "clan" and ref:
+        return Clans.objects.filter(clan_name=ref).first()
+    return None
+
+
+def display_name(participant):
+    """Username or clan name of a User/Clans instance."""
+    if isinstance(participant, Clans):
+        return participant.clan_name
+    return participant.username
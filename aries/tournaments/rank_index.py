@@ -0,0 +1,153 @@
+import math
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from clans.models import ClanStats
+from users.models import PlayerStats
+from scripts.error_handle import ErrorHandler
+
+# Ratings are counted in one-point buckets; anything outside [0, ELO_BUCKETS) falls in the first or last one.
+ELO_BUCKETS = 4096
+
+
+# ============================================================================ #
+#                                 fenwick tree                                 #
+# ============================================================================ #
+def bucket_of(elo):
+    """Bucket of a rating (rounded first, so float noise like 1199.9999999999998 lands in 1200)."""
+    return min(max(int(round(elo, 6)), 0), ELO_BUCKETS - 1)
+
+
+def update_nodes(bucket):
+    """Tree nodes whose count changes when a rating enters or leaves a bucket: O(log n)."""
+    nodes = []
+    node = bucket + 1
+    while node <= ELO_BUCKETS:
+        nodes.append(node)
+        node += node & -node
+    return nodes
+
+
+def prefix_nodes(bucket):
+    """Tree nodes that add up to the number of ratings in buckets 0..bucket: O(log n)."""
+    nodes = []
+    node = bucket + 1
+    while node > 0:
+        nodes.append(node)
+        node -= node & -node
+    return nodes
+
+
+def build_tree(ratings):
+    """
+    Builds the tree from scratch in O(n + buckets).
+
+    Args:
+        ratings (iterable): Elo ratings.
+
+    Returns:
+        dict: Count for every node 1..ELO_BUCKETS.
+    """
+    tree = [0] * (ELO_BUCKETS + 1)
+    for elo in ratings:
+        tree[bucket_of(elo) + 1] += 1
+    for node in range(1, ELO_BUCKETS + 1):
+        parent = node + (node & -node)
+        if parent <= ELO_BUCKETS:
+            tree[parent] += tree[node]
+    return {node: tree[node] for node in range(1, ELO_BUCKETS + 1)}
+
+
+class RankIndex:
+    """
+    Position of a rating among all players or all clans ("#37 of 12480"), without counting the stats table.
+
+    A Fenwick tree over one-point Elo buckets, stored as RatingBucket rows (one per tree node), so every
+    worker shares it and it changes in the same transaction as the ratings. A rating change updates
+    O(log n) nodes with one "count = count + delta" UPDATE (see MatchUnitOfWork.commit); a lookup reads
+    O(log n) nodes with one query. Ratings in the same bucket share a position.
+
+    The nodes are shared rows, so their UPDATE locks them until the transaction commits, and results
+    whose ratings cross the same bucket ranges wait for each other there. This is kept short: a commit
+    moves all its ratings with one UPDATE issued last, just before the commit; a move touches at most
+    log2(ELO_BUCKETS) = 12 rows and never the nodes covering both its old and new bucket (their counts
+    do not change, so the total and other high nodes are only written when rows are added or deleted).
+    Moving outside the transaction would avoid the wait but let the index drift from the ratings when
+    a worker dies in between; rebuild_rank_index recounts it either way.
+    """
+    KINDS = ("players", "clans")
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    @classmethod
+    def kind_of(cls, stats):
+        """Returns "clans" for a ClanStats row, "players" for a PlayerStats row."""
+        return "clans" if isinstance(stats, ClanStats) else "players"
+
+    def move(self, changes):
+        """
+        Applies rating changes to the tree.
+
+        Args:
+            changes (list): (old Elo, new Elo) pairs; old is None for a new row, new is None for a deleted one.
+        """
+        from .models import RatingBucket
+        deltas = {}
+        for old, new in changes:
+            if old is not None and new is not None and bucket_of(old) == bucket_of(new):
+                continue
+            for elo, step in ((old, -1), (new, 1)):
+                if elo is None:
+                    continue
+                for node in update_nodes(bucket_of(elo)):
+                    deltas[node] = deltas.get(node, 0) + step
+        deltas = {node: delta for node, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        RatingBucket.objects.filter(kind=self.kind, node__in=deltas).update(
+            count=F("count") + Case(*[When(node=node, then=Value(delta)) for node, delta in deltas.items()], default=Value(0))
+        )
+
+    def position(self, elo):
+        """
+        Args:
+            elo (float): The rating to place.
+
+        Returns:
+            dict: {"position", "total", "top_percent"}, or None if the index is empty or cannot be read.
+        """
+        from .models import RatingBucket
+        try:
+            nodes = prefix_nodes(bucket_of(elo))
+            counts = dict(RatingBucket.objects.filter(kind=self.kind, node__in=nodes + [ELO_BUCKETS]).values_list("node", "count"))
+            total = counts.get(ELO_BUCKETS, 0)
+            if total <= 0:
+                return None
+            position = total - sum(counts.get(node, 0) for node in nodes) + 1
+            return {
+                "position": position,
+                "total": total,
+                "top_percent": max(1, math.ceil(position * 100 / total)),
+            }
+        except Exception as e:
+            ErrorHandler().handle(e, context=f"Failed to read the {self.kind} rank position")
+            return None
+
+    def rebuild(self):
+        """Recounts the tree from the stats table, e.g. after ratings were rewritten in bulk (replay_ratings)."""
+        from .models import RatingBucket
+        model = ClanStats if self.kind == "clans" else PlayerStats
+        with transaction.atomic():
+            tree = build_tree(model.objects.values_list("elo_rating", flat=True))
+            RatingBucket.objects.filter(kind=self.kind).delete()
+            RatingBucket.objects.bulk_create(
+                [RatingBucket(kind=self.kind, node=node, count=count) for node, count in tree.items()],
+                batch_size=1000,
+            )
+
+
+def rank_position(stats):
+    """Position of a PlayerStats/ClanStats row among all players/clans (see RankIndex.position), or None."""
+    if stats is None:
+        return None
+    return RankIndex(RankIndex.kind_of(stats)).position(stats.elo_rating)
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import shutil
+from scripts.serializer import serializer
+from .tourmanager import LazyRoundRobin
+
+
+class ShardMissing(Exception):
+    """A round shard named by a header was removed by a later save; read the header again."""
+
+
+class RoundShards:
+    """
+    Round-sharded storage for league and Swiss fixtures.
+
+    The tournament file keeps a small header: the table, metadata and, under SHARDS_KEY, one entry per
+    round, {"file": ..., "pending": unplayed matches}. Each round's fixture list lives in its own file
+    in "<tournament file>.rounds/", named after a hash of its contents, so a shard is never modified:
+    a save writes only the rounds that changed and the header is what commits them. A reader that
+    holds a header can always open the shards it names, and the page can load one round without the rest.
+
+    Shards no longer named by the new or the previous header are removed on save; a reader slower
+    than two saves retries with the fresh header (see ShardMissing).
+    """
+    SHARDS_KEY = "round_shards"
+    KIND = "round"
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The tournament file.
+        """
+        self.path = path
+        self.directory = f"{path}.rounds"
+
+    @classmethod
+    def is_sharded(cls, data):
+        return isinstance(data, dict) and isinstance(data.get(cls.SHARDS_KEY), dict)
+
+    @staticmethod
+    def can_shard(data):
+        """Only stored league/Swiss fixtures are sharded; brackets, groups and lazy leagues are already small."""
+        return isinstance(data, dict) and isinstance(data.get("fixtures"), dict) and "lazy_league" not in data
+
+    # ============================================================================ #
+    #                                     write                                    #
+    # ============================================================================ #
+    def split(self, match_data):
+        """
+        Writes the rounds that changed and returns the header to store in the tournament file.
+        Must run under the tournament file's lock (write_versioned's build step does).
+
+        Args:
+            match_data (dict): Complete match data.
+
+        Returns:
+            dict: The header.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        shards = {}
+        for round_key, matches in match_data["fixtures"].items():
+            payload = serializer.dumps(matches)
+            name = f"{round_key}.{hashlib.blake2b(payload, digest_size=8).hexdigest()}.json"
+            shard_path = os.path.join(self.directory, name)
+            if not os.path.exists(shard_path):
+                serializer.write_bytes(shard_path, payload)
+            shards[round_key] = {"file": name, "pending": sum(match.get("status") != "complete" for match in matches)}
+
+        keep = {shard["file"] for shard in shards.values()}
+        previous = self._stored_header()
+        if self.is_sharded(previous):
+            keep.update(shard["file"] for shard in previous[self.SHARDS_KEY].values())
+        for name in os.listdir(self.directory):
+            if name not in keep:
+                os.remove(os.path.join(self.directory, name))
+
+        header = {key: value for key, value in match_data.items() if key != "fixtures"}
+        header[self.SHARDS_KEY] = shards
+        return header
+
+    def _stored_header(self):
+        try:
+            return serializer.read(self.path, "tournament")
+        except ValueError:
+            return {}
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # ============================================================================ #
+    #                                     read                                     #
+    # ============================================================================ #
+    def join(self, header):
+        """Complete match data for a header: every shard read back into "fixtures" (header is filled in place)."""
+        shards = header.pop(self.SHARDS_KEY)
+        header["fixtures"] = {round_key: self.read_shard(shard) for round_key, shard in shards.items()}
+        return header
+
+    def read_shard(self, shard):
+        """A shard's fixture list; a header with replayed events holds the rounds they changed itself (see models.replay_header_events)."""
+        if "fixtures" in shard:
+            return shard["fixtures"]
+        try:
+            with open(os.path.join(self.directory, shard["file"]), "rb") as shard_file:
+                return serializer.loads(shard_file.read(), self.KIND)
+        except FileNotFoundError as e:
+            raise ShardMissing(shard["file"]) from e
+
+    # ============================================================================ #
+    #                                per-round access                              #
+    # ============================================================================ #
+    @classmethod
+    def round_index(cls, data):
+        """
+        The rounds of a league or Swiss tournament without loading their fixtures.
+
+        Args:
+            data (dict): A header, complete match data or a lazy league.
+
+        Returns:
+            list: [{"key": "round_N", "number": N, "pending": unplayed matches}] in round order.
+        """
+        if cls.is_sharded(data):
+            rounds = [(key, shard["pending"]) for key, shard in data[cls.SHARDS_KEY].items()]
+        elif "lazy_league" in data:
+            league = LazyRoundRobin(data)
+            rounds = [
+                (f"round_{number}", sum(str(match) not in league.results for match, _, _ in league.pairings(number)))
+                for number in range(1, league.total_rounds + 1)
+            ]
+        else:
+            rounds = [
+                (key, sum(match.get("status") != "complete" for match in matches))
+                for key, matches in data.get("fixtures", {}).items()
+            ]
+        return [{"key": key, "number": int(key.split("_")[-1]), "pending": pending} for key, pending in rounds]
+
+    def round_fixtures(self, data, round_key):
+        """
+        One round's fixture list from a header, complete match data or a lazy league.
+
+        Returns:
+            list: The round's fixtures, or None if the tournament has no such round.
+        """
+        if self.is_sharded(data):
+            shard = data[self.SHARDS_KEY].get(round_key)
+            return self.read_shard(shard) if shard else None
+        if "lazy_league" in data:
+            number = int(round_key.split("_")[-1])
+            league = LazyRoundRobin(data)
+            return league.round_fixtures(number) if 1 <= number <= league.total_rounds else None
+        return data.get("fixtures", {}).get(round_key)
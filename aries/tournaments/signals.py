@@ -1,7 +1,12 @@
 import os
-from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from django.contrib.auth.models import User
+from clans.models import Clans, ClanStats
+from users.models import PlayerStats, Profile
+from .leaderboard import leaderboard, STAT_COLUMNS
 from .models import ClanTournament, IndiTournament
+from .rank_index import RankIndex
 
 @receiver(pre_delete, sender=ClanTournament)
 @receiver(pre_delete, sender=IndiTournament)
@@ -30,5 +35,88 @@ def delete_json_file(sender, instance, **kwargs):
         try:
             os.remove(file_path)  
         except FileNotFoundError:
-            pass  
-     
+            pass
+
+
+# Fields whose stored value a save is compared with: those shown on a leaderboard, by model, and the
+# Elo for the rank index (one of the STAT_COLUMNS).
+TRACKED_FIELDS = {
+    User: ("players", ["username"]),
+    Profile: ("players", ["profile_picture"]),
+    PlayerStats: ("players", STAT_COLUMNS),
+    Clans: ("clans", ["clan_name", "clan_logo", "is_verified"]),
+    ClanStats: ("clans", STAT_COLUMNS),
+}
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Profile)
+@receiver(post_init, sender=PlayerStats)
+@receiver(post_init, sender=Clans)
+@receiver(post_init, sender=ClanStats)
+def remember_loaded_values(sender, instance, **kwargs):
+    """Keeps the tracked fields a row was loaded with (deferred ones are left out), so read_stored_values can skip unchanged saves."""
+    instance._loaded_values = {
+        field: getattr(instance.__dict__[field], "name", instance.__dict__[field])  # a file by its name, not the mutable FieldFile
+        for field in TRACKED_FIELDS[sender][1] if field in instance.__dict__
+    }
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Profile)
+@receiver(pre_save, sender=PlayerStats)
+@receiver(pre_save, sender=Clans)
+@receiver(pre_save, sender=ClanStats)
+def read_stored_values(sender, instance, update_fields=None, **kwargs):
+    """
+    Remembers the tracked fields a saved row had in the database, for update_leaderboard and
+    update_rank_index. Nothing is read when update_fields leaves them all out, or when every one of
+    them still holds the value the row was loaded with (most saves: logins, profile edits, admin saves
+    of other fields). Such a save of a row that changed in the database since it was loaded would write
+    the old values back unseen; rebuild_rank_index repairs the index after one.
+    """
+    instance._stored_values = None
+    fields = [field for field in TRACKED_FIELDS[sender][1] if update_fields is None or field in update_fields]
+    loaded = getattr(instance, "_loaded_values", {})
+    fields = [field for field in fields if field not in loaded or loaded[field] != getattr(instance, field)]
+    if instance.pk and fields:
+        instance._stored_values = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=PlayerStats)
+@receiver(post_save, sender=Clans)
+@receiver(post_save, sender=ClanStats)
+def update_leaderboard(sender, instance, created, **kwargs):
+    """Gives the leaderboard a new version when a row is added or a field it shows changed."""
+    stored = getattr(instance, "_stored_values", None)
+    if created or (stored and any(getattr(instance, field) != value for field, value in stored.items())):
+        leaderboard.invalidate([TRACKED_FIELDS[sender][0]])
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_delete, sender=PlayerStats)
+@receiver(post_delete, sender=ClanStats)
+def invalidate_leaderboard(sender, instance, **kwargs):
+    leaderboard.invalidate([TRACKED_FIELDS[sender][0]])
+
+
+@receiver(post_save, sender=PlayerStats)
+@receiver(post_save, sender=ClanStats)
+def update_rank_index(sender, instance, created, **kwargs):
+    """
+    Counts new stats rows in the rank index at their starting Elo and moves rows whose Elo was changed
+    through save() (the admin, a direct edit). Results are moved by MatchUnitOfWork.commit instead.
+    """
+    old = (getattr(instance, "_stored_values", None) or {}).get("elo_rating")
+    if created:
+        RankIndex(RankIndex.kind_of(instance)).move([(None, instance.elo_rating)])
+    elif old is not None and old != instance.elo_rating:
+        RankIndex(RankIndex.kind_of(instance)).move([(old, instance.elo_rating)])
+
+
+@receiver(post_delete, sender=PlayerStats)
+@receiver(post_delete, sender=ClanStats)
+def remove_from_rank_index(sender, instance, **kwargs):
+    RankIndex(RankIndex.kind_of(instance)).move([(instance.elo_rating, None)])
@@ -0,0 +1,958 @@
+import copy
+import importlib
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+from PIL import Image
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.http import Http404
+from django.urls import reverse
+from scripts.serializer import NEW_FILE_MODE, DocumentError, serializer
+from users.models import PlayerStats, Profile
+from . import models as tournament_models
+from . import views as tournament_views
+from .archive import TournamentArchive
+from .file_store import EVENT_LOG_SUFFIX, EventLog, MatchDataCache, VersionConflict, data_version, match_data_cache, snapshot_version, stored_version, write_versioned
+from .leaderboard import leaderboard
+from .management.commands.benchmark_tourmanager import Command as BenchmarkCommand
+from .match_store import MatchStore
+from .models import IndiTournament, LeaderboardVersion, MatchRecord, load_match_header
+from .participants import parse_ref, participant_ref, resolve_participant
+from .rank_index import bucket_of, rank_position
+from .round_shards import RoundShards, ShardMissing
+from .tourmanager import LazyRoundRobin, MatchIndex, Standings, TourManager, participant_name
+from .unit_of_work import RECENT_FORM_LENGTH, MatchUnitOfWork, NullUnitOfWork
+
+
+class TournamentTestCase(TestCase):
+    """Runs against a temporary MEDIA_ROOT holding the default images the models open on save."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        for name in ("default.jpg", "clan-default.jpg", "tours-defualt.jpg"):
+            Image.new("RGB", (10, 10)).save(f"{self.media_root}/{name}")
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(match_data_cache.clear)
+        cache.clear()
+
+    def make_league(self, count=4, name="League"):
+        users = [User.objects.get_or_create(username=f"player{i}")[0] for i in range(count)]
+        tournament = IndiTournament(name=name, created_by=users[0], tour_type="league", home_or_away=False)
+        tournament.save()
+        tournament.players.set(Profile.objects.filter(user__in=users))
+        tournament.save()
+        return tournament
+
+    @staticmethod
+    def result(match, goals_a, goals_b, round_number=1):
+        return {"round": round_number, "team_a": match["team_a"], "team_b": match["team_b"], "team_a_goals": goals_a, "team_b_goals": goals_b}
+
+    @staticmethod
+    def submissions(tournament):
+        """One result per fixture, in round order, with scores that give wins, losses and draws."""
+        fixtures = tournament.load_match_data_from_file()["fixtures"]
+        for round_key, matches in fixtures.items():
+            number = int(round_key.split("_")[-1])
+            for position, match in enumerate(matches):
+                yield number, [TournamentTestCase.result(match, (number + position) % 3, position % 2, number)]
+
+    def play_league(self, tournament):
+        """Plays every match one submission at a time."""
+        for number, results in list(self.submissions(tournament)):
+            tournament.update_tour(number, results)
+
+
+class MatchIndexTests(TestCase):
+    teams = [f"user:{i}" for i in range(8)]
+
+    def manager(self, tournament_type, home_or_away=False):
+        manager = TourManager({}, self.teams, tournament_type, home_or_away, effects=NullUnitOfWork())
+        manager.create_tournament()
+        return manager
+
+    def test_results_are_found_by_pair_in_either_order(self):
+        manager = self.manager("league")
+        match = manager.match_data["fixtures"]["round_2"][1]
+        manager.apply_results([{"team_a": match["team_b"], "team_b": match["team_a"], "team_a_goals": 3, "team_b_goals": 1}], round_number=2)
+        self.assertEqual((match["team_a_goals"], match["team_b_goals"], match["winner"]), (1, 3, match["team_b"]))
+        self.assertIs(manager.index.fixture("round_2", match["team_b"], match["team_a"])[0], match)
+        self.assertEqual(manager.index.fixture(2, "user:0", "user:99"), (None, None))
+
+    def test_group_fixtures_are_keyed_by_group_and_number(self):
+        manager = self.manager("groups_knockout")
+        groups = manager.match_data["group_stages"]
+        self.assertGreater(len(groups), 1)
+        for name, group in groups.items():
+            for round_key, matches in group["fixtures"].items():
+                for match in matches:
+                    self.assertIs(manager.index.fixtures_by_id[(name, match["match"])][0], match)
+                    self.assertEqual(manager.index.fixture(round_key, match["team_b"], match["team_a"]), (match, group))
+
+    def test_knockout_legs_and_placeholders_are_indexed(self):
+        manager = self.manager("cup", home_or_away=True)
+        first = manager.match_data["rounds"][0]["matches"][0]
+        leg = first["legs"][1]
+        self.assertEqual(manager.index.knockout(1, participant_name(leg["team_a"]), participant_name(leg["team_b"]), 2), (first, leg))
+        # Both legs of the next tie wait on the winner.
+        fed = manager.index.fed_by(first["match_id"])
+        self.assertEqual(len(fed), 2)
+        self.assertEqual({match["match_id"] for _, match, _ in fed}, {manager.match_data["rounds"][1]["matches"][0]["match_id"]})
+
+
+class StandingsTests(TestCase):
+    def test_order_matches_a_full_sort_after_every_result(self):
+        teams = [f"user:{i}" for i in range(10)]
+        table = {team: Standings.new_row() for team in teams}
+        standings = Standings(table)
+        rng = random.Random(3)
+        for _ in range(60):
+            team_a, team_b = rng.sample(teams, 2)
+            goals_a, goals_b = rng.randint(0, 3), rng.randint(0, 3)
+            outcome = "win" if goals_a > goals_b else "loss" if goals_a < goals_b else "draw"
+            standings.record(team_a, goals_a, goals_b, outcome)
+            standings.record(team_b, goals_b, goals_a, {"win": "loss", "loss": "win"}.get(outcome, "draw"))
+            expected = sorted(teams, key=lambda team: (-table[team]["points"], -table[team]["goal_difference"], -table[team]["wins"], -table[team]["goals_scored"], teams.index(team)))
+            self.assertEqual(standings.ordered(), expected)
+        self.assertEqual(list(standings.as_table()), expected)
+        self.assertIs(standings.as_table()[teams[0]], table[teams[0]])
+
+    def test_ties_keep_the_loaded_order_and_new_teams_go_last(self):
+        standings = Standings({"user:2": Standings.new_row(), "user:1": Standings.new_row()})
+        standings.record("user:3", 0, 0, "draw")
+        standings.record("user:4", 0, 0, "draw")
+        self.assertEqual(standings.ordered(), ["user:3", "user:4", "user:2", "user:1"])
+        self.assertEqual(standings.rows["user:3"]["points"], 1)
+
+
+class BatchResultsTests(TestCase):
+    teams = [f"user:{i}" for i in range(8)]
+
+    @staticmethod
+    def league_results(match_data):
+        return [
+            {"round": int(round_key.split("_")[-1]), "team_a": m["team_a"], "team_b": m["team_b"], "team_a_goals": (i + len(round_key)) % 4, "team_b_goals": i % 3}
+            for round_key, matches in match_data["fixtures"].items() for i, m in enumerate(matches)
+        ]
+
+    def test_one_batch_equals_one_result_at_a_time(self):
+        batch = TourManager({}, self.teams, "league", False, effects=NullUnitOfWork())
+        results = self.league_results(batch.create_tournament())
+        single = TourManager(copy.deepcopy(batch.match_data), self.teams, "league", False, effects=NullUnitOfWork())
+        for result in results:
+            single.apply_results([result])
+
+        effects = NullUnitOfWork()
+        batch.effects = effects
+        with mock.patch.object(effects, "commit") as commit, mock.patch.object(Standings, "as_table", autospec=True, side_effect=Standings.as_table) as write_table:
+            batch.apply_results(list(reversed(results)))
+        commit.assert_called_once()
+        write_table.assert_called_once()
+        self.assertEqual(list(batch.match_data["table"].items()), list(single.match_data["table"].items()))
+        self.assertEqual(batch.match_data["fixtures"], single.match_data["fixtures"])
+
+    def test_a_batch_can_finish_a_knockout_round_and_play_the_next(self):
+        manager = TourManager({}, self.teams[:4], "cup", False, effects=NullUnitOfWork())
+        bracket = manager.create_tournament()
+        semis = [(participant_name(m["team_a"]), participant_name(m["team_b"])) for m in bracket["rounds"][0]["matches"]]
+        winners = [team_a for team_a, _ in semis]
+        results = [{"round": 1, "team_a": a, "team_b": b, "team_a_goals": 2, "team_b_goals": 0} for a, b in semis]
+        results.append({"round": 2, "team_a": winners[0], "team_b": winners[1], "team_a_goals": 1, "team_b_goals": 0})
+        manager.apply_results(list(reversed(results)))
+        final = bracket["rounds"][1]["matches"][0]
+        self.assertEqual((final["status"], final["winner"]), ("complete", winners[0]))
+
+    def test_results_need_a_round(self):
+        manager = TourManager({}, self.teams, "league", False, effects=NullUnitOfWork())
+        manager.create_tournament()
+        with self.assertRaises(ValueError):
+            manager.apply_results([{"team_a": "user:0", "team_b": "user:1", "team_a_goals": 1, "team_b_goals": 0}])
+
+
+class LazyLeagueTests(TestCase):
+    def test_lazy_fixtures_match_eager_league(self):
+        for count in (6, 7):
+            for home_or_away in (False, True):
+                teams = [f"user:{i}" for i in range(count)]
+                eager = TourManager({}, teams, "league", home_or_away, effects=NullUnitOfWork()).make_league()["fixtures"]
+                lazy = LazyRoundRobin(LazyRoundRobin.create(teams, home_or_away))
+                with self.subTest(count=count, home_or_away=home_or_away):
+                    self.assertEqual(lazy.fixtures(), eager)
+
+    def test_completed_matches_come_back_in_round_order(self):
+        league = LazyRoundRobin(LazyRoundRobin.create([f"user:{i}" for i in range(7)], True))
+        fixtures = league.fixtures()
+        played = [(number, match) for number in (4, 1, 9) for match in fixtures[f"round_{number}"][:2]]
+        for _, match in played:
+            league.record({**match, "team_a_goals": 1, "team_b_goals": 0})
+        self.assertEqual(
+            [(number, match["match"], match["team_a"], match["team_b"]) for number, match in league.completed()],
+            sorted((number, match["match"], match["team_a"], match["team_b"]) for number, match in played),
+        )
+
+
+class SwissPairingTests(TestCase):
+    def test_an_earlier_pair_is_split_to_avoid_a_rematch(self):
+        opponents = {"a": {"b"}, "b": {"a", "d"}, "c": set(), "d": {"b"}}
+        self.assertEqual(TourManager._swiss_pairs(["a", "b", "c", "d"], opponents), [("c", "b"), ("a", "d")])
+
+    def test_nobody_meets_the_same_opponent_twice(self):
+        for count in (7, 10):
+            teams = [f"user:{i}" for i in range(count)]
+            random.seed(count)
+            manager = TourManager({}, teams, "swiss", False, effects=NullUnitOfWork())
+            match_data = manager.make_swiss(total_rounds=4)
+            for number in range(1, 5):
+                matches = match_data["fixtures"][f"round_{number}"]
+                self.assertEqual(len(matches), count // 2)
+                results = [{"team_a": m["team_a"], "team_b": m["team_b"], "team_a_goals": (number + i) % 3, "team_b_goals": i % 2} for i, m in enumerate(matches)]
+                match_data = manager.apply_results(results, round_number=number)
+            pairs = [MatchIndex.pair(m["team_a"], m["team_b"]) for matches in match_data["fixtures"].values() for m in matches]
+            with self.subTest(count=count):
+                self.assertEqual(len(match_data["fixtures"]), 4)
+                self.assertEqual(len(pairs), len(set(pairs)))
+                self.assertEqual(len(match_data["swiss"]["byes"]), 4 if count % 2 else 0)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_report_covers_every_case_and_compares(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        report_path = f"{directory}/report.json"
+        options = {"sizes": "6,9", "repeat": 1, "samples": 2, "stderr": StringIO()}
+        call_command("benchmark_tourmanager", output=report_path, **options)
+        with open(report_path) as report_file:
+            cases = json.load(report_file)["cases"]
+        self.assertEqual(len(cases), len(BenchmarkCommand.FORMATS) * 2 * 2)
+        for case in cases:
+            with self.subTest(format=case["format"], participants=case["participants"], home_or_away=case["home_or_away"]):
+                self.assertGreater(case["round_results"], 0)
+                self.assertGreater(case["file_bytes"], 0)
+                self.assertTrue(all(case[field] > 0 for field in ("create_ms", "result_ms", "round_ms", "save_ms", "load_ms")))
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command("benchmark_tourmanager", sizes="6", formats="league", home_away="no", repeat=1, samples=2, compare=report_path, stdout=stdout, stderr=stderr)
+        self.assertEqual(len(json.loads(stdout.getvalue())["cases"]), 1)
+        self.assertIn("create", stderr.getvalue().split("Compared with", 1)[1])
+
+
+class SerializerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_every_codec_round_trips_with_its_header(self):
+        document = {"version": 3, "fixtures": {"round_1": [{"match": 1, "team_a": "user:1", "team_b": "user:2"}]}}
+        for codec in ("json", "zjson"):
+            with self.subTest(codec=codec):
+                raw = serializer.dumps(document, version=3, codec=codec)
+                self.assertTrue(raw.startswith(f"#aries {codec} {serializer.SCHEMA_VERSION} 3\n".encode()))
+                self.assertEqual(serializer.peek_version(raw[:64]), 3)
+                self.assertEqual(serializer.loads(raw, "tournament"), document)
+
+    def test_legacy_documents_are_upgraded(self):
+        self.assertEqual(list(serializer.loads(b'{"table": {}, "version": 2}', "tournament")), ["version", "table"])
+        self.assertEqual(serializer.loads(b'{"fixtures": {}}', "tournament"), {"version": 0, "fixtures": {}})
+        history = serializer.loads(b'{"matches": [{"opponent": "rival"}]}', "history")
+        self.assertEqual(history["matches"][0]["opponent_ref"], "rival")
+        self.assertEqual(serializer.loads(b'{"matches": null}', "history"), {"matches": []})
+
+    def test_undecodable_documents_raise(self):
+        for raw in (b"#aries nope 1 0\n{}", f"#aries json {serializer.SCHEMA_VERSION + 1} 0\n{{}}".encode(), b"#aries zjson 1 0\nnot zlib", b"{broken"):
+            with self.subTest(raw=raw), self.assertRaises(DocumentError):
+                serializer.loads(raw, "tournament")
+
+    def test_writes_keep_the_file_mode(self):
+        path = f"{self.directory}/document.json"
+        serializer.write(path, {"version": 1}, version=1)
+        self.assertEqual(os.stat(path).st_mode & 0o777, NEW_FILE_MODE)
+        os.chmod(path, 0o640)
+        serializer.write(path, {"version": 2}, version=2)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+        self.assertEqual(serializer.read(path, "tournament"), {"version": 2})
+        self.assertEqual(os.listdir(self.directory), ["document.json"])
+
+
+class KnockoutDrawTests(TestCase):
+    def draw(self, count, seed, home_or_away=False):
+        teams = [f"user:{i}" for i in range(count)]
+        return TourManager({}, teams, "cup", home_or_away, effects=NullUnitOfWork()).make_knockout(seed=seed)
+
+    def test_same_seed_same_bracket(self):
+        for home_or_away in (False, True):
+            with self.subTest(home_or_away=home_or_away):
+                self.assertEqual(self.draw(12, 42, home_or_away), self.draw(12, 42, home_or_away))
+        self.assertNotEqual(self.draw(12, 42)["rounds"][0], self.draw(12, 43)["rounds"][0])
+        self.assertEqual(self.draw(12, 42)["seed"], 42)
+
+    def test_every_entrant_is_drawn_once_and_the_bracket_has_n_minus_1_matches(self):
+        for count in (2, 7, 16):
+            with self.subTest(count=count):
+                bracket = self.draw(count, 5)
+                matches = [match for round_data in bracket["rounds"] for match in round_data["matches"]]
+                self.assertEqual(len(matches), count - 1)
+                self.assertEqual(len({match["match_id"] for match in matches}), count - 1)
+                self.assertEqual(len(bracket["rounds"][-1]["matches"]), 1)
+                drawn = [participant_name(match[side]) for match in matches for side in ("team_a", "team_b") if participant_name(match[side])]
+                self.assertEqual(sorted(drawn), sorted(bracket["table"]))
+
+    def test_double_elimination_draw_is_reproducible(self):
+        teams = [f"user:{i}" for i in range(6)]
+        make = lambda seed: TourManager({}, teams, "double_elim", False, effects=NullUnitOfWork()).make_double_elimination(seed=seed)
+        self.assertEqual(make(9), make(9))
+        self.assertNotEqual(make(9)["routing"], make(10)["routing"])
+
+
+class DoubleEliminationTests(TestCase):
+    @staticmethod
+    def playable(match_data):
+        """(round number, match) for pending matches whose two sides are known."""
+        return [
+            (round_data["round_number"], match)
+            for round_data in match_data["rounds"]
+            for match in round_data["matches"]
+            if match["status"] != "complete" and None not in (participant_name(match["team_a"]), participant_name(match["team_b"]))
+        ]
+
+    def play(self, count, seed=7):
+        teams = [f"user:{i}" for i in range(count)]
+        manager = TourManager({}, teams, "double_elim", False, effects=NullUnitOfWork())
+        match_data = manager.make_double_elimination(seed=seed)
+        while self.playable(match_data):
+            number, match = self.playable(match_data)[0]
+            team_a, team_b = participant_name(match["team_a"]), participant_name(match["team_b"])
+            # The lower-numbered participant wins, so the outcome is known in advance.
+            goals = (2, 0) if int(team_a.split(":")[1]) < int(team_b.split(":")[1]) else (0, 2)
+            match_data = manager.apply_results([{"team_a": team_a, "team_b": team_b, "team_a_goals": goals[0], "team_b_goals": goals[1]}], round_number=number)
+        return teams, match_data
+
+    def test_routing_points_at_slots_in_later_rounds(self):
+        _, match_data = self.play(6)
+        round_of = {match["match_id"]: round_data["round_number"] for round_data in match_data["rounds"] for match in round_data["matches"]}
+        self.assertEqual(set(match_data["routing"]), set(round_of))
+        for match_id, route in match_data["routing"].items():
+            for target in filter(None, route.values()):
+                number, target_id, side = target
+                self.assertEqual(round_of[target_id], number)
+                self.assertGreater(number, round_of[match_id])
+                self.assertIn(side, ("team_a", "team_b"))
+
+    def test_everyone_but_the_champion_goes_out_after_two_losses(self):
+        for count in (5, 8):
+            with self.subTest(count=count):
+                teams, match_data = self.play(count)
+                matches = [match for round_data in match_data["rounds"] for match in round_data["matches"]]
+                self.assertTrue(all(match["status"] == "complete" for match in matches))
+                losses = dict.fromkeys(teams, 0)
+                for match in matches:
+                    sides = {participant_name(match["team_a"]), participant_name(match["team_b"])}
+                    if "Bye" not in sides:
+                        losses[(sides - {match["winner"]}).pop()] += 1
+                final = match_data["rounds"][-1]["matches"][0]
+                self.assertEqual(final["winner"], "user:0")
+                self.assertEqual(participant_name(final["team_b"]), "user:1")
+                self.assertEqual(losses, {team: 0 if team == "user:0" else 2 for team in teams})
+
+
+class ParticipantRefTests(TournamentTestCase):
+    def test_refs_parse_and_resolve(self):
+        user = User.objects.create(username="someone")
+        self.assertEqual(participant_ref(user), f"user:{user.pk}")
+        self.assertEqual(participant_ref(user.profile), f"user:{user.pk}")
+        self.assertEqual(parse_ref(f"user:{user.pk}"), ("user", user.pk))
+        for value in ("someone", "Bye", "Draw", None, "user:x", "team:1"):
+            self.assertEqual(parse_ref(value), (None, None))
+        self.assertEqual(resolve_participant(f"user:{user.pk}"), user)
+        self.assertEqual(resolve_participant("someone", legacy_kind="user"), user)
+        self.assertIsNone(resolve_participant("someone"))
+
+    def test_renamed_players_keep_their_fixtures(self):
+        tournament = self.make_league()
+        refs = set(tournament.get_team_refs())
+        match_data = tournament.load_match_data_from_file()
+        self.assertEqual(set(match_data["table"]), refs)
+        self.assertTrue(all(parse_ref(m["team_a"])[0] == "user" for matches in match_data["fixtures"].values() for m in matches))
+
+        match = match_data["fixtures"]["round_1"][0]
+        User.objects.filter(pk=parse_ref(match["team_a"])[1]).update(username="renamed")
+        tournament.update_tour(1, [self.result(match, 2, 0)])
+        self.assertEqual(tournament.load_match_data_from_file()["table"][match["team_a"]]["wins"], 1)
+
+    def test_legacy_names_are_migrated_once(self):
+        tournament = self.make_league()
+        match_data = tournament.load_match_data_from_file()
+        names = {f"user:{pk}": username for pk, username in User.objects.values_list("pk", "username")}
+        legacy = json.loads(json.dumps(match_data))
+        for matches in legacy["fixtures"].values():
+            for m in matches:
+                m["team_a"], m["team_b"] = names[m["team_a"]], names[m["team_b"]]
+        legacy["table"] = {names[ref]: row for ref, row in legacy["table"].items()}
+        legacy["table"]["ghost"] = Standings.new_row()
+        tournament.match_data = legacy
+        tournament.save_match_data_to_file()
+
+        output = StringIO()
+        call_command("migrate_participant_refs", stdout=output)
+        self.assertIn("no participant named ghost", output.getvalue())
+        migrated = tournament.load_match_data_from_file()
+        self.assertEqual(migrated["fixtures"], match_data["fixtures"])
+        self.assertEqual(set(migrated["table"]), set(match_data["table"]) | {"ghost"})
+
+        output = StringIO()
+        call_command("migrate_participant_refs", stdout=output)
+        self.assertIn("IndiTournament: 0 files converted", output.getvalue())
+
+
+class VersionedSaveTests(TournamentTestCase):
+    def test_stale_version_is_rejected(self):
+        path = f"{self.media_root}/versioned.json"
+        data = {"fixtures": {}}
+        write_versioned(path, data, lambda match_data: match_data)
+        with self.assertRaises(VersionConflict):
+            write_versioned(path, {"fixtures": {}}, lambda match_data: match_data, expected_version=data_version(data) - 1)
+        self.assertEqual(stored_version(path), data_version(data))
+
+    def test_conflict_rolls_back_and_retries_once_counted(self):
+        tournament = self.make_league()
+        match = tournament.load_match_data_from_file()["fixtures"]["round_1"][0]
+        version = stored_version(tournament.get_json_file_path())
+        save = tournament_models.save_tournament_file
+        calls = []
+
+        def lose_first_race(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise VersionConflict("another worker saved first")
+            return save(*args, **kwargs)
+
+        with mock.patch.object(tournament_models, "save_tournament_file", side_effect=lose_first_race), \
+                mock.patch.object(tournament_models, "UPDATE_RETRY_DELAY", 0):
+            tournament.update_tour(1, [self.result(match, 2, 1)])
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(stored_version(tournament.get_json_file_path()), version + 1)
+        self.assertEqual(MatchRecord.objects.count(), 2)
+        for stats in PlayerStats.objects.filter(total_matches__gt=0):
+            self.assertEqual(stats.total_matches, 1)
+        self.assertEqual(PlayerStats.objects.filter(total_matches__gt=0).count(), 2)
+
+    def test_failed_write_leaves_stats_untouched(self):
+        tournament = self.make_league()
+        match = tournament.load_match_data_from_file()["fixtures"]["round_1"][0]
+        with mock.patch.object(tournament_models, "save_tournament_file", side_effect=OSError("disk full")):
+            self.assertEqual(tournament.update_tour(1, [self.result(match, 2, 1)]), {})
+
+        self.assertFalse(PlayerStats.objects.filter(total_matches__gt=0).exists())
+        self.assertFalse(PlayerStats.objects.exclude(elo_rating=1200).exists())
+        self.assertEqual(MatchRecord.objects.count(), 0)
+
+
+    def test_failed_commit_undoes_the_file_write(self):
+        tournament = self.make_league()
+        path = tournament.get_json_file_path()
+        match = tournament.load_match_data_from_file()["fixtures"]["round_1"][0]
+        version, snapshot = stored_version(path), open(path, "rb").read()
+        save = tournament_models.save_tournament_file
+
+        def save_then_fail_commit(*args, **kwargs):
+            save(*args, **kwargs)
+            raise DatabaseError("could not serialize access")
+
+        for snapshot_every in (20, 1):
+            with self.subTest(snapshot_every=snapshot_every), override_settings(TOURNAMENT_EVENT_LOG=True, TOURNAMENT_SNAPSHOT_EVERY=snapshot_every), \
+                    mock.patch.object(tournament_models, "save_tournament_file", side_effect=save_then_fail_commit):
+                self.assertEqual(tournament.update_tour(1, [self.result(match, 2, 1)]), {})
+                self.assertEqual(stored_version(path), version)
+                self.assertEqual(open(path, "rb").read(), snapshot)
+                self.assertEqual(EventLog(path).size(), 0)
+                self.assertFalse(PlayerStats.objects.filter(total_matches__gt=0).exists())
+
+
+class MatchDataCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.cache = MatchDataCache(max_entries=2)
+        self.parsed = []
+
+    def parse(self, document_file):
+        self.parsed.append(document_file.name)
+        return serializer.loads(document_file.read(), "tournament")
+
+    def write(self, name, data):
+        path = f"{self.directory}/{name}.json"
+        serializer.write(path, data, version=data.get("version", 0))
+        return path
+
+    def test_reads_parse_once_and_get_private_copies(self):
+        path = self.write("a", {"version": 1, "table": {"user:1": {"points": 3}}})
+        first = self.cache.load(path, self.parse)
+        first["table"]["user:1"]["points"] = 99
+        self.assertEqual(self.cache.load(path, self.parse)["table"]["user:1"]["points"], 3)
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_a_rewrite_or_a_logged_event_makes_the_entry_stale(self):
+        path = self.write("a", {"version": 1})
+        self.cache.load(path, self.parse)
+        self.write("a", {"version": 2})
+        self.assertEqual(self.cache.load(path, self.parse)["version"], 2)
+        with open(f"{path}{EVENT_LOG_SUFFIX}", "ab") as log_file:
+            log_file.write(b"{}\n")
+        self.cache.load(path, self.parse)
+        self.assertEqual(len(self.parsed), 3)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        paths = [self.write(name, {"version": 1}) for name in "abc"]
+        self.cache.load(paths[0], self.parse)
+        self.cache.load(paths[1], self.parse)
+        self.cache.load(paths[0], self.parse)
+        self.cache.load(paths[2], self.parse)
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.evictions, 1)
+        self.cache.load(paths[0], self.parse)
+        self.cache.load(paths[1], self.parse)
+        self.assertEqual(self.parsed.count(paths[1]), 2)
+        self.assertEqual(self.parsed.count(paths[0]), 1)
+
+    def test_missing_or_empty_files_read_as_empty(self):
+        self.assertEqual(self.cache.load(f"{self.directory}/missing.json", self.parse), {})
+        open(f"{self.directory}/empty.json", "wb").close()
+        self.assertEqual(self.cache.load(f"{self.directory}/empty.json", self.parse), {})
+        self.assertEqual(self.parsed, [])
+
+
+@override_settings(TOURNAMENT_ROUND_SHARDS=True, TOURNAMENT_EVENT_LOG=False)
+class RoundShardTests(TournamentTestCase):
+    def shard_files(self, tournament):
+        return set(os.listdir(RoundShards(tournament.get_json_file_path()).directory))
+
+    def test_a_result_rewrites_only_its_round(self):
+        tournament = self.make_league(count=6)
+        path = tournament.get_json_file_path()
+        header = serializer.read(path, "tournament")
+        self.assertNotIn("fixtures", header)
+        before = {key: shard["file"] for key, shard in header[RoundShards.SHARDS_KEY].items()}
+        self.assertEqual(set(before.values()), self.shard_files(tournament))
+
+        (number, results), = list(self.submissions(tournament))[:1]
+        tournament.update_tour(number, results)
+        after = {key: shard["file"] for key, shard in serializer.read(path, "tournament")[RoundShards.SHARDS_KEY].items()}
+        self.assertEqual([key for key in after if after[key] != before[key]], ["round_1"])
+        # The previous header's shard stays for readers still holding it, until the save after.
+        self.assertEqual(self.shard_files(tournament), set(after.values()) | {before["round_1"]})
+        (number, results), = list(self.submissions(tournament))[1:2]
+        tournament.update_tour(number, results)
+        self.assertNotIn(before["round_1"], self.shard_files(tournament))
+
+    def test_rounds_load_on_their_own(self):
+        tournament = self.make_league(count=6)
+        self.play_league(tournament)
+        match_data_cache.clear()
+        full = tournament.load_match_data_from_file()
+        header = load_match_header(tournament)
+        shards = RoundShards(tournament.get_json_file_path())
+        self.assertEqual(RoundShards.round_index(header), RoundShards.round_index(full))
+        self.assertTrue(all(round_info["pending"] == 0 for round_info in RoundShards.round_index(header)))
+        for round_key, fixtures in full["fixtures"].items():
+            self.assertEqual(shards.round_fixtures(header, round_key), fixtures)
+        self.assertIsNone(shards.round_fixtures(header, "round_99"))
+
+        shards.remove()
+        with self.assertRaises(ShardMissing):
+            shards.round_fixtures(header, "round_1")
+
+
+class EventLogTests(TournamentTestCase):
+    @override_settings(TOURNAMENT_EVENT_LOG=True, TOURNAMENT_ROUND_SHARDS=True, TOURNAMENT_SNAPSHOT_EVERY=20)
+    def test_header_replays_logged_results_without_a_snapshot(self):
+        tournament = self.make_league(count=6)
+        path = tournament.get_json_file_path()
+        snapshot = snapshot_version(path)
+        for number, results in list(self.submissions(tournament))[:5]:
+            tournament.update_tour(number, results)
+        self.assertEqual(snapshot_version(path), snapshot)
+
+        match_data_cache.clear()
+        full = tournament.load_match_data_from_file()
+        with mock.patch.object(tournament_models, "load_match_document") as load_document:
+            header = load_match_header(tournament)
+        load_document.assert_not_called()
+        self.assertEqual(list(header["table"].items()), list(full["table"].items()))
+        self.assertEqual(RoundShards.round_index(header), RoundShards.round_index(full))
+        shards = RoundShards(path)
+        for round_key, fixtures in full["fixtures"].items():
+            self.assertEqual(shards.round_fixtures(header, round_key), fixtures)
+
+
+@override_settings(TOURNAMENT_RELATIONAL_STORAGE=True)
+class MatchStoreTests(TournamentTestCase):
+    def test_rows_round_trip_after_every_result(self):
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy), mock.patch.object(TourManager, "LAZY_LEAGUE_THRESHOLD", 4 if lazy else 64):
+                tournament = self.make_league(count=5, name=f"League {lazy}")
+                self.assertEqual("lazy_league" in tournament.load_match_data_from_file(), lazy)
+                for number, results in list(self.submissions_of(tournament)):
+                    saved = tournament.update_tour(number, results)
+                    match_data_cache.clear()
+                    self.assertEqual(tournament.load_match_data_from_file(), saved)
+                    self.assertEqual(self.stored_rows(tournament), MatchStore(tournament).rows(saved))
+
+    def test_a_result_writes_only_its_rows(self):
+        tournament = self.make_league(count=6)
+        (_, first), (_, second) = list(self.submissions(tournament))[:2]
+        tournament.update_tour(1, first)
+        other = tournament.match_rows.filter(round_number=2)
+        other.update(extra={"marker": True})
+
+        tournament.update_tour(1, second)
+        self.assertTrue(all(row.extra == {"marker": True} for row in other))
+        MatchStore(tournament).save(tournament.load_match_data_from_file())
+        self.assertFalse(tournament.match_rows.filter(extra={"marker": True}).exists())
+
+    def submissions_of(self, tournament):
+        """submissions() for eager or lazy leagues."""
+        match_data = tournament.load_match_data_from_file()
+        if "lazy_league" not in match_data:
+            return self.submissions(tournament)
+        league = LazyRoundRobin(match_data)
+        return [
+            (number, [self.result(match, (number + position) % 3, position % 2, number)])
+            for number in range(1, league.total_rounds + 1)
+            for position, match in enumerate(league.round_fixtures(number))
+        ]
+
+    @staticmethod
+    def stored_rows(tournament):
+        """The tournament's rows in the shape of MatchStore.rows()."""
+        matches = {
+            (row.stage, row.group, row.round_number, row.match_key): (
+                {field: getattr(row, field) for field in MatchStore.UPDATE_FIELDS},
+                {leg.leg_number: {field: getattr(leg, field) for field in (*MatchStore.MATCH_FIELDS, "extra")} for leg in row.legs.all()},
+            )
+            for row in tournament.match_rows.all()
+        }
+        standings = {
+            (row.stage, row.group, row.participant): {field: getattr(row, field) for field in ("position", *MatchStore.STANDING_FIELDS, "extra")}
+            for row in tournament.standing_rows.all()
+        }
+        return matches, standings
+
+
+class ArchiveTests(TournamentTestCase):
+    def test_freeze_replaces_the_live_files(self):
+        tournament = self.make_league()
+        self.play_league(tournament)
+        path = tournament.get_json_file_path()
+        final = tournament.load_match_data_from_file()
+
+        call_command("archive_tournaments", "--days", "0", stdout=StringIO())
+        tournament.refresh_from_db()
+        self.assertIsNotNone(tournament.archived_at)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(EventLog(path).log_path))
+        self.assertTrue(os.path.exists(f"{path}.lock"))
+        match_data_cache.clear()
+        self.assertEqual(tournament.load_match_data_from_file(), final)
+        self.assertTrue(TournamentArchive(tournament).read()["page"])
+        self.assertEqual(tournament.update_tour(1, [self.result(final["fixtures"]["round_1"][0], 5, 0)]), {})
+
+    def test_result_saved_since_loading_stops_the_freeze(self):
+        tournament = self.make_league()
+        self.play_league(tournament)
+        stale = tournament.load_match_data_from_file()
+        tournament.match_data = dict(stale)
+        tournament.save_match_data_to_file()
+        with self.assertRaises(VersionConflict):
+            TournamentArchive(tournament).freeze(stale, "", {})
+        tournament.refresh_from_db()
+        self.assertIsNone(tournament.archived_at)
+        self.assertTrue(os.path.exists(tournament.get_json_file_path()))
+
+
+class ImportMatchHistoryTests(TournamentTestCase):
+    migration = importlib.import_module("tournaments.migrations.0015_import_match_history")
+
+    def write_history(self, stats, raw):
+        os.makedirs(f"{self.media_root}/match_data", exist_ok=True)
+        with open(f"{self.media_root}/match_data/player_match_data_{stats.pk}.json", "wb") as history_file:
+            history_file.write(raw)
+
+    def test_history_files_become_records(self):
+        first, second, third = (User.objects.create(username=name).profile.stats for name in ("first", "second", "third"))
+        self.write_history(first, b'{"matches": [' +
+            b'{"opponent": "second", "result": "win", "score": "3:1", "tour_name": "Cup", "date": "2024-05-01 10:00:00"},' +
+            b'{"opponent": "third", "result": "draw", "score": "bad", "date": "not a date"},' +
+            b'{"opponent": "second", "result": "forfeit", "score": "0:0"}, "junk"]}')
+        serializer.write(f"{self.media_root}/match_data/player_match_data_{second.pk}.json", {"matches": [
+            {"opponent": "first", "opponent_ref": f"user:{first.user_profile.user_id}", "result": "loss", "score": "1:3", "tour_name": "Cup", "date": "2024-05-01 10:00:00"},
+        ]})
+        self.write_history(third, b"{corrupt")
+        linked = MatchRecord.objects.create(participant="user:99", indi_tournament=self.make_league(), result="win", goals_for=1, goals_against=0)
+
+        self.migration.import_match_history(apps, None)
+        records = MatchRecord.objects.exclude(pk=linked.pk).order_by("pk")
+        self.assertEqual(
+            [(r.participant, r.opponent, r.opponent_ref, r.tour_name, r.result, r.goals_for, r.goals_against) for r in records],
+            [
+                # Entries from before references keep the name as their reference (see the history upgrade).
+                (f"user:{first.user_profile.user_id}", "second", "second", "Cup", "win", 3, 1),
+                (f"user:{first.user_profile.user_id}", "third", "third", "", "draw", 0, 0),
+                (f"user:{second.user_profile.user_id}", "first", f"user:{first.user_profile.user_id}", "Cup", "loss", 1, 3),
+            ],
+        )
+        self.assertEqual(records[0].played_at, datetime(2024, 5, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertIsNotNone(records[1].played_at)
+
+        self.migration.remove_imported_history(apps, None)
+        self.assertEqual(list(MatchRecord.objects.all()), [linked])
+
+
+class MatchUnitOfWorkTests(TournamentTestCase):
+    def test_commit_derives_rank_and_win_rate_from_stored_values(self):
+        self.make_league()
+        stats, other = PlayerStats.objects.order_by("pk")[:2]
+        PlayerStats.objects.filter(pk=stats.pk).update(total_matches=3, total_wins=1, total_draws=1)
+
+        effects = MatchUnitOfWork()
+        effects.add(stats, elo_rating=450.5, total_matches=1, total_wins=1)
+        effects.add(other, elo_rating=-450.5, total_matches=1, total_losses=1)
+        effects.commit()
+
+        stats.refresh_from_db()
+        expected = PlayerStats(elo_rating=1650.5)
+        expected.set_rank_based_on_elo(commit=False)
+        self.assertEqual((stats.elo_rating, stats.total_matches, stats.rank), (1650.5, 4, expected.rank))
+        self.assertEqual(stats.win_rate, 62.5)
+        self.assertEqual(rank_position(stats)["position"], 1)
+        self.assertEqual(rank_position(PlayerStats.objects.get(pk=other.pk))["position"], PlayerStats.objects.count())
+
+
+    def test_recent_form_appends_to_the_stored_form(self):
+        tournament = self.make_league()
+        stats = PlayerStats.objects.select_related("user_profile").order_by("pk").first()
+        PlayerStats.objects.filter(pk=stats.pk).update(recent_form="W" * 9)
+        # Another worker's result, recorded after this row was loaded.
+        PlayerStats.objects.filter(pk=stats.pk).update(recent_form="W" * 9 + "L")
+
+        effects = MatchUnitOfWork(tournament)
+        for result in ("draw", "loss"):
+            effects.add_history(stats, {"result": result, "opponent": "someone", "goals_for": 0, "goals_against": 1})
+        self.assertEqual(stats.recent_form, "DL")
+        effects.commit()
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.recent_form, "WWWWWWWLDL")
+        self.assertEqual(len(stats.recent_form), RECENT_FORM_LENGTH)
+
+    def test_backfill_rebuilds_recent_form_from_history(self):
+        self.make_league()
+        stats, other = PlayerStats.objects.select_related("user_profile").order_by("pk")[:2]
+        ref = MatchUnitOfWork.stats_ref(stats)
+        played_at = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        results = ["loss", "draw"] + ["win"] * (RECENT_FORM_LENGTH - 2) + ["loss"]
+        MatchRecord.objects.bulk_create([
+            MatchRecord(participant=ref, result=result, played_at=played_at.replace(day=day))
+            for day, result in enumerate(results, start=1)
+        ])
+        PlayerStats.objects.filter(pk=other.pk).update(recent_form="WWW")
+
+        output = StringIO()
+        call_command("backfill_recent_form", "--only", "players", stdout=output)
+        stats.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(stats.recent_form, "D" + "W" * (RECENT_FORM_LENGTH - 2) + "L")
+        self.assertEqual(other.recent_form, "")
+        self.assertIn("PlayerStats: 2 of", output.getvalue())
+
+
+class TournamentPageTests(TournamentTestCase):
+    def test_page_model_is_built_once_per_version(self):
+        for tour_type, builder in (("league", "league_view_model"), ("cup", "process_tournament_data")):
+            with self.subTest(tour_type=tour_type):
+                tournament = self.make_league(count=4, name=tour_type)
+                tournament.tour_type = tour_type
+                tournament.save()
+                url = reverse("indi_details", kwargs={"tour_id": tournament.pk})
+                with mock.patch.object(tournament_views, builder, wraps=getattr(tournament_views, builder)) as build:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    self.assertEqual(build.call_count, 1)
+
+                    match_data = tournament.load_match_data_from_file()
+                    match = match_data["fixtures"]["round_1"][0] if tour_type == "league" else match_data["rounds"][0]["matches"][0]
+                    tournament.update_tour(1, [self.result({"team_a": participant_name(match["team_a"]), "team_b": participant_name(match["team_b"])}, 2, 0)])
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    self.assertEqual(build.call_count, 2)
+
+    def test_round_tabs_render_each_round(self):
+        tournament = self.make_league(count=4)
+        self.play_league(tournament)
+        for number in (1, 3):
+            response = self.client.get(reverse("indi_round", kwargs={"tour_id": tournament.pk, "round_number": number}))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["round_number"], number)
+            self.assertEqual(len(response.context["matches"]), 2)
+        self.assertEqual(self.client.get(reverse("indi_round", kwargs={"tour_id": tournament.pk, "round_number": 9})).status_code, 404)
+
+
+class TeamResolverTests(TournamentTestCase):
+    def test_prefetch_resolves_everyone_with_one_query(self):
+        users = [User.objects.create(username=f"resolved{i}") for i in range(5)]
+        refs = [participant_ref(user) for user in users[:4]] + ["resolved4", "Bye", None]
+        resolver = tournament_views.TeamResolver("user")
+        with self.assertNumQueries(1):
+            resolver.prefetch(refs)
+        with self.assertNumQueries(0):
+            names = [resolver(ref)["display_name"] for ref in refs]
+        self.assertEqual(names, [user.username for user in users] + ["TBD", "TBD"])
+
+    def test_participants_not_prefetched_are_looked_up_alone(self):
+        user = User.objects.create(username="late")
+        resolver = tournament_views.TeamResolver("user")
+        resolver.prefetch([])
+        with self.assertNumQueries(2):  # the user and its profile
+            self.assertEqual(resolver(participant_ref(user))["display_name"], "late")
+        with self.assertRaises(Http404):
+            resolver("user:999999")
+
+    def test_collect_participants_finds_every_side(self):
+        match_data = {
+            "fixtures": {"round_1": [{"team_a": "user:1", "team_b": "user:2"}]},
+            "table": {"user:3": {}},
+            "knock_outs": {"rounds": [{"matches": [{"legs": [{"team_a": {"name": "user:4"}, "team_b": {"name": None, "source_match": "x"}}]}]}]},
+            "lazy_league": {"order": ["user:5", "Bye"]},
+        }
+        self.assertEqual(tournament_views.collect_participants(match_data), {"user:1", "user:2", "user:3", "user:4", None, "user:5", "Bye"})
+
+
+class LeaderboardTests(TournamentTestCase):
+    def version(self):
+        return LeaderboardVersion.objects.get(kind="players").version
+
+    def test_boards_are_served_from_the_cache(self):
+        self.make_league()
+        leaderboard.boards()
+        with self.assertNumQueries(0):
+            boards = leaderboard.boards()
+        self.assertEqual(len(boards["players"]), PlayerStats.objects.count())
+
+    def test_only_shown_changes_invalidate(self):
+        self.make_league()
+        stats = PlayerStats.objects.order_by("pk").first()
+        profile = stats.user_profile
+        version = self.version()
+
+        stats.save()
+        profile.is_organizer = True
+        profile.save()
+        profile.user.save(update_fields=["last_login"])
+        self.assertEqual(self.version(), version)
+
+        stats.elo_rating = 1900
+        stats.save()
+        self.assertEqual(self.version(), version + 1)
+        self.assertEqual(leaderboard.boards()["players"][0]["elo_rating"], 1900)
+
+        profile.user.username = "renamed"
+        profile.user.save()
+        self.assertEqual(self.version(), version + 2)
+        self.assertEqual(leaderboard.boards()["players"][0]["username"], "renamed")
+
+    def test_other_workers_read_the_version_once_their_cached_one_expires(self):
+        self.make_league()
+        leaderboard.boards()
+        PlayerStats.objects.filter(pk=PlayerStats.objects.order_by("pk").first().pk).update(elo_rating=2000)
+        LeaderboardVersion.objects.filter(kind="players").update(version=F("version") + 1)
+        self.assertNotEqual(leaderboard.boards()["players"][0]["elo_rating"], 2000)
+
+        cache.delete(leaderboard.version_key("players"))
+        self.assertEqual(leaderboard.boards()["players"][0]["elo_rating"], 2000)
+
+
+class ReplayRatingsTests(TournamentTestCase):
+    def test_replay_matches_results_applied_one_by_one(self):
+        self.play_league(self.make_league(count=5))
+        played = {stats.pk: stats for stats in PlayerStats.objects.all()}
+        self.assertTrue(any(stats.elo_rating != 1200 for stats in played.values()))
+
+        out = StringIO()
+        call_command("replay_ratings", stdout=out)
+
+        self.assertIn("0 rows changed", out.getvalue())
+        for stats in PlayerStats.objects.all():
+            self.assertAlmostEqual(stats.elo_rating, played[stats.pk].elo_rating, places=6)
+            self.assertEqual(
+                (stats.total_wins, stats.total_draws, stats.total_losses, stats.gd, stats.rank),
+                (played[stats.pk].total_wins, played[stats.pk].total_draws, played[stats.pk].total_losses, played[stats.pk].gd, played[stats.pk].rank),
+            )
+
+    def test_replay_follows_play_order_across_tournaments(self):
+        first, second = self.make_league(count=4, name="First"), self.make_league(count=4, name="Second")
+        first_results = list(self.submissions(first))
+        second_results = [
+            (number, [{**result, "team_a_goals": result["team_b_goals"], "team_b_goals": result["team_a_goals"] + 1} for result in results])
+            for number, results in reversed(list(self.submissions(second)))
+        ]
+        for index in range(len(first_results)):
+            first.update_tour(*first_results[index])
+            second.update_tour(*second_results[index])
+        played = dict(PlayerStats.objects.values_list("pk", "elo_rating"))
+
+        call_command("replay_ratings", stdout=StringIO())
+
+        for pk, elo in PlayerStats.objects.values_list("pk", "elo_rating"):
+            self.assertAlmostEqual(elo, played[pk], places=6)
+
+
+class RankIndexTests(TournamentTestCase):
+    def assert_positions_match_count(self):
+        total = PlayerStats.objects.count()
+        for stats in PlayerStats.objects.all():
+            higher = PlayerStats.objects.filter(elo_rating__gte=bucket_of(stats.elo_rating) + 1).count()
+            self.assertEqual(rank_position(stats), {
+                "position": higher + 1,
+                "total": total,
+                "top_percent": max(1, -(-(higher + 1) * 100 // total)),
+            })
+
+    def test_position_matches_count_query(self):
+        self.play_league(self.make_league(count=6))
+        self.assert_positions_match_count()
+
+    def test_saved_elo_edits_and_deletes_move_the_index(self):
+        self.make_league(count=5)
+        first, second, third = PlayerStats.objects.order_by("pk")[:3]
+        first.elo_rating = 2500.4
+        first.set_rank_based_on_elo()
+        second.elo_rating = 900
+        second.save(update_fields=["elo_rating"])
+        third.user_profile.user.delete()
+        self.assert_positions_match_count()
+        self.assertEqual(rank_position(PlayerStats.objects.get(pk=first.pk))["position"], 1)
+
+    def test_saves_that_leave_elo_alone_read_nothing(self):
+        self.make_league()
+        stats = PlayerStats.objects.order_by("pk").first()
+        with self.assertNumQueries(1):
+            stats.save()
+        with self.assertNumQueries(1):
+            stats.save(update_fields=["gf"])
+        stats.elo_rating += 10
+        # stored values, the UPDATE, the version bump and its read-back, the index move
+        with self.assertNumQueries(5):
+            stats.save(update_fields=["elo_rating"])
+        self.assert_positions_match_count()
@@ -1,27 +1,426 @@
-import random,string,secrets
-from django.http import Http404
+import random,secrets,math,hashlib
+from bisect import bisect_left, insort
+from collections import deque
 from django.utils import timezone
 from typing import Dict
 from scripts.error_handle import ErrorHandler
-from django.shortcuts import get_object_or_404
-from django.contrib.auth.models import User
 from clans.models import Clans
+from .unit_of_work import MatchUnitOfWork
+
+
+def participant_name(participant):
+    """Returns the team name for a fixture side, which is a plain string in leagues/groups and a {"name": ...} dict in knockouts."""
+    if isinstance(participant, dict):
+        return participant.get("name")
+    return participant
+
+
+def iter_completed_matches(match_data):
+    """
+    Yields every completed match of a tournament in playing order: league or group rounds first
+    (all groups for round 1, then round 2, ...), then knockout rounds. Two-legged ties are yielded
+    once with their aggregate score, the same way their result is applied.
+
+    Args:
+        match_data (dict): Tournament data in any of the TourManager formats.
+
+    Yields:
+        dict: {"stage", "round", "team_a", "team_b", "team_a_goals", "team_b_goals"}.
+    """
+    match_data = match_data or {}
+    if "lazy_league" in match_data:
+        for round_number, match in LazyRoundRobin(match_data).completed():
+            yield {
+                "stage": None,
+                "round": round_number,
+                "team_a": match["team_a"],
+                "team_b": match["team_b"],
+                "team_a_goals": match["team_a_goals"],
+                "team_b_goals": match["team_b_goals"],
+            }
+        return
+
+    fixture_sets = []
+    if "fixtures" in match_data:
+        fixture_sets.append((None, match_data["fixtures"]))
+    for group_name, group_data in match_data.get("group_stages", {}).items():
+        fixture_sets.append((group_name, group_data.get("fixtures", {})))
+
+    by_round = {}
+    for stage, fixtures in fixture_sets:
+        for round_key, matches in fixtures.items():
+            by_round.setdefault(MatchIndex.round_number(round_key), []).append((stage, matches))
+    for round_number in sorted(by_round):
+        for stage, matches in by_round[round_number]:
+            for match in matches:
+                if match.get("status") == "complete":
+                    yield {
+                        "stage": stage,
+                        "round": round_number,
+                        "team_a": match["team_a"],
+                        "team_b": match["team_b"],
+                        "team_a_goals": match["team_a_goals"],
+                        "team_b_goals": match["team_b_goals"],
+                    }
+
+    knockouts = match_data if "rounds" in match_data else match_data.get("knock_outs", {})
+    for round_data in sorted(knockouts.get("rounds", []), key=lambda r: r["round_number"]):
+        for match in round_data["matches"]:
+            if match.get("status") != "complete":
+                continue
+            if "legs" in match:
+                team_a, team_b = match["legs"][0]["team_a"], match["legs"][0]["team_b"]
+                goals_a, goals_b = match["aggregate_team_a_goals"], match["aggregate_team_b_goals"]
+            else:
+                team_a, team_b = match["team_a"], match["team_b"]
+                goals_a, goals_b = match["team_a_goals"], match["team_b_goals"]
+            if goals_a is None or goals_b is None:
+                continue  # settled by a bye
+            yield {
+                "stage": "knockout",
+                "round": round_data["round_number"],
+                "team_a": participant_name(team_a),
+                "team_b": participant_name(team_b),
+                "team_a_goals": goals_a,
+                "team_b_goals": goals_b,
+            }
+
+
+class MatchIndex:
+    """
+    Lookup tables over a tournament's match_data so a result can be addressed directly
+    instead of scanning round lists.
+
+    Matches are keyed by their stable id ("match" for league/group fixtures, "match_id" for
+    knockouts) and by (round, participant pair). Group fixture numbers restart in every group,
+    so their id is (group name, match number). Knockout legs are keyed by (round, pair, leg_number).
+    The index is built once when the data is loaded and is kept in step by TourManager as
+    knockout placeholders are filled in.
+    """
+    def __init__(self, match_data):
+        """
+        Build the index.
+
+        Args:
+            match_data (dict): Tournament data in any of the TourManager formats.
+        """
+        self.fixtures_by_id = {}
+        self.fixtures = {}
+        self.knockouts_by_id = {}
+        self.knockouts = {}
+        self.knockout_rounds = {}
+        self.feeds = {}
+        self.pending_group_matches = 0
+
+        match_data = match_data or {}
+        if "fixtures" in match_data:
+            self.add_fixtures(match_data["fixtures"])
+        for group_name, group_data in match_data.get("group_stages", {}).items():
+            self.add_fixtures(group_data.get("fixtures", {}), group_name, group_data)
+        if "rounds" in match_data:
+            self.add_knockouts(match_data)
+        if "knock_outs" in match_data:
+            self.add_knockouts(match_data["knock_outs"])
+
+    @staticmethod
+    def pair(team_a, team_b):
+        """Order-insensitive key for two participants."""
+        return frozenset((team_a, team_b))
+
+    @staticmethod
+    def round_number(round_key):
+        """Converts "round_3" (or 3) to 3."""
+        if isinstance(round_key, str):
+            return int(round_key.rsplit("_", 1)[-1])
+        return int(round_key)
+
+    def add_fixtures(self, fixtures, group_name=None, group_data=None):
+        """Index league/group fixtures ({"round_N": [...]}). Called again by TourManager for rounds generated later (Swiss)."""
+        for round_key, matches in fixtures.items():
+            round_number = self.round_number(round_key)
+            for match in matches:
+                match_id = (group_name, match["match"]) if group_name else match["match"]
+                self.fixtures_by_id[match_id] = (match, group_data)
+                self.fixtures[(round_number, self.pair(match["team_a"], match["team_b"]))] = (match, group_data)
+                if group_name and match.get("status") != "complete":
+                    self.pending_group_matches += 1
+
+    def add_knockouts(self, knockouts):
+        """
+        Index every round of a knockout structure ({"rounds": [...], "table": {...}}).
+        Called again by TourManager when a knockout stage is generated mid-tournament.
+        """
+        for round_data in knockouts.get("rounds", []):
+            self.knockout_rounds[round_data["round_number"]] = round_data
+            for match in round_data["matches"]:
+                self.knockouts_by_id[match["match_id"]] = match
+                self.register_knockout(round_data["round_number"], match)
+                sides = [(leg, side) for leg in match["legs"] for side in ("team_a", "team_b")] if "legs" in match else [(None, side) for side in ("team_a", "team_b")]
+                for leg, side in sides:
+                    participant = (leg or match).get(side)
+                    if isinstance(participant, dict) and participant.get("source_match"):
+                        self.feeds.setdefault(participant["source_match"], []).append((round_data["round_number"], match, participant))
+
+    def register_knockout(self, round_number, match):
+        """(Re)index a knockout match by participant pair once both sides have names."""
+        if "legs" in match:
+            for leg in match["legs"]:
+                name_a, name_b = participant_name(leg.get("team_a")), participant_name(leg.get("team_b"))
+                if name_a and name_b:
+                    self.knockouts[(round_number, self.pair(name_a, name_b), leg["leg_number"])] = (match, leg)
+        else:
+            name_a, name_b = participant_name(match.get("team_a")), participant_name(match.get("team_b"))
+            if name_a and name_b:
+                self.knockouts[(round_number, self.pair(name_a, name_b), None)] = (match, None)
+
+    def fixture(self, round_number, team_a, team_b):
+        """
+        Find a league or group fixture.
+
+        Returns:
+            tuple: (match, group_data) where group_data is None for leagues, or (None, None).
+        """
+        return self.fixtures.get((self.round_number(round_number), self.pair(team_a, team_b)), (None, None))
+
+    def knockout(self, round_number, team_a, team_b, leg_number=None):
+        """
+        Find a knockout match (and the leg, for two-legged ties).
+
+        Returns:
+            tuple: (match, leg) where leg is None for single matches, or (None, None).
+        """
+        return self.knockouts.get((self.round_number(round_number), self.pair(team_a, team_b), leg_number or None), (None, None))
+
+    def knockout_match(self, match_id):
+        """Knockout match by its match_id, or None."""
+        return self.knockouts_by_id.get(match_id)
+
+    def fed_by(self, match_id):
+        """Placeholders waiting on the winner of match_id, as (round_number, match, participant) tuples."""
+        return self.feeds.get(match_id, [])
+
+
+class Standings:
+    """
+    A league table that stays ordered as results come in.
+
+    Rows are ranked on (points, goal_difference, wins, goals_scored), best first, with ties
+    kept in the order the table had when it was loaded. The ranking is a sorted list of keys
+    maintained with bisect, so recording a result repositions only the changed row instead
+    of re-sorting the whole table. as_table() gives back the ordered {team: stats} mapping
+    the templates read.
+    """
+    def __init__(self, table):
+        """
+        Args:
+            table (dict): An existing {team: stats} table; its row dicts are updated in place.
+        """
+        self.source = table
+        self.rows = dict(table)
+        self._teams = list(table)
+        self._position = {team: i for i, team in enumerate(self._teams)}
+        self._keys = {team: self._key(team) for team in self._teams}
+        self._order = sorted(self._keys.values())
+
+    @staticmethod
+    def new_row():
+        """Stats for a team that has not played yet."""
+        return {
+            "goals_scored": 0,
+            "goals_conceded": 0,
+            "goal_difference": 0,
+            "points": 0,
+            "matches_played": 0,
+            "wins": 0,
+            "draws": 0,
+            "losses": 0,
+        }
+
+    def _key(self, team):
+        row = self.rows[team]
+        return (-row["points"], -row["goal_difference"], -row["wins"], -row["goals_scored"], self._position[team])
+
+    def add(self, team):
+        """Adds a team with an empty row at the bottom of its tie group."""
+        self.rows[team] = self.new_row()
+        self._position[team] = len(self._teams)
+        self._teams.append(team)
+        self._keys[team] = self._key(team)
+        insort(self._order, self._keys[team])
+
+    def record(self, team, goals_scored, goals_conceded, result_type):
+        """
+        Records one match for a team and moves its row to its new place.
+
+        Args:
+            team (str): The team name.
+            goals_scored (int): Goals scored by the team in the match.
+            goals_conceded (int): Goals conceded by the team in the match.
+            result_type (str): "win", "draw", or "loss".
+        """
+        if team not in self.rows:
+            self.add(team)
+        del self._order[bisect_left(self._order, self._keys[team])]
+
+        row = self.rows[team]
+        row["goals_scored"] += goals_scored
+        row["goals_conceded"] += goals_conceded
+        row["goal_difference"] = row["goals_scored"] - row["goals_conceded"]
+        row["matches_played"] += 1
+        if result_type == "win":
+            row["wins"] += 1
+            row["points"] += 3
+        elif result_type == "draw":
+            row["draws"] += 1
+            row["points"] += 1
+        elif result_type == "loss":
+            row["losses"] += 1
+
+        self._keys[team] = self._key(team)
+        insort(self._order, self._keys[team])
+
+    def ordered(self):
+        """Team names from first to last."""
+        return [self._teams[key[-1]] for key in self._order]
+
+    def as_table(self):
+        """The ordered {team: stats} mapping stored in match_data."""
+        return {team: self.rows[team] for team in self.ordered()}
+
+
+class LazyRoundRobin:
+    """
+    A round-robin league that stores only its participant order and the results played.
+
+    Fixtures follow the same circle method as TourManager.make_league (first participant fixed,
+    the rest rotating one place per round, sides swapped in the return half of a home/away
+    league), so any round can be computed on demand instead of being stored. Matches are
+    numbered consecutively in round order, skipping pairings against the bye, exactly as
+    make_league numbers them.
+
+    The data lives in match_data as {"lazy_league": {"order", "home_or_away"}, "results":
+    {match number: [team_a_goals, team_b_goals]}, "table": {...}}.
+    """
+    def __init__(self, match_data):
+        """
+        Args:
+            match_data (dict): Lazy league match data; "results" is created if missing.
+        """
+        league = match_data["lazy_league"]
+        self.order = league["order"]
+        self.home_or_away = league.get("home_or_away", False)
+        self.results = match_data.setdefault("results", {})
+        self.slots = len(self.order)
+        self.rounds_per_leg = self.slots - 1
+        self.per_round = self.slots // 2
+        self.bye = self.order.index("Bye") if "Bye" in self.order else None
+        self.matches_per_round = self.per_round - (self.bye is not None)
+
+    @staticmethod
+    def create(teams, home_or_away):
+        """Lazy league data for teams, padded with a "Bye" to an even count."""
+        order = list(teams)
+        if len(order) % 2 == 1:
+            order.append("Bye")
+        return {"lazy_league": {"order": order, "home_or_away": bool(home_or_away)}, "results": {}}
+
+    @property
+    def total_rounds(self):
+        return self.rounds_per_leg * (2 if self.home_or_away else 1)
+
+    def _at(self, position, rotation):
+        if position == 0:
+            return self.order[0]
+        return self.order[1 + (position - 1 - rotation) % self.rounds_per_leg]
+
+    def _bye_pairing(self, index):
+        """Index of the pairing that includes the bye in a round (0-based), or None without a bye."""
+        if self.bye is None:
+            return None
+        position = 0 if self.bye == 0 else 1 + (self.bye - 1 + index % self.rounds_per_leg) % self.rounds_per_leg
+        return min(position, self.slots - 1 - position)
+
+    def _pairing(self, match_number):
+        """(round index, pairing) of a match number; numbers count real matches only (see pairings)."""
+        index, offset = divmod(match_number - 1, self.matches_per_round)
+        bye = self._bye_pairing(index)
+        return index, offset + (bye is not None and offset >= bye)
+
+    def pairings(self, round_number):
+        """(match number, team_a, team_b) for every real match of a round."""
+        index = round_number - 1
+        rotation = index % self.rounds_per_leg
+        swap = index >= self.rounds_per_leg
+        number = index * self.matches_per_round
+        for i in range(self.per_round):
+            home, away = self._at(i, rotation), self._at(self.slots - 1 - i, rotation)
+            if home == "Bye" or away == "Bye":
+                continue
+            if swap:
+                home, away = away, home
+            number += 1
+            yield number, home, away
+
+    def match(self, match_number, team_a, team_b):
+        """A fixture dict in the make_league shape, with its result filled in if played."""
+        result = self.results.get(str(match_number))
+        match = {
+            "match": match_number,
+            "team_a": team_a,
+            "team_b": team_b,
+            "team_a_goals": None,
+            "team_b_goals": None,
+            "winner": None,
+            "status": 'pending'
+        }
+        if result is not None:
+            goals_a, goals_b = result
+            match["team_a_goals"], match["team_b_goals"] = goals_a, goals_b
+            match["winner"] = team_a if goals_a > goals_b else team_b if goals_b > goals_a else "Draw"
+            match["status"] = "complete"
+        return match
+
+    def round_fixtures(self, round_number):
+        return [self.match(number, team_a, team_b) for number, team_a, team_b in self.pairings(round_number)]
+
+    def fixtures(self):
+        """All rounds as {"round_N": [...]}, the stored shape of an ordinary league."""
+        return {f"round_{r}": self.round_fixtures(r) for r in range(1, self.total_rounds + 1)}
+
+    def record(self, match):
+        """Stores a completed fixture's score."""
+        self.results[str(match["match"])] = [match["team_a_goals"], match["team_b_goals"]]
+
+    def completed(self):
+        """Completed fixtures in match-number (so round) order."""
+        for number in sorted(self.results, key=int):
+            index, position = self._pairing(int(number))
+            rotation = index % self.rounds_per_leg
+            team_a, team_b = self._at(position, rotation), self._at(self.slots - 1 - position, rotation)
+            if index >= self.rounds_per_leg:
+                team_a, team_b = team_b, team_a
+            yield index + 1, self.match(int(number), team_a, team_b)
+
 
 class TourManager:
     """ 
     TourManager class for managing tournament fixtures and results.
     """
-    def __init__(self, json_data, teams_names, tournament_type, home_or_away, teams_advance=None, tour_name="Not specified"):
+    # Leagues with more participants than this store only their order and results (see LazyRoundRobin).
+    LAZY_LEAGUE_THRESHOLD = 64
+
+    def __init__(self, json_data, teams_names, tournament_type, home_or_away, teams_advance=None, tour_name="Not specified", effects=None):
         """
         Initialize the TourManager.
 
         Args:
             json_data (dict): Storage for match data, a dictionary with match details.
             teams_names (list): List of team names participating in the tournament.
-            tournament_type (str): Type of tournament, e.g., 'league', 'cup', 'groups_knockout'.
+            tournament_type (str): Type of tournament, e.g., 'league', 'cup', 'groups_knockout', 'swiss'.
             home_or_away (str): A flag for determining if matches are home/away.
             teams_advance (int, optional): Number of teams that advance to next round (if applicable).
             tour_name (str, optional): Name of the tournament or tour. Defaults to "Not specified".
+            effects (MatchUnitOfWork, optional): Where Elo, stats and history changes are staged. A new one is used if omitted.
         """
         self.match_data = json_data
         self.teams = teams_names
@@ -29,6 +428,13 @@ class TourManager:
         self.teams_to_advance = teams_advance
         self.tour_name = tour_name
         self.home_or_away= home_or_away
+        self.index = MatchIndex(json_data)
+        self._defer_table_sort = False
+        self._dirty_tables = {}
+        self._standings = {}
+        self.effects = effects if effects is not None else MatchUnitOfWork()
+        self._in_batch = False
+        self.draw_seed = None
     # ============================================================================ #
     #                                    leagues                                   #
     # ============================================================================ #
@@ -46,6 +452,10 @@ class TourManager:
             if len(set(teams)) != len(teams):
                 raise ValueError("Duplicate team names found.")
 
+            if len(teams) > self.LAZY_LEAGUE_THRESHOLD:
+                round_robin = self.make_lazy_league()
+                return round_robin
+
             if len(teams) % 2 == 1:
                 teams.append("Bye")  
             n = len(teams)
@@ -109,6 +519,19 @@ class TourManager:
         finally:
            return round_robin 
 
+    def make_lazy_league(self):
+        """
+        Creates a league that derives its fixtures on demand (see LazyRoundRobin) instead of storing
+        every round, so storage grows with results played rather than with the fixture count.
+        Used by make_league above LAZY_LEAGUE_THRESHOLD participants.
+
+        Returns:
+            dict: Lazy league data with an empty standings table.
+        """
+        league = LazyRoundRobin.create(self.teams, self.home_or_away)
+        league["table"] = {team: Standings.new_row() for team in self.teams}
+        return league
+
     def update_league(self,round_number,match_results):
         """
         Updates the league fixtures and table based on match results for a specific round.
@@ -125,36 +548,236 @@ class TourManager:
             dict: Updated match_data with fixtures and table info.
         """
         try:
-            round_key = f"round_{round_number}"
-            if round_key not in self.match_data['fixtures']:
-                return
-            round_matches = self.match_data['fixtures'][round_key]
+            if "lazy_league" in self.match_data:
+                self._update_lazy_league(round_number, match_results)
+                return self.match_data
             for result in match_results:
-                team_a = result["team_a"]
-                team_b = result["team_b"]
-                goals_a = result["team_a_goals"]
-                goals_b = result["team_b_goals"]
-                match = next((m for m in round_matches if m["team_a"] == team_a and m["team_b"] == team_b), None)
+                match, _ = self.index.fixture(round_number, result["team_a"], result["team_b"])
                 if match and match['status'] !="complete":
-                    self.finalize_match_result(team_a,team_b,goals_a,goals_b,match)
+                    goals_a, goals_b = self._goals_for_fixture(match, result)
+                    self.finalize_match_result(match["team_a"],match["team_b"],goals_a,goals_b,match)
             
         except Exception as e:
             ErrorHandler().handle(e,context=f"Failed to update league round {round_number} in {self.tour_name}")
         finally:
             return self.match_data
   
+    def _update_lazy_league(self, round_number, match_results):
+        """Applies results to a lazy league: the round is computed once and each completed fixture's score is stored."""
+        league = LazyRoundRobin(self.match_data)
+        fixtures = {MatchIndex.pair(m["team_a"], m["team_b"]): m for m in league.round_fixtures(MatchIndex.round_number(round_number))}
+        for result in match_results:
+            match = fixtures.get(MatchIndex.pair(result["team_a"], result["team_b"]))
+            if match and match['status'] != "complete":
+                goals_a, goals_b = self._goals_for_fixture(match, result)
+                self.finalize_match_result(match["team_a"], match["team_b"], goals_a, goals_b, match)
+                league.record(match)
+
+    # ============================================================================ #
+    #                                     swiss                                    #
+    # ============================================================================ #
+    def make_swiss(self, total_rounds=None):
+        """
+        Creates a Swiss-system tournament: everyone plays every round, each round pairs participants
+        with similar scores, and nobody meets the same opponent twice. Only the first round is drawn
+        here; the next one is paired by update_swiss when a round is complete.
+
+        The data keeps the league shape ("fixtures" by round and a "table"), plus a "swiss" entry
+        holding the number of rounds, the byes handed out, and the next match number. Home/away is
+        not used: a Swiss round is one match per pairing.
+
+        Args:
+            total_rounds (int, optional): Rounds to play. Defaults to ceil(log2(participants)).
+
+        Returns:
+            dict: The Swiss match data.
+        """
+        swiss = {}
+        try:
+            teams = self.teams[:]
+            if not teams or len(teams) < 2:
+                raise ValueError("At least 2 teams required.")
+
+            if len(set(teams)) != len(teams):
+                raise ValueError("Duplicate team names found.")
+
+            random.shuffle(teams)
+            total_rounds = total_rounds or max(1, math.ceil(math.log2(len(teams))))
+            swiss = {
+                "fixtures": {},
+                "table": {team: Standings.new_row() for team in teams},
+                "swiss": {
+                    "total_rounds": min(total_rounds, len(teams) - 1),
+                    "byes": {},
+                    "next_match": 1,
+                },
+            }
+            self.match_data = swiss
+            self.index = MatchIndex(swiss)
+            self.pair_swiss_round(1)
+        except Exception as e:
+            ErrorHandler().handle(e,context='Failed to make swiss')
+        finally:
+            return swiss
+
+    def pair_swiss_round(self, round_number):
+        """
+        Draws one Swiss round from the current standings and adds it to the fixtures.
+
+        Participants are taken in table order (points, goal difference, wins, goals scored), so each
+        score group is paired internally and an odd one out floats down to the next group. Each player
+        is paired with the highest-placed remaining player they have not met yet, using an opponent set
+        per participant built from the fixtures. With an odd number of participants the lowest-placed
+        player who has not had a bye sits out and is credited with a win.
+
+        Args:
+            round_number (int): The round to draw.
+
+        Returns:
+            list: The new round's fixtures.
+        """
+        meta = self.match_data["swiss"]
+        standings = self._standings_for(self.match_data)
+        players = standings.ordered()
+
+        opponents = {team: set() for team in players}
+        for matches in self.match_data["fixtures"].values():
+            for match in matches:
+                opponents[match["team_a"]].add(match["team_b"])
+                opponents[match["team_b"]].add(match["team_a"])
+
+        bye = None
+        if len(players) % 2:
+            had_bye = set(meta["byes"].values())
+            bye = next((team for team in reversed(players) if team not in had_bye), players[-1])
+            players.remove(bye)
+
+        round_matches = []
+        for team_a, team_b in self._swiss_pairs(players, opponents):
+            round_matches.append({
+                "match": meta["next_match"],
+                "team_a": team_a,
+                "team_b": team_b,
+                "team_a_goals": None,
+                "team_b_goals": None,
+                "winner": None,
+                "status": 'pending'
+            })
+            meta["next_match"] += 1
+
+        round_key = f"round_{round_number}"
+        self.match_data["fixtures"][round_key] = round_matches
+        self.index.add_fixtures({round_key: round_matches})
+        if bye:
+            meta["byes"][round_key] = bye
+            standings.record(bye, 0, 0, "win")
+            self._order_table(self.match_data)
+        return round_matches
+
+    @staticmethod
+    def _swiss_pairs(players, opponents):
+        """
+        Greedy Swiss pairing over players in standings order.
+
+        When a player has met everyone still unpaired, an earlier pair is split so both can be
+        re-paired without a rematch; a rematch is only allowed if no such swap exists.
+        The unpaired players are a deque: each player is taken from its front and a partner is
+        usually found a few places in, so removing either does not shift the whole list.
+
+        Args:
+            players (list): Participant names, best placed first (even count).
+            opponents (dict): Name -> set of names already played.
+
+        Returns:
+            list: (team_a, team_b) tuples.
+        """
+        pairs = []
+        remaining = deque(players)
+
+        def take(i):
+            team = remaining[i]
+            del remaining[i]
+            return team
+
+        while remaining:
+            team = remaining.popleft()
+            partner = next((i for i, other in enumerate(remaining) if other not in opponents[team]), None)
+            if partner is not None:
+                pairs.append((team, take(partner)))
+                continue
+
+            swapped = False
+            for p in range(len(pairs) - 1, -1, -1):
+                c, d = pairs[p]
+                for x, y in ((c, d), (d, c)):
+                    if x in opponents[team]:
+                        continue
+                    free = next((i for i, other in enumerate(remaining) if other not in opponents[y]), None)
+                    if free is not None:
+                        pairs[p] = (x, team)
+                        pairs.append((y, take(free)))
+                        swapped = True
+                        break
+                if swapped:
+                    break
+            if not swapped:
+                pairs.append((team, remaining.popleft()))
+        return pairs
+
+    def update_swiss(self, round_number, match_results):
+        """
+        Records results for a Swiss round and draws the next round once every match in it is complete.
+
+        Args:
+            round_number (int): The round number to update (1-based index).
+            match_results (List[Dict]): Results with "team_a", "team_b", "team_a_goals" and "team_b_goals".
+
+        Returns:
+            dict: Updated match_data.
+        """
+        try:
+            self.update_league(round_number, match_results)
+
+            meta = self.match_data["swiss"]
+            round_key = f"round_{round_number}"
+            next_round = round_number + 1
+            round_complete = all(match["status"] == "complete" for match in self.match_data["fixtures"].get(round_key, []))
+            if round_complete and next_round <= meta["total_rounds"] and f"round_{next_round}" not in self.match_data["fixtures"]:
+                self.pair_swiss_round(next_round)
+        except Exception as e:
+            ErrorHandler().handle(e,context=f"Failed to update swiss round {round_number} in {self.tour_name}")
+        finally:
+            return self.match_data
+
     # ============================================================================ #
     #                                   knockouts                                  #
     # ============================================================================ #
     
-    def make_knockout(self, teams=None) -> Dict:
+    @staticmethod
+    def bracket_match_id(seed, round_number, position, bracket=""):
+        """
+        Match id derived from the bracket seed and the match's place in the bracket,
+        so regenerating a bracket with the same seed gives the same ids.
+
+        Returns:
+            str: 12 hex characters.
+        """
+        key = f"{seed}:{bracket}:{round_number}:{position}".encode()
+        return hashlib.blake2b(key, digest_size=6).hexdigest()
+
+    def make_knockout(self, teams=None, seed=None) -> Dict:
         """
         Creates a knockout structure for tournaments with optional home/away legs.
         Can be used for full knockout brackets or knockout after group stages.
 
+        The draw is a single seeded shuffle and each round is built in one pass, so generation
+        is linear in the number of entrants. The seed is stored in the knockout data; calling
+        again with the same teams (in the same order) and seed rebuilds the bracket exactly,
+        match ids included.
+
         Args:
             teams (list): List of team names. If None, uses self.teams.
-            target (str): Target key in self.match_data (e.g. "knock_outs" or "rounds").
+            seed (int, optional): Seed for the draw. A random one is picked if omitted.
 
         Returns:
             dict: Knockout match structure.
@@ -164,38 +787,25 @@ class TourManager:
             if not hasattr(self, 'match_data'):
                 self.match_data = {}
 
+            if seed is None:
+                seed = secrets.randbits(32)
             teams = list(teams or self.teams)
-            random.shuffle(teams)
+            random.Random(seed).shuffle(teams)
 
-            if target not in self.match_data:
-                self.match_data[target] = {"rounds": [], "table": {}}
-
-            self.match_data[target]["table"] = {
-                team: {
-                    "goals_scored": 0,
-                    "goals_conceded": 0,
-                    "goal_difference": 0,
-                    "points": 0,
-                    "matches_played": 0,
-                    "wins": 0,
-                    "draws": 0,
-                    "losses": 0
-                } for team in teams
-            }
+            self.match_data[target] = {"rounds": [], "table": {}, "seed": seed}
+            self.match_data[target]["table"] = {team: Standings.new_row() for team in teams}
 
             round_number = 1
             current_participants = [{"name": team} for team in teams]
 
             while len(current_participants) > 1:
-                random.shuffle(current_participants)
                 round_matches = []
                 next_round_participants = []
 
-                while len(current_participants) >= 2:
-                    team_a = current_participants.pop(0)
-                    team_b = current_participants.pop(0)
-
-                    match_id = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
+                for position in range(len(current_participants) // 2):
+                    team_a = current_participants[2 * position]
+                    team_b = current_participants[2 * position + 1]
+                    match_id = self.bracket_match_id(seed, round_number, position)
 
                     if getattr(self, "home_or_away", False):
                         match = {
@@ -237,9 +847,8 @@ class TourManager:
                     round_matches.append(match)
                     next_round_participants.append({"source_match": match_id, "name": None})
 
-                
-                if current_participants:
-                    next_round_participants.append(current_participants.pop(0))
+                if len(current_participants) % 2:
+                    next_round_participants.append(current_participants[-1])
 
                 self.match_data[target]["rounds"].append({
                     "round_number": round_number,
@@ -249,7 +858,7 @@ class TourManager:
                 current_participants = next_round_participants
                 round_number += 1
 
-            
+            self.index.add_knockouts(self.match_data[target])
         except Exception as e:
             ErrorHandler().handle(e,context='Failed to make knockouts')
         finally:
@@ -274,84 +883,9 @@ class TourManager:
             dict: The updated match_data including knockout progress.
         """
         try:
-            rounds = self.match_data.get("rounds", [])
-            current_round = next((r for r in rounds if r["round_number"] == round_number), None)
-            if not current_round:
+            if round_number not in self.index.knockout_rounds:
                 raise ValueError(f"Round {round_number} not found in knockout data.")
-            
-            for result in match_results:
-                team_a = result["team_a"]
-                team_b = result["team_b"]
-                goals_a = result["team_a_goals"]
-                goals_b = result["team_b_goals"]
-                leg_number = result.get("leg_number")
-                match = None
-                for m in current_round["matches"]:
-                    if "legs" in m:
-                        for leg in m["legs"]:
-                            name_a = leg.get("team_a", {}).get("name")
-                            name_b = leg.get("team_b", {}).get("name")
-                            if ((name_a == team_a and name_b == team_b) or
-                                (name_a == team_b and name_b == team_a)) and leg["leg_number"] == leg_number:
-                                match = m
-                                
-                                break
-                        if match:
-                            break
-                    else:
-                        name_a = m.get("team_a", {}).get("name")
-                        name_b = m.get("team_b", {}).get("name")
-                        if ((name_a == team_a and name_b == team_b) or
-                            (name_a == team_b and name_b == team_a)):
-                            match = m
-                            break
-
-                if not match:
-                    continue
-                    
-                if "legs" in match:
-                    leg = next((l for l in match["legs"] if l["leg_number"] == leg_number),None)
-                    if leg and leg["status"] != "complete":
-                        leg["team_a_goals"] = goals_a
-                        leg["team_b_goals"] = goals_b
-                        leg["status"] = "complete"
-
-                    if all(l["status"] == "complete" for l in match["legs"]):
-                        total_a = sum(l["team_a_goals"] for l in match["legs"])
-                        total_b = sum(l["team_b_goals"] for l in match["legs"])
-                        match["aggregate_team_a_goals"] = total_a
-                        match["aggregate_team_b_goals"] = total_b
-                        team_a_name = leg["team_a"]["name"]
-                        team_b_name = leg["team_b"]["name"]
-                        self.finalize_match_result(team_a_name, team_b_name,total_a,total_b,match)
-                else:
-                    if match["status"] != "complete":
-                        self.finalize_match_result(team_a,team_b,goals_a,goals_b,match)
-
-            all_matches_complete = all(m.get("status") == "complete" for m in current_round["matches"])
-
-            if all_matches_complete:
-                next_round = next((r for r in rounds if r["round_number"] == round_number + 1),None)
-                if next_round:
-                    for match in next_round["matches"]:
-                        if "legs" in match:
-                            for leg in match["legs"]:
-                                for side in ["team_a", "team_b"]:
-                                    participant = leg[side]
-                                    if isinstance(participant, dict) and participant.get("source_match"):
-                                        source_id = participant["source_match"]
-                                        source_match = next((m for m in current_round["matches"] if m["match_id"] == source_id),None)
-                                        if source_match:
-                                            participant["name"] = source_match["winner"]
-                        else:
-                            for side in ["team_a", "team_b"]:
-                                participant = match.get(side) 
-                                if isinstance(participant, dict) and participant.get("source_match"):
-                                    source_id = participant["source_match"]
-                                    source_match = next((m for m in current_round["matches"] if m["match_id"] == source_id),None)
-                                    if source_match:
-                                        participant["name"] = source_match["winner"]
-            
+            self._update_knockout_round(round_number, match_results)
         except Exception as e:
            ErrorHandler().handle(e,context=f'failed to update knouckout for {round_number} in {self.tour_name}')
         finally:
@@ -394,7 +928,7 @@ class TourManager:
                 index += group_size
                 remainder -= 1 if remainder > 0 else 0
 
-                group_manager = TourManager(self.match_data, groups[group_name], "league",self.home_or_away)
+                group_manager = TourManager({}, groups[group_name], "league",self.home_or_away)
                 group_matches[group_name] = group_manager.make_league()
 
             self.match_data = {
@@ -422,35 +956,24 @@ class TourManager:
             dict: The full match data including group fixtures. Updated from "match_results"
         """
         try:
-            next_round_players = []        
-            for group_name,group_data in self.match_data["group_stages"].items():
-                round_key = f"round_{round_number}"
-                group_matches = group_data['fixtures']      
-                for result in match_results:
-                    team_a = result["team_a"]
-                    team_b = result["team_b"]
-                    team_a_goals = result.get("team_a_goals")
-                    team_b_goals = result.get("team_b_goals")
-                    match = next((m for m in group_matches[round_key] if (m["team_a"] == team_a and m["team_b"] == team_b) or (m["team_a"] == team_b and m["team_b"] == team_a)), None)
-                    if match and  match['status'] != "complete":
-                        match["team_a_goals"] = team_a_goals
-                        match["team_b_goals"] = team_b_goals
-                        self.finalize_match_result(team_a,team_b,team_a_goals,team_b_goals,match,group_data=group_data)
-            all_matches_complete = True
-            for groups in self.match_data["group_stages"].values():
-                for round in groups["fixtures"].values():
-                    for match in round:
-                        if match['status']!= 'complete':
-                            all_matches_complete = False
-                            break
-                    
+            next_round_players = []
+            completed = 0
+            for result in match_results:
+                match, group_data = self.index.fixture(round_number, result["team_a"], result["team_b"])
+                if match and group_data is not None and match['status'] != "complete":
+                    team_a_goals, team_b_goals = self._goals_for_fixture(match, result)
+                    self.finalize_match_result(match["team_a"],match["team_b"],team_a_goals,team_b_goals,match,group_data=group_data)
+                    self.index.pending_group_matches -= 1
+                    completed += 1
+            all_matches_complete = completed and self.index.pending_group_matches == 0
 
             if all_matches_complete:
+                self.sort_tables()
                 teams_to_advance = self.teams_to_advance if self.teams_to_advance else 2
                 for groups in self.match_data["group_stages"].values():
                     rankings = list(groups["table"].keys())
                     next_round_players.extend(rankings[:teams_to_advance])#teams are sorted before hand
-                self.make_knockout(next_round_players)
+                self.make_knockout(next_round_players, seed=self.draw_seed)
         except Exception as e:
             ErrorHandler().handle(e,context=f"Failed to update the group stage for {round_number} in {self.tour_name}") 
         finally: 
@@ -471,29 +994,10 @@ class TourManager:
             None: Updates the group table in place.
         """
         try:
-            table = group_data["table"]
-            table[team]["goals_scored"] += goals_scored
-            table[team]["goals_conceded"] += goals_conceded
-            table[team]["goal_difference"] = (table[team]["goals_scored"] - table[team]["goals_conceded"])
-            table[team]["matches_played"] += 1
-            if result_type == "win":
-                table[team]["wins"] += 1
-                table[team]["points"] += 3
-            elif result_type == "draw":
-                table[team]["draws"] += 1
-                table[team]["points"] += 1
-            elif result_type == "loss":
-                table[team]["losses"] += 1
-            sorted_table = sorted(
-            table.items(),
-            key=lambda item: (
-                item[1]["points"], 
-                item[1]["goal_difference"], 
-                item[1]["wins"], 
-                item[1]["goals_scored"]
-            ), 
-            reverse=True )
-            group_data["table"] = {team[0]: team[1] for team in sorted_table}
+            if team not in group_data["table"]:
+                raise KeyError(team)
+            self._standings_for(group_data).record(team, goals_scored, goals_conceded, result_type)
+            self._order_table(group_data)
         except Exception as e:
             ErrorHandler().handle(e,context=f"Failed to update grp_ko for {self.tour_name}")
      
@@ -513,74 +1017,230 @@ class TourManager:
             dict: Updated match_data with knockout fixtures and table info.
         """
         try:
-            rounds = self.match_data["knock_outs"].get("rounds", [])
-            current_round = next(
-                (r for r in rounds if r["round_number"] == round_number), None
-            )
-            
-            next_round_players = []
-            for result in match_results:
-                
-                team_a = result["team_a"]
-                team_b = result["team_b"]
-                goals_a = result["team_a_goals"]
-                goals_b = result["team_b_goals"]
-                # Find the match using team names
-                match = next(
-                    (m for m in current_round['matches'] if (m["team_a"] == team_a and m["team_b"] == team_b) or (m["team_a"] == team_b and m["team_b"] == team_a)),
-                    None
-                )
-                if match['status'] !="complete":
-                    match["team_a_goals"] = goals_a
-                    match["team_b_goals"] = goals_b
-                    self.finalize_match_result(team_a,team_b,goals_a,goals_b,match)
-                    
-                    for team, scored, conceded in [
-                        (team_a, match["team_a_goals"], match["team_b_goals"]),
-                        (team_b, match["team_b_goals"], match["team_a_goals"]),
-                    ]:
-                        if team not in self.match_data["knock_outs"]["table"]:
-                            self.match_data["knock_outs"]["table"][team] = {
-                                "goals_scored": 0,
-                                "goals_conceded": 0,
-                                "goal_difference": 0,
-                                "points": 0,
-                                "matches_played": 0,
-                                "wins": 0,
-                                "draws": 0,
-                                "losses": 0,
-                            }
-                        self.match_data["knock_outs"]["table"][team]["goals_scored"] += scored
-                        self.match_data["knock_outs"]["table"][team]["goals_conceded"] += conceded
-                        self.match_data["knock_outs"]["table"][team]["goal_difference"] = (
-                            self.match_data["knock_outs"]["table"][team]["goals_scored"] -
-                            self.match_data["knock_outs"]["table"][team]["goals_conceded"]
-                        )
-                        self.match_data["knock_outs"]["table"][team]["matches_played"] += 1
-
-                        if match["winner"] == team:
-                            self.match_data["knock_outs"]["table"][team]["wins"] += 1
-                            self.match_data["knock_outs"]["table"][team]["points"] += 3
-                        elif match["winner"] is None:
-                            self.match_data["knock_outs"]["table"][team]["draws"] += 1
-                            self.match_data["knock_outs"]["table"][team]["points"] += 1
+            if round_number not in self.index.knockout_rounds:
+                raise ValueError(f"Round {round_number} not found in knockout stage.")
+            self._update_knockout_round(round_number, match_results, table_data=self.match_data["knock_outs"])
+        except Exception as e:
+            ErrorHandler().handle(e,context=f"Failed to update ko stage round {round_number} for {self.tour_name}")
+        finally:
+            return self.match_data
+
+    def _update_knockout_round(self, round_number, match_results, table_data=None):
+        """
+        Applies results to one knockout round and, once every match in the round is complete,
+        writes the winners into the placeholders of the next round.
+
+        Matches are found through the index by (round, pair, leg) and placeholders through
+        the index's source_match feeds, so nothing is scanned.
+
+        Args:
+            round_number (int): The knockout round number.
+            match_results (List[Dict]): Results with "team_a", "team_b", "team_a_goals", "team_b_goals" and optional "leg_number".
+            table_data (dict, optional): Holder of a knockout "table" to update as well (groups + knockout format).
+        """
+        current_round = self.index.knockout_rounds[round_number]
+        for result in match_results:
+            match, leg = self.index.knockout(round_number, result["team_a"], result["team_b"], result.get("leg_number"))
+            if not match or match["status"] == "complete":
+                continue
+
+            if leg is not None:
+                if leg["status"] == "complete":
+                    continue
+                leg["team_a_goals"], leg["team_b_goals"] = self._goals_for_fixture(leg, result)
+                leg["status"] = "complete"
+
+                if all(l["status"] == "complete" for l in match["legs"]):
+                    # Aggregate per team: the sides swap between legs.
+                    team_a_name = participant_name(match["legs"][0]["team_a"])
+                    team_b_name = participant_name(match["legs"][0]["team_b"])
+                    total_a = total_b = 0
+                    for l in match["legs"]:
+                        if participant_name(l["team_a"]) == team_a_name:
+                            total_a += l["team_a_goals"]
+                            total_b += l["team_b_goals"]
                         else:
-                            self.match_data["knock_outs"]["table"][team]["losses"] += 1
+                            total_a += l["team_b_goals"]
+                            total_b += l["team_a_goals"]
+                    match["aggregate_team_a_goals"] = total_a
+                    match["aggregate_team_b_goals"] = total_b
+                    self.finalize_match_result(team_a_name, team_b_name, total_a, total_b, match, group_data=table_data)
+            else:
+                goals_a, goals_b = self._goals_for_fixture(match, result)
+                self.finalize_match_result(participant_name(match["team_a"]), participant_name(match["team_b"]), goals_a, goals_b, match, group_data=table_data)
 
-                    match['status'] = 'complete'
-                # Check if all matches are complete
-            all_matches_complete = all(match.get('status') == 'complete'  for groups in self.match_data["group_stages"].values() for round in groups["fixtures"].values() for match in round )
-            if all_matches_complete:
-                teams_to_advance = self.teams_to_advance if self.teams_to_advance else 2
-                for groups in self.match_data["group_stages"].values():
-                    rankings = list(groups["table"].keys())
-                    next_round_players.extend(rankings[:teams_to_advance])
-                self.make_knockout(next_round_players) 
+        if all(m.get("status") == "complete" for m in current_round["matches"]):
+            for m in current_round["matches"]:
+                for next_round_number, next_match, participant in self.index.fed_by(m["match_id"]):
+                    participant["name"] = m["winner"]
+                    self.index.register_knockout(next_round_number, next_match)
+
+    def _goals_for_fixture(self, fixture, result):
+        """Goals from a submitted result, oriented to the fixture's own team_a/team_b order."""
+        if participant_name(fixture["team_a"]) == result["team_a"]:
+            return result["team_a_goals"], result["team_b_goals"]
+        return result["team_b_goals"], result["team_a_goals"]
+
+    # ============================================================================ #
+    #                              double elimination                              #
+    # ============================================================================ #
+    def make_double_elimination(self, seed=None) -> Dict:
+        """
+        Creates a double-elimination bracket: a winners bracket, a losers bracket and a grand final,
+        all generated up front.
+
+        The data keeps the cup shape ("rounds" with "matches", plus a "table") so the cup template
+        can render it; each round also carries its "bracket" and a display "name". Rounds are listed
+        in playing order (W1, W2, L1, L2, W3, L3, L4, ...). "routing" maps every match_id to the
+        slot its winner and its loser move to, as [round_number, match_id, side], so advancing a
+        result is a direct write. Entrants are padded with byes to a power of two; bye matches are
+        settled as soon as both slots are known. There is no bracket reset after the grand final.
+        Home/away legs are not used in this format. As in make_knockout, the draw and the match
+        ids come from a seed stored in the data, so the bracket can be rebuilt exactly.
+
+        Args:
+            seed (int, optional): Seed for the draw. A random one is picked if omitted.
+
+        Returns:
+            dict: The double-elimination match data.
+        """
+        bracket = {}
+        try:
+            teams = list(self.teams)
+            if not teams or len(teams) < 2:
+                raise ValueError("At least 2 teams required.")
+            if seed is None:
+                seed = secrets.randbits(32)
+            random.Random(seed).shuffle(teams)
+
+            size = 1 << (len(teams) - 1).bit_length()
+            depth = size.bit_length() - 1
+            slots = teams + ["Bye"] * (size - len(teams))
+
+            def new_match(bracket_name, round_index, position):
+                return {
+                    "match_id": self.bracket_match_id(seed, round_index + 1, position, bracket_name),
+                    "team_a": {"name": None},
+                    "team_b": {"name": None},
+                    "team_a_goals": None,
+                    "team_b_goals": None,
+                    "winner": None,
+                    "status": "pending"
+                }
+
+            winners = [[new_match("W", r, j) for j in range(size >> (r + 1))] for r in range(depth)]
+            losers = [[new_match("L", i, j) for j in range(size >> (2 + i // 2))] for i in range(2 * depth - 2)]
+            grand_final = new_match("F", 0, 0)
+
+            rounds = [("winners", "Winners Round 1", winners[0])]
+            for r in range(1, depth):
+                rounds.append(("winners", f"Winners Round {r + 1}", winners[r]))
+                rounds.append(("losers", f"Losers Round {2 * r - 1}", losers[2 * r - 2]))
+                rounds.append(("losers", f"Losers Round {2 * r}", losers[2 * r - 1]))
+            rounds.append(("final", "Grand Final", [grand_final]))
+
+            bracket = {"rounds": [], "table": {team: Standings.new_row() for team in teams}, "routing": {}, "seed": seed}
+            round_of = {}
+            for number, (kind, name, matches) in enumerate(rounds, start=1):
+                bracket["rounds"].append({"round_number": number, "bracket": kind, "name": name, "matches": matches})
+                for match in matches:
+                    round_of[match["match_id"]] = number
+
+            def slot(match, side):
+                return [round_of[match["match_id"]], match["match_id"], side]
+
+            def side(position):
+                return "team_a" if position % 2 == 0 else "team_b"
+
+            routing = bracket["routing"]
+            for r, matches in enumerate(winners):
+                for j, match in enumerate(matches):
+                    route = {}
+                    route["winner"] = slot(winners[r + 1][j // 2], side(j)) if r + 1 < depth else slot(grand_final, "team_a")
+                    if r == 0 and depth > 1:
+                        route["loser"] = slot(losers[0][j // 2], side(j))
+                    elif depth > 1:
+                        target = losers[2 * r - 1]
+                        route["loser"] = slot(target[len(target) - 1 - j], "team_b")
+                    else:
+                        route["loser"] = slot(grand_final, "team_b")
+                    routing[match["match_id"]] = route
+            for i, matches in enumerate(losers):
+                for j, match in enumerate(matches):
+                    if i == len(losers) - 1:
+                        winner_slot = slot(grand_final, "team_b")
+                    elif i % 2 == 0:
+                        winner_slot = slot(losers[i + 1][j], "team_a")
+                    else:
+                        winner_slot = slot(losers[i + 1][j // 2], side(j))
+                    routing[match["match_id"]] = {"winner": winner_slot, "loser": None}
+            routing[grand_final["match_id"]] = {"winner": None, "loser": None}
+
+            self.match_data = bracket
+            self.index = MatchIndex(bracket)
+            for j, match in enumerate(winners[0]):
+                self._fill_slot([1, match["match_id"], "team_a"], slots[j])
+                self._fill_slot([1, match["match_id"], "team_b"], slots[size - 1 - j])
         except Exception as e:
-            ErrorHandler().handle(e,context=f"Failed to update ko stage round {round_number} for {self.tour_name}")
+            ErrorHandler().handle(e,context='Failed to make double elimination')
+        finally:
+            return bracket
+
+    def update_double_elimination(self, round_number, match_results):
+        """
+        Records double-elimination results and moves each winner and loser straight to the slot
+        given by the routing table. Draws cannot be settled and are rejected.
+
+        Args:
+            round_number (int): The round the matches belong to.
+            match_results (List[Dict]): Results with "team_a", "team_b", "team_a_goals" and "team_b_goals".
+
+        Returns:
+            dict: Updated match_data.
+        """
+        try:
+            for result in match_results:
+                match, _ = self.index.knockout(round_number, result["team_a"], result["team_b"])
+                if not match or match["status"] == "complete":
+                    continue
+                goals_a, goals_b = self._goals_for_fixture(match, result)
+                if goals_a == goals_b:
+                    ErrorHandler().handle(ValueError(f"{result['team_a']} vs {result['team_b']} cannot end in a draw"), context=f"Double elimination round {round_number} in {self.tour_name}")
+                    continue
+                self.finalize_match_result(participant_name(match["team_a"]), participant_name(match["team_b"]), goals_a, goals_b, match)
+                self._advance_double_elimination(match)
+        except Exception as e:
+            ErrorHandler().handle(e,context=f"Failed to update double elimination round {round_number} in {self.tour_name}")
         finally:
             return self.match_data
 
+    def _advance_double_elimination(self, match):
+        """Writes a finished match's winner and loser into their routed slots."""
+        name_a, name_b = participant_name(match["team_a"]), participant_name(match["team_b"])
+        loser = name_b if match["winner"] == name_a else name_a
+        route = self.match_data["routing"][match["match_id"]]
+        if route.get("winner"):
+            self._fill_slot(route["winner"], match["winner"])
+        if route.get("loser"):
+            self._fill_slot(route["loser"], loser)
+
+    def _fill_slot(self, target, name):
+        """
+        Puts a participant into a routed slot. Once both sides are known the match is indexed,
+        and a match against a bye is settled immediately and advanced in turn.
+        """
+        round_number, match_id, side = target
+        match = self.index.knockout_match(match_id)
+        match[side]["name"] = name
+        name_a, name_b = participant_name(match["team_a"]), participant_name(match["team_b"])
+        if name_a is None or name_b is None:
+            return
+        self.index.register_knockout(round_number, match)
+        if "Bye" in (name_a, name_b):
+            match["winner"] = name_b if name_a == "Bye" else name_a
+            match["status"] = "complete"
+            self._advance_double_elimination(match)
+
     # ============================================================================ #
     #                                Init for tours                                #
     # ============================================================================ #
@@ -595,15 +1255,99 @@ class TourManager:
             ValueError: If the tournament type is unknown.
         """
         if self.tournament_type == "league":
-            return self.make_league()
+            match_data = self.make_league()
         elif self.tournament_type == "cup":
-            return self.make_knockout()
+            match_data = self.make_knockout()
         elif self.tournament_type == "groups_knockout":
-            return self.make_groups_stages()
+            match_data = self.make_groups_stages()
+        elif self.tournament_type == "swiss":
+            match_data = self.make_swiss()
+        elif self.tournament_type == "double_elim":
+            match_data = self.make_double_elimination()
         else:
             raise ValueError(f"Unknown tournament type: {self.tournament_type}")
-        
-        
+        self.match_data = match_data
+        self.index = MatchIndex(match_data)
+        return match_data
+
+    def update_round(self, round_number, match_results, KO=None):
+        """
+        Routes results for one round to the update method of this tournament type.
+
+        Args:
+            round_number (int): The round being updated.
+            match_results (List[Dict]): Results for that round.
+            KO (bool, optional): For groups_knockout, update the knockout stage instead of the groups.
+
+        Returns:
+            dict: The updated match_data.
+
+        Raises:
+            ValueError: If the tournament type is unknown.
+        """
+        if self.tournament_type == "league":
+            return self.update_league(round_number, match_results)
+        elif self.tournament_type == "cup":
+            return self.update_knockout(round_number, match_results)
+        elif self.tournament_type == "groups_knockout":
+            if KO:
+                return self.update_knockout_stage(round_number, match_results)
+            return self.update_groups_stages(round_number, match_results)
+        elif self.tournament_type == "swiss":
+            return self.update_swiss(round_number, match_results)
+        elif self.tournament_type == "double_elim":
+            return self.update_double_elimination(round_number, match_results)
+        raise ValueError(f"Invalid tournament type: {self.tournament_type}")
+
+    def apply_results(self, match_results, round_number=None, KO=None, commit=True, seed=None):
+        """
+        Applies a batch of results, possibly spanning several rounds, to match_data in memory.
+
+        Results are grouped by their "round" key (falling back to round_number) and applied
+        in round order, so a knockout round can be completed and the next one played in the
+        same batch. Table ordering is deferred while the batch runs and each touched table is
+        sorted once at the end. Elo, stats and history changes are staged in self.effects and
+        committed in one transaction when the whole batch has been applied; if it fails they are
+        discarded. match_data itself is not written to disk; the caller persists it once.
+
+        Args:
+            match_results (List[Dict]): Results as accepted by the per-round update methods,
+                each optionally carrying its own "round".
+            round_number (int, optional): Round for results without a "round" key.
+            KO (bool, optional): For groups_knockout, the results belong to the knockout stage.
+            commit (bool, optional): If False, staged effects are left for the caller to commit once match_data is saved.
+            seed (int, optional): Seed for any draw the batch triggers (the knockout after a group stage),
+                so applying the same batch again builds the same bracket. A random one is used if omitted.
+
+        Returns:
+            dict: The updated match_data.
+        """
+        self.draw_seed = seed
+        results_by_round = {}
+        for result in match_results:
+            number = result["round"] if result.get("round") is not None else round_number
+            if number is None:
+                raise ValueError(f"No round given for result {result}")
+            results_by_round.setdefault(MatchIndex.round_number(number), []).append(result)
+
+        self.effects.prefetch(self.teams or [])
+        self._defer_table_sort = True
+        self._in_batch = True
+        try:
+            for number in sorted(results_by_round):
+                self.update_round(number, results_by_round[number], KO=KO)
+            if commit:
+                self.effects.commit()
+        except Exception:
+            self.effects.discard()
+            raise
+        finally:
+            self._in_batch = False
+            self._defer_table_sort = False
+            self.sort_tables()
+        return self.match_data
+
+
     # ============================================================================ #
     #                       stat update for clans and players                      #
     # ============================================================================ #
@@ -617,18 +1361,13 @@ class TourManager:
             tuple: (winner_stats, loser_stats) if found, otherwise (None, None).
         """
         try:
-            winner = User.objects.get(username__iexact=winner_name)
-            loser = User.objects.get(username__iexact=loser_name)
-            if winner and loser:
-                winner_stats = winner.profile.stats
-                loser_stats = loser.profile.stats
-                if winner_stats and loser_stats:
-                    return winner_stats, loser_stats
-        except Http404:
-            return None, None
+            winner_stats = self.effects.player_stats(winner_name)
+            loser_stats = self.effects.player_stats(loser_name)
+            if winner_stats and loser_stats:
+                return winner_stats, loser_stats
         except Exception as e:
             ErrorHandler().handle(e,context="Failed to get player stats")
-            return None, None
+        return None, None
     
     def get_clan_stats(self,winner_name, loser_name):
         """Fetch ClanStats instances for both winner and loser.
@@ -640,19 +1379,17 @@ class TourManager:
             tuple: (winner_stats, loser_stats) if found, otherwise (None, None).
         """
         try:
-            winner = get_object_or_404(Clans, clan_name=winner_name)
-            loser = get_object_or_404(Clans, clan_name=loser_name)
-            if winner and loser:
-                return winner.stat, loser.stat
-        except Http404: #fails silently if clan not found might be a user
-            return None, None
+            winner_stats = self.effects.clan_stats(winner_name)
+            loser_stats = self.effects.clan_stats(loser_name)
+            if winner_stats and loser_stats:
+                return winner_stats, loser_stats
         except Exception as e:
             ErrorHandler().handle(e,context="Failed to get clan stats")
-            return None, None
+        return None, None
         
     def store_records(self, winner_name, loser_name, winner_goals, loser_goals, result_type):
         """
-        Update and store  records for the match result.
+        Stage match history records for both teams. They are inserted when the effects are committed.
 
         Args:
             winner_name (str): The profile of the winning team.
@@ -673,40 +1410,35 @@ class TourManager:
             ErrorHandler().handle(Exception("Could not find stats for winner or loser"), context="Failed to store records")
             return
 
-        winner_data = winner_stats.load_match_data_from_file()
-        loser_data = loser_stats.load_match_data_from_file()
         if result_type == "win":
             winner_result = "win"
             loser_result = "loss"
         elif result_type == "draw":
             winner_result = "draw"
             loser_result = "draw"
+        # History keeps the opponent's current name for display and the reference for lookups.
+        played_at = timezone.now()
         winner_entry = {
-            "date": timezone.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "tour_name":self.tour_name, 
-            "opponent": loser_name,  
-            "result": winner_result, 
-            "score": f"{winner_goals}:{loser_goals}"
+            "played_at": played_at,
+            "tour_name": self.tour_name,
+            "opponent": self.effects.display_name(loser_stats) or loser_name,
+            "opponent_ref": loser_name,
+            "result": winner_result,
+            "goals_for": winner_goals,
+            "goals_against": loser_goals,
         }
         loser_entry = {
-            "date": timezone.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "tour_name":self.tour_name,   
-            "opponent": winner_name,  
-            "result": loser_result, 
-            "score":f"{loser_goals}:{winner_goals}"
+            "played_at": played_at,
+            "tour_name": self.tour_name,
+            "opponent": self.effects.display_name(winner_stats) or winner_name,
+            "opponent_ref": winner_name,
+            "result": loser_result,
+            "goals_for": loser_goals,
+            "goals_against": winner_goals,
         }
 
-        if "matches" not in winner_data:
-            winner_data["matches"] = []
-        if "matches" not in loser_data:
-            loser_data["matches"] = []
-
-        winner_data["matches"].append(winner_entry)
-        loser_data["matches"].append(loser_entry)
-        winner_stats.match_data = winner_data 
-        loser_stats.match_data = loser_data 
-        winner_stats.save_match_data_to_file()
-        loser_stats.save_match_data_to_file()
+        self.effects.add_history(winner_stats, winner_entry)
+        self.effects.add_history(loser_stats, loser_entry)
 
     def get_player_elo_and_instance(self,name):
         """
@@ -718,13 +1450,10 @@ class TourManager:
         Returns:
             tuple: (elo_rating (float or int), stats instance) or (None, None) if not found.
         """
-        try:
-            player = User.objects.get(username__iexact=name)
-            instance = player.profile.stats
-            return instance.elo_rating, instance    
-        except Exception as e:
-            ErrorHandler().handle(e,context="Failed to get player elo")
+        instance = self.effects.player_stats(name)
+        if instance is None:
             return None, None
+        return instance.elo_rating, instance
 
     def get_clan_elo_and_instance(self,name):
         """
@@ -736,13 +1465,11 @@ class TourManager:
         Returns:
             tuple: (elo_rating (float or int), stats instance) or (None, None) if not found.
         """
-        try:
-            clan = Clans.objects.get(clan_name=name)
-            instance = clan.stat
-            return instance.elo_rating, instance
-        except Clans.DoesNotExist as e:
-            ErrorHandler().handle(e, context="Failed to get clan elo")
+        instance = self.effects.clan_stats(name)
+        if instance is None:
+            ErrorHandler().handle(Clans.DoesNotExist(f"No clan stats for {name}"), context="Failed to get clan elo")
             return None, None
+        return instance.elo_rating, instance
         
     def update_elo(self,winner_elo, loser_elo, k):
         """
@@ -775,7 +1502,7 @@ class TourManager:
             k (int): The K-factor for Elo calculation (default: 32).
 
         Returns:
-            None: Updates the database directly.
+            None: The rating changes are staged in self.effects; rank is derived from the stored Elo when they are written.
         """
         
         winner_elo, winner_instance = self.get_player_elo_and_instance(winner_name)
@@ -785,19 +1512,17 @@ class TourManager:
             winner_elo, winner_instance = self.get_clan_elo_and_instance(winner_name)
             loser_elo, loser_instance = self.get_clan_elo_and_instance(loser_name)
             
-        winner_new_elo, loser_new_elo = self.update_elo(winner_elo, loser_elo, k)
         if winner_instance and loser_instance:
-            winner_instance.elo_rating = winner_new_elo
-            winner_instance.save()
-            winner_instance.set_rank_based_on_elo()
-           
-            loser_instance.elo_rating = loser_new_elo
-            loser_instance.save()
-            loser_instance.set_rank_based_on_elo()
+            winner_new_elo, loser_new_elo = self.update_elo(winner_elo, loser_elo, k)
+            if winner_new_elo is None:
+                return
+            self.effects.add(winner_instance, elo_rating=winner_new_elo - winner_elo)
+            self.effects.add(loser_instance, elo_rating=loser_new_elo - loser_elo)
 
     def update_team_db_stats(self,team_a,team_b,goals_a, goals_b):
         """
-        Update clan statistics for two teams based on match results.
+        Update clan statistics for two teams based on match results. Changes are staged in self.effects;
+        win_rate is derived from the stored totals when they are written.
         
         Args:
             team_a (str): Name or identifier of team A.
@@ -808,13 +1533,10 @@ class TourManager:
        
         try:
             team_a_stat, team_b_stat = self.get_clan_stats(team_a, team_b)
-            print(f"Updating stats for {team_a} vs {team_b}: {goals_a}-{goals_b}")
             if team_a_stat is None or team_b_stat is None:
-                print(f"Stats not found for {team_a} or {team_b}, fetching player stats.")
                 # Fallback to player stats if clan stats are not available
                 team_a_stat, team_b_stat = self.get_player_stats(team_a, team_b)
                 if team_a_stat is None or team_b_stat is None:
-                    print(f"Player stats not found for {team_a} or {team_b}. Cannot update stats.")
                     return   
             if goals_a > goals_b:
                 result_a, result_b = "win", "loss"
@@ -827,19 +1549,16 @@ class TourManager:
                             (team_a_stat, goals_a, goals_b, result_a),
                             (team_b_stat, goals_b, goals_a, result_b)
                         ]:
-                stat.gd += gf-ga
-                stat.gf += gf
-                stat.ga += ga
-                stat.total_matches += 1
-                if result_type == "win":
-                    stat.total_wins += 1
-                elif result_type == "loss":
-                    stat.total_losses += 1
-                else:
-                    stat.total_draws += 1
-                win_rate = ((stat.total_wins + stat.total_draws/2) / stat.total_matches) * 100 if stat.total_matches > 0 else 0
-                stat.win_rate = round(win_rate,3)
-                stat.save()
+                self.effects.add(
+                    stat,
+                    gd=gf - ga,
+                    gf=gf,
+                    ga=ga,
+                    total_matches=1,
+                    total_wins=int(result_type == "win"),
+                    total_losses=int(result_type == "loss"),
+                    total_draws=int(result_type == "draw"),
+                )
         except Exception as e:
             ErrorHandler().handle(e,context="Failed to update team DB stats")
 
@@ -887,46 +1606,46 @@ class TourManager:
             - Updates goals, points, and match results.
             - Sorts the table by points, goal difference, wins, then goals scored.
         """
-        table = self.match_data.get("table")
-        if table:
-            if team not in table:
-                    table[team] = {
-                        "goals_scored": 0,
-                        "goals_conceded": 0,
-                        "goal_difference": 0,
-                        "points": 0,
-                        "matches_played": 0,
-                        "wins": 0,
-                        "draws": 0,
-                        "losses": 0,
-                    }
-            table[team]["goals_scored"] += goals_scored
-            table[team]["goals_conceded"] += goals_conceded
-            table[team]["goal_difference"] = (table[team]["goals_scored"] - table[team]["goals_conceded"])
-            table[team]["matches_played"] += 1
-
-            if result_type == "win":
-                table[team]["wins"] += 1
-                table[team]["points"] += 3
-            elif result_type == "draw":
-                table[team]["draws"] += 1
-                table[team]["points"] += 1
-            elif result_type == "loss":
-                table[team]["losses"] += 1
-            sorted_table = sorted(
-            table.items(),
-            key=lambda item: (
-                item[1]["points"], 
-                item[1]["goal_difference"], 
-                item[1]["wins"], 
-                item[1]["goals_scored"]
-            ), 
-            reverse=True 
-            )
-        
+        if self.match_data.get("table"):
+            self._standings_for(self.match_data).record(team, goals_scored, goals_conceded, result_type)
+            self._order_table(self.match_data)
+
+    def _standings_for(self, holder):
+        """The Standings kept for holder["table"], created on first use and rebuilt if the table was replaced."""
+        standings = self._standings.get(id(holder))
+        if standings is None or standings.source is not holder["table"]:
+            standings = Standings(holder["table"])
+            self._standings[id(holder)] = standings
+        return standings
+
+    def _order_table(self, holder):
+        """
+        Writes the ordered table back to holder["table"].
+
+        Rows are kept in order by the holder's Standings, so this only rebuilds the mapping.
+        While a batch is being applied (see apply_results) even that is deferred: the holder
+        is marked dirty and written once by sort_tables() when the batch ends.
+
+        Args:
+            holder (dict): The dict that owns the "table" (match_data, a group, or the knockout stage).
+        """
+        if self._defer_table_sort:
+            self._dirty_tables[id(holder)] = holder
+            return
+        standings = self._standings_for(holder)
+        holder["table"] = standings.as_table()
+        standings.source = holder["table"]
+
+    def sort_tables(self):
+        """Writes out every table touched since the last call, once each."""
+        dirty, self._dirty_tables = self._dirty_tables, {}
+        deferred, self._defer_table_sort = self._defer_table_sort, False
+        try:
+            for holder in dirty.values():
+                self._order_table(holder)
+        finally:
+            self._defer_table_sort = deferred
 
-            self.match_data["table"] = {team[0]: team[1] for team in sorted_table}
-        
 
     def _handle_result(self, winner, loser, winner_goals, loser_goals,group_data=None):
         """
@@ -956,6 +1675,7 @@ class TourManager:
         
         # Update database statistics for the teams
         self.update_team_db_stats(team_a=winner,team_b=loser, goals_a=winner_goals, goals_b=loser_goals)
+        self.flush_effects()
 
     def _handle_draw(self, team_a, team_b, goals_a, goals_b,group_data=None):
         """
@@ -981,5 +1701,11 @@ class TourManager:
         
         # Update database statistics for the teams
         self.update_team_db_stats(team_a,team_b,goals_a, goals_b)
+        self.flush_effects()
+
+    def flush_effects(self):
+        """Commits staged side effects right away unless a batch is running (apply_results commits once at its end)."""
+        if not self._in_batch:
+            self.effects.commit()
 
 
@@ -0,0 +1,302 @@
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Concat, Right, Round
+from django.db.models.lookups import LessThan
+from django.contrib.auth.models import User
+from clans.models import Clans, ClanStats
+from users.models import PlayerStats
+from scripts.error_handle import ErrorHandler
+from .leaderboard import leaderboard
+from .rank_index import RankIndex
+from .participants import parse_ref, participant_ref
+
+# PlayerStats/ClanStats.recent_form keeps this many results, one letter each, oldest first.
+RECENT_FORM_LENGTH = 10
+FORM_LETTERS = {"win": "W", "loss": "L", "draw": "D"}
+
+
+class MatchUnitOfWork:
+    """
+    Collects the side effects of match results (Elo, rank, DB stats, match history) and writes them together.
+
+    TourManager stages every change here instead of saving as it goes. Stats rows are looked up once
+    per participant and reused, so later matches in the same batch see the Elo and totals of earlier ones.
+    Participants are "user:<pk>"/"clan:<pk>" references (see participants.py), resolved by primary key;
+    plain names from data that predates references are still looked up by name.
+    Counters are staged as deltas: commit() writes each changed row with one atomic
+    "field = field + delta" UPDATE and inserts the staged history as MatchRecord rows, all inside a
+    single transaction.
+    """
+    STAT_FIELDS = [
+        "elo_rating",
+        "rank",
+        "gd",
+        "gf",
+        "ga",
+        "total_matches",
+        "total_wins",
+        "total_losses",
+        "total_draws",
+        "win_rate",
+        "recent_form",
+    ]
+
+    def __init__(self, tournament=None):
+        """
+        Args:
+            tournament (Model, optional): ClanTournament or IndiTournament the results belong to, linked from the history records.
+        """
+        self.tournament = tournament
+        self._players = {}
+        self._clans = {}
+        self._changes = {}
+        self._history = []
+
+    # ============================================================================ #
+    #                                    lookups                                   #
+    # ============================================================================ #
+    def prefetch(self, names):
+        """
+        Loads the stats rows for many participants at once: one query per kind of participant.
+
+        Args:
+            names (list): Participant references (or legacy usernames / clan names).
+        """
+        try:
+            pending = [name for name in set(names) if name and name not in self._players and name not in self._clans]
+            refs = {"user": {}, "clan": {}}
+            legacy = []
+            for name in pending:
+                kind, pk = parse_ref(name)
+                if kind:
+                    refs[kind][pk] = name
+                else:
+                    legacy.append(name)
+
+            if refs["user"]:
+                rows = PlayerStats.objects.filter(user_profile__user_id__in=refs["user"]).select_related("user_profile__user")
+                found = {row.user_profile.user_id: row for row in rows}
+                for pk, name in refs["user"].items():
+                    self._players[name] = found.get(pk)
+            if refs["clan"]:
+                rows = ClanStats.objects.filter(clan_id__in=refs["clan"]).select_related("clan")
+                found = {row.clan_id: row for row in rows}
+                for pk, name in refs["clan"].items():
+                    self._clans[name] = found.get(pk)
+            if legacy:
+                self._prefetch_names(legacy)
+        except Exception as e:
+            ErrorHandler().handle(e, context="Failed to prefetch match stats")
+
+    def _prefetch_names(self, names):
+        users = User.objects.filter(username__in=names).select_related("profile__stats")
+        found = {user.username: user for user in users}
+        for name in names:
+            user = found.get(name)
+            self._players[name] = self._user_stats(user) if user else None
+
+        clan_names = [name for name in names if self._players[name] is None and name not in self._clans]
+        clans = Clans.objects.filter(clan_name__in=clan_names).select_related("stat")
+        found = {clan.clan_name: clan for clan in clans}
+        for name in clan_names:
+            clan = found.get(name)
+            self._clans[name] = self._clan_stats(clan) if clan else None
+
+    @staticmethod
+    def _user_stats(user):
+        try:
+            return user.profile.stats
+        except Exception:
+            return None
+
+    @staticmethod
+    def _clan_stats(clan):
+        try:
+            return clan.stat
+        except Exception:
+            return None
+
+    def player_stats(self, name):
+        """PlayerStats for a "user:<pk>" reference (or a legacy username, case-insensitive), or None."""
+        if name not in self._players:
+            kind, pk = parse_ref(name)
+            if kind == "user":
+                self._players[name] = PlayerStats.objects.select_related("user_profile__user").filter(user_profile__user_id=pk).first()
+            elif kind:
+                self._players[name] = None
+            else:
+                user = User.objects.select_related("profile__stats").filter(username__iexact=name).first()
+                self._players[name] = self._user_stats(user) if user else None
+        return self._players[name]
+
+    def clan_stats(self, name):
+        """ClanStats for a "clan:<pk>" reference (or a legacy clan name), or None."""
+        if name not in self._clans:
+            kind, pk = parse_ref(name)
+            if kind == "clan":
+                self._clans[name] = ClanStats.objects.select_related("clan").filter(clan_id=pk).first()
+            elif kind:
+                self._clans[name] = None
+            else:
+                clan = Clans.objects.select_related("stat").filter(clan_name=name).first()
+                self._clans[name] = self._clan_stats(clan) if clan else None
+        return self._clans[name]
+
+    @staticmethod
+    def stats_ref(stats):
+        """Participant reference of a stats row (its profile is already loaded with it, so no query)."""
+        if isinstance(stats, ClanStats):
+            return f"clan:{stats.clan_id}"
+        return participant_ref(stats.user_profile)
+
+    @staticmethod
+    def display_name(stats):
+        """Current username or clan name for a stats row (already loaded with it, so no query)."""
+        if isinstance(stats, ClanStats):
+            return stats.clan.clan_name
+        return stats.user_profile.user.username
+
+    # ============================================================================ #
+    #                                    staging                                   #
+    # ============================================================================ #
+    def add(self, stats, **deltas):
+        """
+        Adds to counters of a stats row (elo_rating, gd, gf, ga, total_*). The row in memory changes at
+        once, so later matches in the batch see it; commit() writes the summed changes as "x = x + n".
+
+        Args:
+            stats (PlayerStats | ClanStats): The row.
+            **deltas: Field name -> amount to add.
+        """
+        for field, delta in deltas.items():
+            setattr(stats, field, getattr(stats, field) + delta)
+        pending = self._change(stats)["deltas"]
+        for field, delta in deltas.items():
+            pending[field] = pending.get(field, 0) + delta
+
+    def add_history(self, stats, entry):
+        """
+        Queues a match history record for a participant and adds its result to the row's recent_form.
+
+        Args:
+            stats (PlayerStats | ClanStats): The participant's stats row.
+            entry (dict): MatchRecord fields other than participant and tournament.
+        """
+        letter = FORM_LETTERS.get(entry["result"], "D")
+        self._history.append((stats, entry))
+        stats.recent_form = ((stats.recent_form or "") + letter)[-RECENT_FORM_LENGTH:]
+        self._change(stats)["form"] += letter
+
+    def _change(self, stats):
+        return self._changes.setdefault((type(stats), stats.pk), {"stats": stats, "deltas": {}, "form": ""})
+
+    def has_changes(self):
+        return bool(self._changes or self._history)
+
+    def commit(self):
+        """
+        Writes every staged change, stats rows and history records, in one transaction.
+        Staged state is cleared whether or not the write succeeds. Elo changes also move the rows in
+        the rank index, and the leaderboards they affect get a new version once the transaction commits.
+        """
+        changes, self._changes = self._changes, {}
+        history, self._history = self._history, []
+        if not changes and not history:
+            return
+
+        with transaction.atomic():
+            moves = {}
+            for change in changes.values():
+                moved = self._write_stats(change)
+                if moved:
+                    moves.setdefault(RankIndex.kind_of(change["stats"]), []).append(moved)
+            if history:
+                self._write_history(history)
+            for kind, kind_moves in moves.items():
+                RankIndex(kind).move(kind_moves)
+            if moves:
+                kinds = list(moves)
+                # After the commit, so concurrent results do not queue on the version rows.
+                transaction.on_commit(lambda: leaderboard.invalidate(kinds))
+
+    def discard(self):
+        """Drops staged changes without writing them."""
+        self._changes = {}
+        self._history = []
+
+    @staticmethod
+    def _write_stats(change):
+        """
+        One UPDATE for a stats row that adds the staged deltas to the stored values, so results
+        recorded at the same time by other workers (other tournaments of the same clan or player)
+        are never overwritten. rank, win_rate and recent_form are derived from the stored values
+        in the same statement. When the Elo changed, the new value is read back for the rank index;
+        the UPDATE has locked the row, so it is the value this statement wrote.
+
+        Returns:
+            tuple: (old Elo, new Elo) as stored, if the Elo changed; otherwise None.
+        """
+        stats, deltas, form = change["stats"], change["deltas"], change["form"]
+        values = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if deltas.get("elo_rating"):
+            elo = F("elo_rating") + deltas["elo_rating"]
+            values["rank"] = Case(
+                *[When(LessThan(elo, threshold), then=Value(rank)) for threshold, rank in stats.RANK_THRESHOLDS],
+                default=Value(stats.TOP_RANK),
+            )
+        if deltas.get("total_matches"):
+            wins = Cast(F("total_wins") + deltas.get("total_wins", 0), FloatField())
+            draws = Cast(F("total_draws") + deltas.get("total_draws", 0), FloatField())
+            values["win_rate"] = Round((wins + draws / 2) * 100 / (F("total_matches") + deltas["total_matches"]), 3)
+        if form:
+            values["recent_form"] = Right(Concat(F("recent_form"), Value(form)), RECENT_FORM_LENGTH)
+        if not values:
+            return None
+
+        rows = type(stats).objects.filter(pk=stats.pk)
+        if not rows.update(**values) or not deltas.get("elo_rating"):
+            return None
+        elo = rows.select_for_update().values_list("elo_rating", flat=True).first()
+        return (elo - deltas["elo_rating"], elo) if elo is not None else None
+
+    def _write_history(self, history):
+        """Inserts the staged history records with one bulk INSERT."""
+        from .models import ClanTournament, MatchRecord
+        tournament_field = "clan_tournament" if isinstance(self.tournament, ClanTournament) else "indi_tournament"
+        MatchRecord.objects.bulk_create([
+            MatchRecord(participant=self.stats_ref(stats), **{tournament_field: self.tournament}, **entry)
+            for stats, entry in history
+        ])
+
+
+class NullUnitOfWork(MatchUnitOfWork):
+    """
+    A unit of work that never touches the database.
+
+    Every participant gets an unsaved PlayerStats, so Elo and stats are still calculated in memory
+    but nothing is read or written. Used to measure the tournament engine on its own.
+    """
+    def prefetch(self, names):
+        pass
+
+    def player_stats(self, name):
+        if name not in self._players:
+            self._players[name] = PlayerStats()
+        return self._players[name]
+
+    def clan_stats(self, name):
+        return self.player_stats(name)
+
+    @staticmethod
+    def display_name(stats):
+        return ""
+
+    def add(self, stats, **deltas):
+        for field, delta in deltas.items():
+            setattr(stats, field, getattr(stats, field) + delta)
+
+    def add_history(self, stats, entry):
+        pass
+
+    def commit(self):
+        pass
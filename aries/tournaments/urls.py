@@ -7,6 +7,8 @@ urlpatterns = [
     path('', views.tours, name='tournament-home'),
     path('cvc_tour_view/<int:tour_id>/', views.tours_cvc_view, name='cvc_details'),
     path('indi_tour_view/<int:tour_id>/', views.tours_indi_view, name='indi_details'),
+    path('cvc_tour_view/<int:tour_id>/round/<int:round_number>/', views.tours_cvc_round, name='cvc_round'),
+    path('indi_tour_view/<int:tour_id>/round/<int:round_number>/', views.tours_indi_round, name='indi_round'),
     path('create_clan_tournament/', views.create_clan_tournament, name='create_clan_tournament'),
     path('create_indi_tournament/', views.create_indi_tournament, name='create_indi_tournament'),
     path('update_indi_tournament/<int:tour_id>/', views.update_indi_tour, name='update_indi_tournament'),
@@ -3,7 +3,7 @@ from django.shortcuts import render, redirect,get_object_or_404,HttpResponse
 from django.contrib.auth.decorators import login_required
 import resend
 from .forms import IndiTournamentForm, ClanTournamentForm,MatchResultForm
-from .models import ClanTournament, IndiTournament, ClanTournamentPlayer
+from .models import ClanTournament, IndiTournament, ClanTournamentPlayer, load_match_header
 from django.conf import settings
 from scripts.email_handle import notify_tournament_players
 from clans.models import Clans
@@ -11,7 +11,19 @@ from users.models import Profile
 from django.db.models import Count,Q
 from django.contrib.auth.models import User
 from django.urls import reverse
-from .tourmanager import TourManager
+from .tourmanager import TourManager, LazyRoundRobin
+from .participants import resolve_participant, display_name, parse_ref
+from .file_store import stored_version, data_version
+from .round_shards import RoundShards
+from .archive import TournamentArchive
+from django.http import Http404
+from django.core.cache import cache
+
+# Enriched tournament pages are keyed by file version, so a write makes the old entry unreachable;
+# the timeout only bounds how long renamed participants or new logos take to show.
+TOURNAMENT_VIEW_CACHE_TIMEOUT = 60 * 60
+# League and Swiss pages render one round and load the others from tours_*_round on demand.
+ROUND_FRAGMENT_TYPES = ("league", "swiss")
 
 def tours(request):
     """
@@ -53,10 +65,15 @@ def tours_cvc_view(request,tour_id):
 
     """
     cvc_tournaments = get_object_or_404(ClanTournament, id=tour_id)
-    match_data = cvc_tournaments.load_match_data_from_file()
     tour_kind = 'cvc'
-
-    match_data, rounds = process_tournament_data(cvc_tournaments.tour_type,match_data,resolver=resolve_team_clan,tournament=cvc_tournaments)
+    if cvc_tournaments.archived_at:
+        return render(request, 'tournaments/tours_veiw.html', {
+            'tour': cvc_tournaments,
+            'archived_html': archived_fragment(cvc_tournaments, tour_kind),
+            'tour_kind': tour_kind
+        })
+
+    match_data, rounds = tournament_view_model(cvc_tournaments, tour_kind, resolver=TeamResolver("clan"))
     return render(request, 'tournaments/tours_veiw.html', {
         'tour': cvc_tournaments,
         'match_data': match_data,
@@ -74,15 +91,15 @@ def tours_indi_view(request,tour_id):
 
     """
     indi_tournaments = get_object_or_404(IndiTournament, id=tour_id)
-    match_data = indi_tournaments.load_match_data_from_file()
     tour_kind = 'indi'
+    if indi_tournaments.archived_at:
+        return render(request, 'tournaments/tours_veiw.html', {
+            'tour': indi_tournaments,
+            'archived_html': archived_fragment(indi_tournaments, tour_kind),
+            'tour_kind': tour_kind
+        })
 
-    match_data, rounds = process_tournament_data(
-        indi_tournaments.tour_type,
-        match_data,
-        resolver=resolve_team_user,
-        tournament=indi_tournaments
-    )
+    match_data, rounds = tournament_view_model(indi_tournaments, tour_kind, resolver=TeamResolver("user"))
 
     return render(request, 'tournaments/tours_veiw.html', {
         'tour': indi_tournaments,
@@ -91,6 +108,34 @@ def tours_indi_view(request,tour_id):
         'tour_kind': tour_kind
     })
 
+def tours_cvc_round(request, tour_id, round_number):
+    """
+    Fragment with one round's fixtures of a Clan vs Clan league or Swiss tournament, loaded by the round tabs.
+
+    Args:
+        request (HttpRequest): Incoming HTTP request object.
+        tour_id (int): The primary key (ID) of the ClanTournament.
+        round_number (int): The round to render.
+    """
+    tournament = get_object_or_404(ClanTournament, id=tour_id)
+    if tournament.archived_at:
+        return HttpResponse(archived_fragment(tournament, 'cvc', round_number))
+    return render_round(request, tournament, 'cvc', TeamResolver("clan"), round_number)
+
+def tours_indi_round(request, tour_id, round_number):
+    """
+    Fragment with one round's fixtures of an individual league or Swiss tournament, loaded by the round tabs.
+
+    Args:
+        request (HttpRequest): Incoming HTTP request object.
+        tour_id (int): The primary key (ID) of the IndiTournament.
+        round_number (int): The round to render.
+    """
+    tournament = get_object_or_404(IndiTournament, id=tour_id)
+    if tournament.archived_at:
+        return HttpResponse(archived_fragment(tournament, 'indi', round_number))
+    return render_round(request, tournament, 'indi', TeamResolver("user"), round_number)
+
 
 @login_required
 def create_clan_tournament(request):
@@ -173,15 +218,15 @@ def update_indi_tour(request, tour_id):
         - Reads `team_a`, `team_b`, and round number (regular or knockout) from query params.
         - On GET: displays a form for entering match scores.
         - On POST: validates and updates the tournament data via its `update_tour()` method.
-        - Redirects to tournament details after successful update.
+        - Redirects to tournament details after successful update, or straight away for an archived tournament.
 
     Args:
         request (HttpRequest): HTTP request object.
         tour_id (int): ID of the Individual Tournament to update.
 
     Query Parameters:
-        team_a (str): Name of team A.
-        team_b (str): Name of team B.
+        team_a (str): Participant reference of team A ("user:<pk>", or a username in older tournaments).
+        team_b (str): Participant reference of team B.
         round (int): Round number for league/group stages.
         kround (int): Knockout round number (if applicable).
         leg (int): Optional leg number for multi-leg matches.
@@ -190,8 +235,12 @@ def update_indi_tour(request, tour_id):
         HttpResponse: Rendered template or redirect.
     """
     indi_tournament = get_object_or_404(IndiTournament, id=tour_id)
-    team_a_name = request.GET.get('team_a', '')
-    team_b_name = request.GET.get('team_b', '')
+    if indi_tournament.archived_at:
+        return redirect(reverse("indi_details", kwargs={"tour_id": indi_tournament.id}))
+    team_a_ref = request.GET.get('team_a', '')
+    team_b_ref = request.GET.get('team_b', '')
+    team_a_name = resolve_team_user(team_a_ref)["display_name"]
+    team_b_name = resolve_team_user(team_b_ref)["display_name"]
    
     # Determine round number (kround takes priority if present)
     round_num = int(request.GET.get('kround') or request.GET.get('round') or 0)
@@ -202,8 +251,8 @@ def update_indi_tour(request, tour_id):
             match_results = [
                 {
                     "round": round_num,
-                    "team_a": team_a_name,
-                    "team_b": team_b_name,
+                    "team_a": team_a_ref,
+                    "team_b": team_b_ref,
                     "team_a_goals": form.cleaned_data["team_a_goals"],
                     "team_b_goals": form.cleaned_data["team_b_goals"],
                     "leg_number": leg_number
@@ -213,7 +262,8 @@ def update_indi_tour(request, tour_id):
             indi_tournament.update_tour(
                 round_num,
                 match_results,
-                KO=bool(request.GET.get('kround'))
+                KO=bool(request.GET.get('kround')),
+                entered_by=request.user
             )
             return redirect(reverse("indi_details", kwargs={"tour_id": indi_tournament.id}))
     else:
@@ -267,13 +317,17 @@ def assign_user_to_tournament(request, tournament_id, clan_id):
 def update_clan_tour(request, tour_id):
     """View function to update a clan tournament match result."""
     cvc_tournaments = get_object_or_404(ClanTournament, id=tour_id)
+    if cvc_tournaments.archived_at:
+        return redirect(reverse("cvc_details", kwargs={"tour_id": cvc_tournaments.id}))
     team_names = [team.clan_name for team in cvc_tournaments.teams.all()]
 
-    team_a_name = request.GET.get('team_a', '')
-    team_b_name = request.GET.get('team_b', '')
+    team_a_ref = request.GET.get('team_a', '')
+    team_b_ref = request.GET.get('team_b', '')
 
-    team_a_clan = get_object_or_404(Clans, clan_name=team_a_name)
-    team_b_clan = get_object_or_404(Clans, clan_name=team_b_name)
+    team_a_clan = get_participant_or_404(team_a_ref, "clan")
+    team_b_clan = get_participant_or_404(team_b_ref, "clan")
+    team_a_name = team_a_clan.clan_name
+    team_b_name = team_b_clan.clan_name
 
     team_a_players = list(team_a_clan.members.all())
     team_b_players = list(team_b_clan.members.all())
@@ -317,8 +371,8 @@ def update_clan_tour(request, tour_id):
 
         final_match_results = [{
         "round": round_num,
-        "team_a": team_a_name,
-        "team_b": team_b_name,
+        "team_a": team_a_ref,
+        "team_b": team_b_ref,
         "team_a_goals": team_a_wins,
         "team_a_player_goals": team_a_total_goals,
         "team_b_goals": team_b_wins,
@@ -329,7 +383,8 @@ def update_clan_tour(request, tour_id):
         # Update the tournament with the final match result
         cvc_tournaments.update_tour(
             round_num,
-            final_match_results,KO=bool(request.GET.get('kround'))
+            final_match_results,KO=bool(request.GET.get('kround')),
+            entered_by=request.user
         )
         return redirect(reverse("cvc_details", kwargs={"tour_id": cvc_tournaments.id}))
 
@@ -342,12 +397,25 @@ def update_clan_tour(request, tour_id):
     })
 
 # ============================= Non veiw function ============================ #
+def get_participant_or_404(ref, legacy_kind):
+    """
+    Fetches the User or Clans a participant reference points to, raising Http404 if it does not exist.
+
+    Args:
+        ref (str): "user:<pk>"/"clan:<pk>", or a plain name in tournaments created before references.
+        legacy_kind (str): "user" or "clan"; how a plain name is looked up.
+    """
+    participant = resolve_participant(ref, legacy_kind=legacy_kind)
+    if participant is None:
+        raise Http404(f"No participant matches {ref}")
+    return participant
+
 def resolve_team_clan(name):
     """
-    Resolves a clan name into display metadata (name + logo).
+    Resolves a clan reference into display metadata (name + logo).
 
     Args:
-        name (str): Clan name string, or "Bye"/None if no opponent.
+        name (str): Clan reference ("clan:<pk>") or legacy clan name, or "Bye"/None if no opponent.
 
     Returns:
         dict: {
@@ -357,15 +425,15 @@ def resolve_team_clan(name):
     """
     if name == "Bye" or name is None:
         return {"display_name": "TBD", "logo": None}
-    clan = get_object_or_404(Clans, clan_name=name)
-    return {"display_name": clan.clan_name, "logo": clan.clan_logo}
+    clan = get_participant_or_404(name, "clan")
+    return {"display_name": display_name(clan), "logo": clan.clan_logo}
 
 def resolve_team_user(name):
     """
-    Resolves a username into display metadata (name + profile picture).
+    Resolves a user reference into display metadata (name + profile picture).
 
     Args:
-        name (str): Username string, or "Bye"/None if no opponent.
+        name (str): User reference ("user:<pk>") or legacy username, or "Bye"/None if no opponent.
 
     Returns:
         dict: {
@@ -375,17 +443,199 @@ def resolve_team_user(name):
     """
     if name == "Bye" or name is None:
         return {"display_name": "TBD", "logo": None}
-    user = User.objects.get(username=name)
-    return {"display_name": user.username, "logo": user.profile.profile_picture}
+    user = get_participant_or_404(name, "user")
+    return {"display_name": display_name(user), "logo": user.profile.profile_picture}
+
+class TeamResolver:
+    """
+    A batched resolve_team_clan / resolve_team_user.
+
+    process_tournament_data calls prefetch() with every participant of the tournament first, which
+    loads them with one query for the entity type (users together with their profile); calling the
+    resolver then only reads from the in-memory map. Anything not prefetched falls back to a single lookup.
+    """
+    def __init__(self, kind):
+        """
+        Args:
+            kind (str): "clan" or "user".
+        """
+        self.kind = kind
+        self._resolved = {}
+
+    def prefetch(self, names):
+        """Resolves many participant references (or legacy names) in one query."""
+        refs, legacy = {}, set()
+        for name in set(names):
+            if name == "Bye" or name is None or name in self._resolved:
+                continue
+            kind, pk = parse_ref(name)
+            if kind == self.kind:
+                refs[pk] = name
+            elif kind is None:
+                legacy.add(name)
+        if not refs and not legacy:
+            return
+
+        if self.kind == "clan":
+            for clan in Clans.objects.filter(Q(pk__in=list(refs)) | Q(clan_name__in=legacy)):
+                self._remember(clan.pk, clan.clan_name, refs, legacy, {"display_name": clan.clan_name, "logo": clan.clan_logo})
+        else:
+            for user in User.objects.select_related("profile").filter(Q(pk__in=list(refs)) | Q(username__in=legacy)):
+                self._remember(user.pk, user.username, refs, legacy, {"display_name": user.username, "logo": user.profile.profile_picture})
+
+    def _remember(self, pk, name, refs, legacy, info):
+        if pk in refs:
+            self._resolved[refs[pk]] = info
+        if name in legacy:
+            self._resolved[name] = info
+
+    def __call__(self, name):
+        if name == "Bye" or name is None:
+            return {"display_name": "TBD", "logo": None}
+        if name not in self._resolved:
+            resolve = resolve_team_clan if self.kind == "clan" else resolve_team_user
+            self._resolved[name] = resolve(name)
+        return self._resolved[name]
+
+def collect_participants(node, found=None):
+    """Every participant that appears in match data: fixture and leg sides, table rows and lazy league orders."""
+    found = set() if found is None else found
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ("team_a", "team_b"):
+                found.add(value.get("name") if isinstance(value, dict) else value)
+            elif key == "table" and isinstance(value, dict):
+                found.update(value)
+            elif key == "order" and isinstance(value, list):
+                found.update(value)
+            else:
+                collect_participants(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            collect_participants(value, found)
+    return found
+
+def tournament_view_model(tournament, tour_kind, resolver):
+    """
+    Returns the enriched (match_data, rounds) for a tournament page, cached per tournament version.
+
+    The version is read from the first bytes of the tournament file, so a page whose results have not
+    changed costs that peek and one cache read. update_tour and create_matches bump the version when
+    they write, which is what invalidates the entry. League and Swiss pages are built by
+    league_view_model, which reads only the table and the current round.
+
+    Args:
+        tournament (Model): ClanTournament or IndiTournament.
+        tour_kind (str): 'cvc' or 'indi', part of the cache key.
+        resolver (callable): Passed to process_tournament_data on a miss.
+
+    Returns:
+        tuple: (match_data, rounds) as returned by process_tournament_data, or by league_view_model.
+    """
+    version = stored_version(tournament.get_json_file_path())
+    view_model = cache.get(f"tournament_page_{tour_kind}_{tournament.pk}_{version}")
+    if view_model is None:
+        if tournament.tour_type in ROUND_FRAGMENT_TYPES:
+            version, view_model = league_view_model(tournament, resolver)
+        else:
+            match_data = tournament.load_match_data_from_file()
+            version = data_version(match_data)
+            view_model = process_tournament_data(tournament.tour_type, match_data, resolver=resolver, tournament=tournament)
+        cache.set(f"tournament_page_{tour_kind}_{tournament.pk}_{version}", view_model, TOURNAMENT_VIEW_CACHE_TIMEOUT)
+    return view_model
+
+def league_view_model(tournament, resolver, header=None):
+    """
+    Builds a league or Swiss page from the tournament header: the table and the current round (the
+    first with unplayed matches, else the last). The other rounds are only listed; their tabs load
+    them from tours_*_round, so the page costs the same however many rounds the league has.
+
+    Args:
+        header (dict, optional): Header or complete match data to build from; read from the file if omitted.
+
+    Returns:
+        tuple: (version, (match_data, rounds)) where rounds is RoundShards.round_index() with
+            "current" set, and the current round's enriched fixtures under "matches".
+    """
+    if header is None:
+        header = load_match_header(tournament)
+    shards = RoundShards(tournament.get_json_file_path())
+    rounds = shards.round_index(header)
+    current = next((round_info for round_info in rounds if round_info["pending"]), rounds[-1] if rounds else None)
+
+    match_data = {key: value for key, value in header.items() if key not in ("fixtures", "lazy_league", "results", RoundShards.SHARDS_KEY)}
+    match_data.setdefault("table", {})
+    match_data["fixtures"] = {current["key"]: shards.round_fixtures(header, current["key"]) or []} if current else {}
+    match_data, _ = process_tournament_data(tournament.tour_type, match_data, resolver=resolver, tournament=tournament)
+    for round_info in rounds:
+        round_info["current"] = round_info is current
+    if current:
+        current["matches"] = match_data["fixtures"][current["key"]]
+    return data_version(header), (match_data, rounds)
+
+def render_round(request, tournament, tour_kind, resolver, round_number):
+    """
+    Renders one round of a league or Swiss tournament (tournaments/league_round.html), cached per
+    tournament version like the page itself.
+
+    Raises:
+        Http404: If the tournament is not a league/Swiss or has no such round.
+    """
+    if tournament.tour_type not in ROUND_FRAGMENT_TYPES:
+        raise Http404("Only league and Swiss tournaments have round fragments.")
+    round_key = f"round_{round_number}"
+    version = stored_version(tournament.get_json_file_path())
+    matches = cache.get(f"tournament_round_{tour_kind}_{tournament.pk}_{version}_{round_number}")
+    if matches is None:
+        header = load_match_header(tournament)
+        matches = round_matches(tournament, header, round_key, resolver)
+        if matches is None:
+            raise Http404("No such round.")
+        cache.set(f"tournament_round_{tour_kind}_{tournament.pk}_{data_version(header)}_{round_number}", matches, TOURNAMENT_VIEW_CACHE_TIMEOUT)
+    return render(request, 'tournaments/league_round.html', {
+        'tour': tournament,
+        'matches': matches,
+        'round_number': round_number,
+        'tour_kind': tour_kind,
+    })
+
+def round_matches(tournament, header, round_key, resolver):
+    """One round's fixtures from a header or complete match data, enriched for league_round.html (None if there is no such round)."""
+    fixtures = RoundShards(tournament.get_json_file_path()).round_fixtures(header, round_key)
+    if fixtures is None:
+        return None
+    match_data, _ = process_tournament_data(tournament.tour_type, {"fixtures": {round_key: fixtures}, "table": {}}, resolver=resolver, tournament=tournament)
+    return match_data["fixtures"][round_key]
+
+# ============================================================================ #
+#                                    archive                                   #
+# ============================================================================ #
+def archived_fragment(tournament, tour_kind, round_number=None):
+    """
+    The archived page body, or one archived round, cached until the timeout (archives never change).
+
+    Raises:
+        Http404: If the archive has no such round.
+    """
+    cache_key = f"tournament_archive_{tour_kind}_{tournament.pk}" if round_number is None else f"tournament_archive_{tour_kind}_{tournament.pk}_{round_number}"
+    html = cache.get(cache_key)
+    if html is None:
+        archive = TournamentArchive(tournament).read()
+        html = archive.get("page", "") if round_number is None else archive.get("rounds", {}).get(str(round_number))
+        if html is None:
+            raise Http404("No such round.")
+        cache.set(cache_key, html, TOURNAMENT_VIEW_CACHE_TIMEOUT)
+    return html
 
 def process_tournament_data(tour_type, match_data, resolver, tournament):
     """
     Enriches tournament match data with display names and logos, depending on tournament type.
 
     Args:
-        tour_type (str): Tournament format type ('cup', 'league', 'groups_knockout').
+        tour_type (str): Tournament format type ('cup', 'league', 'groups_knockout', 'swiss', 'double_elim').
         match_data (dict): Raw match/tournament data structure.
-        resolver (callable): Function to resolve a team identifier into a display dict.
+        resolver (callable): Function to resolve a team identifier into a display dict. If it has a
+            prefetch() method (TeamResolver), it is given every participant up front.
         tournament (Model): Tournament object, used for fallback logo.
 
     Returns:
@@ -394,8 +644,10 @@ def process_tournament_data(tour_type, match_data, resolver, tournament):
             - list: Rounds array for rendering (used in group/knockout stages).
     """
     rounds = []
+    if hasattr(resolver, "prefetch"):
+        resolver.prefetch(collect_participants(match_data))
     # --- CUP FORMAT ---
-    if tour_type == "cup":
+    if tour_type in ("cup", "double_elim"):
         for round_data in match_data["rounds"]:
             for match in round_data["matches"]:
                 for side in ["team_a", "team_b"]:
@@ -403,6 +655,7 @@ def process_tournament_data(tour_type, match_data, resolver, tournament):
                         team_name = (match[side].get("name") if isinstance(match[side], dict) else match[side])
                         team_info = resolver(team_name)
                         match[f"{side}_display_name"] = team_info["display_name"]
+                        match[f"{side}_ref"] = team_name
                         match[f"{side}_logo"] = team_info["logo"] or tournament.logo
                     # Handle legs if present
                     if "legs" in match:
@@ -412,20 +665,27 @@ def process_tournament_data(tour_type, match_data, resolver, tournament):
                                     team_name = ( leg_match[side].get("name") if isinstance(leg_match[side], dict) else leg_match[side])
                                     team_info = resolver(team_name)
                                     leg_match[f"{side}_display_name"] = team_info["display_name"]
+                                    leg_match[f"{side}_ref"] = team_name
                                     leg_match[f"{side}_logo"] = team_info["logo"] or tournament.logo                           
+        for team_name, team_stats in match_data.get("table", {}).items():
+            team_stats["display_name"] = resolver(team_name)["display_name"]
     
-     # --- LEAGUE FORMAT ---
-    elif tour_type == "league":
+     # --- LEAGUE / SWISS FORMAT ---
+    elif tour_type in ("league", "swiss"):
+        if "lazy_league" in match_data:
+            match_data["fixtures"] = LazyRoundRobin(match_data).fixtures()
         for round_key, matches in match_data["fixtures"].items():
             for match in matches:
                 for side in ["team_a", "team_b"]:
                     team_name = match.get(side)
                     team_info = resolver(team_name)
                     match[f"{side}_display_name"] = team_info["display_name"]
+                    match[f"{side}_ref"] = team_name
                     match[f"{side}_logo"] = team_info["logo"] or tournament.logo
         # Process table
         for team_name, team_stats in match_data["table"].items():
             team_info = resolver(team_name)
+            team_stats["display_name"] = team_info["display_name"]
             team_stats["team_logo"] = team_info["logo"] or tournament.logo
 
      # --- GROUPS + KNOCKOUT FORMAT ---
@@ -447,11 +707,13 @@ def process_tournament_data(tour_type, match_data, resolver, tournament):
                         team_name = match.get(side)
                         team_info = resolver(team_name)
                         match[f"{side}_display_name"] = team_info.get("display_name", team_name)
+                        match[f"{side}_ref"] = team_name
                         match[f"{side}_logo"] = team_info.get("logo") or tournament.logo
 
             # Enrich group table with team logos
             for team_name, stats in group_data.get("table", {}).items():
                 team_info = resolver(team_name)
+                stats["display_name"] = team_info.get("display_name", team_name)
                 stats["team_logo"] = team_info.get("logo") or tournament.logo
 
         # Handle knockout stage if it exists
@@ -463,9 +725,11 @@ def process_tournament_data(tour_type, match_data, resolver, tournament):
                         team_name = match.get(side).get('name')
                         team_info = resolver(team_name)
                         match[f"{side}_display_name"] = team_info.get("display_name", team_name)
+                        match[f"{side}_ref"] = team_name
                         match[f"{side}_logo"] = team_info.get("logo") or tournament.logo
 
             for team_name, stats in knockouts.get("table", {}).items():
                 team_info = resolver(team_name)
+                stats["display_name"] = team_info.get("display_name", team_name)
                 stats["team_logo"] = team_info.get("logo") or tournament.logo
     return match_data, rounds
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_alter_sociallink_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='recent_form',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Latest results as W/L/D letters, oldest first (kept by MatchUnitOfWork).', max_length=10),
+        ),
+    ]
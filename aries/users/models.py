@@ -3,7 +3,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import User
 from clans.models import Clans  
-import os,json
+import os
 from PIL import Image
 
 class Profile(models.Model):
@@ -49,57 +49,42 @@ class PlayerStats(models.Model):
     gd = models.IntegerField(default=0)
     gf = models.IntegerField(default=0)
     ga = models.IntegerField(default=0)
-    elo_rating = models.FloatField(default=1200, editable=False)
+    elo_rating = models.FloatField(default=1200, editable=False, db_index=True)
     season = models.CharField(max_length=20, default="2025")
     match_data = models.JSONField(blank=True, null=True, default=dict)
+    recent_form = models.CharField(max_length=10, blank=True, default="", editable=False, help_text="Latest results as W/L/D letters, oldest first (kept by MatchUnitOfWork).")
 
-    def set_rank_based_on_elo(self):
-        """Set the rank of the player based on the Elo value."""
-        ranking_thresholds = [
-            (1200, 'bronze'),
-            (1400, 'silver'),
-            (1600, 'gold'),
-            (1800, 'platinum'),
-            (2000, 'diamond'),
-            (2200, 'master'),
-            (2400, 'grandmaster'),
-            (2600, 'champion'),
-        ]
-        self.rank = 'invincible'
+    # (Elo below which the rank applies, rank), ascending; TOP_RANK above the last one.
+    RANK_THRESHOLDS = [
+        (1200, 'bronze'),
+        (1400, 'silver'),
+        (1600, 'gold'),
+        (1800, 'platinum'),
+        (2000, 'diamond'),
+        (2200, 'master'),
+        (2400, 'grandmaster'),
+        (2600, 'champion'),
+    ]
+    TOP_RANK = 'invincible'
+
+    def set_rank_based_on_elo(self, commit=True):
+        """Set the rank of the player based on the Elo value. Pass commit=False to leave saving to the caller."""
+        self.rank = self.TOP_RANK
 
-        for threshold, rank in ranking_thresholds:
+        for threshold, rank in self.RANK_THRESHOLDS:
             if self.elo_rating < threshold:
                 self.rank = rank
                 break
 
-        self.save()
+        if commit:
+            self.save()
 
     def get_json_file_path(self):
-        """Return the file path for the JSON data."""
+        """Path of the old match history file, imported into MatchRecord by tournaments migration 0015 and removed with the stats."""
         directory = os.path.join(settings.MEDIA_ROOT, 'match_data')
         os.makedirs(directory, exist_ok=True)
         return os.path.join(directory, f'player_match_data_{self.pk}.json')
 
-    def save_match_data_to_file(self):
-        """Save match data to a JSON file if it exists."""
-        if not self.match_data:  
-            return
-
-        file_path = self.get_json_file_path()
-        with open(file_path, 'w') as json_file:
-            json.dump(self.match_data, json_file, indent=4)
-
-    def load_match_data_from_file(self):
-        """Load match data from the JSON file."""
-        file_path = self.get_json_file_path()
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            with open(file_path, 'r') as json_file:
-                try:
-                    return json.load(json_file)
-                except json.JSONDecodeError:
-                    return {}
-        return {}
-
     def delete(self, *args, **kwargs):
         """Delete the JSON file when the player stats are deleted."""
         file_path = self.get_json_file_path()
@@ -5,7 +5,9 @@ from django.db.models import Q
 from django.contrib.auth import logout,login
 from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm,UserUpdateForm,ProfileUpdateForm, SocialLinkFormSet,CustomLoginForm
-from tournaments.models import ClanTournament, IndiTournament,ClanTournamentPlayer
+from tournaments.models import ClanTournament, IndiTournament,ClanTournamentPlayer, MatchRecord
+from tournaments.participants import participant_ref
+from tournaments.rank_index import rank_position
 from django.contrib.auth.models import User
 from django.http import  JsonResponse
 from django.contrib.auth.views import LoginView
@@ -52,14 +54,16 @@ def profile(request):
     """Profile view for the logged-in user"""
     match_data = {"matches": []}
     match_results = []
+    position = None
     indi_tournaments = []
     cvc_tournaments = []
     query = request.GET.get('q', '')
     socials = {}
     try:
         player = request.user
-        match_data = player.profile.stats.load_match_data_from_file()
-        match_results = []
+        match_results = list(player.profile.stats.recent_form[-5:])
+        position = rank_position(player.profile.stats)
+        match_data = {"matches": MatchRecord.objects.latest_for(participant_ref(player), query=query)}
         followers = follow.count_followers(player)
         following = follow.count_following(player)
         player_tour_ids = ClanTournamentPlayer.objects.filter(user=request.user).values_list('tournament_id', flat=True)
@@ -69,24 +73,6 @@ def profile(request):
         combined = list(chain(indi_1, indi_2))
         indi_tournaments = sorted(set(combined), key=lambda x: x.id, reverse=True)[:5]
         socials = make_social_links_dict(SocialLink.objects.filter(profile=player.profile).all())
-        if match_data:
-            for match in match_data["matches"][-5:]:
-                result = match["result"]
-                if result == "win":
-                    match_results.append("W")
-                elif result == "loss":
-                    match_results.append("L")
-                else:
-                    match_results.append("D")
-            match_data["matches"] = match_data["matches"][:5]
-        if query:
-            query_lower = query.lower()
-            filtered_matches = []
-            for match in match_data["matches"]:
-                if any(query_lower in (match.get(field, "") or "").lower()
-                        for field in ['date', 'tour_name', 'opponent', 'result', 'score']):
-                    filtered_matches.append(match)
-            match_data["matches"] = filtered_matches
    
     except Exception as e:
         messages.error(request,'There has been an error loading your profile')
@@ -95,6 +81,7 @@ def profile(request):
     context ={
         "match_data":match_data,
         "match_results":match_results,
+        "rank_position":position,
         'query':query,
         'followers':followers,
         'following':following,
@@ -118,7 +105,7 @@ def all_gamers(request):
     no_results = False
 
     try:
-        players_qs = User.objects.select_related('profile__stats').all()
+        players_qs = User.objects.select_related('profile__stats', 'profile__clan').all()
         if request.session.get("is_user"):
             user_id = request.session.get("user_id")
             if user_id:
@@ -134,22 +121,7 @@ def all_gamers(request):
 
         for player in players_qs:
             player_stats = getattr(player.profile, 'stats', None)
-            match_data = None
-            match_results = []
-
-            if player_stats:
-                match_data = player_stats.load_match_data_from_file()
-
-            if match_data and "matches" in match_data:
-                recent_matches = match_data["matches"][-5:]
-                for match in recent_matches:
-                    result = match.get("result", "").lower()
-                    if result == "win":
-                        match_results.append("W")
-                    elif result == "loss":
-                        match_results.append("L")
-                    else:
-                        match_results.append("D")
+            match_results = list(player_stats.recent_form[-5:]) if player_stats else []
             background_image = player.profile.clan.clan_profile_pic.url if player.profile.clan and player.profile.clan.clan_profile_pic else '/static/images/areis-1.png'
             players.append({
                 "player": player,
@@ -175,36 +147,18 @@ def gamer_view(request,player_id):
     """View to display details of a specific gamer based on player id"""
     player = get_object_or_404(User, id=player_id)
     player_stats = player.profile.stats  
-    match_data = player_stats.load_match_data_from_file()
     socials = make_social_links_dict(SocialLink.objects.filter(profile=player.profile).all())
     followers = follow.count_followers(player)
     following = follow.count_following(player)
     is_following =  follow.is_follower(follow.get_logged_in_entity(request),player)
-    match_results = []
-    if match_data:
-        for match in match_data["matches"][-5:]:
-            result = match["result"]
-            if result == "win":
-                match_results.append("W")
-            elif result == "loss":
-                match_results.append("L")
-            else:
-                match_results.append("D")
-        match_data["matches"] = match_data["matches"][:5]
+    match_results = list(player_stats.recent_form[-5:])
+    position = rank_position(player_stats)
     query = request.GET.get('q', '')
-    if query:
-        # Filter players using list comprehension
-        match_data["matches"] = [
-        match for match in match_data['matches']
-        if (query.lower() in match['date'].lower() or
-            query.lower() in match['tour_name'].lower() or
-            query.lower() in match['opponent'].lower() or
-            query.lower() in match['result'].lower() or
-            query.lower() in match['score'].lower())
-        ]
+    match_data = {"matches": MatchRecord.objects.latest_for(participant_ref(player), query=query)}
     context ={
         'player':player,
         "match_results":match_results,
+        "rank_position":position,
         "match_data":match_data,
         'query':query,
         'followers':followers,